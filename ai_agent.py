@@ -1,22 +1,37 @@
-import pygame
+from __future__ import annotations
 from random import choice
-from settings import Settings
-from card import Card
+from typing import TYPE_CHECKING
+from card_model import CardModel
+
+if TYPE_CHECKING:
+    from datong_solitaire import DaTongSolitaire
 
 class AiAgent:
     """单人游戏中的电脑玩家的基类"""
-    def __init__(self, id):
-        self.settings = Settings()
-        self.game = self.settings.game
+    def __init__(self, game: DaTongSolitaire, id):
+        self.game = game
+        self.settings = game.settings
         self.id = id
     
-    def get_card_to_play(self) -> Card:
+    def get_card_to_play(self) -> CardModel:
         pass
     
-    def get_card_to_discard(self) -> Card:
+    def get_card_to_discard(self) -> CardModel:
         pass
     
-    def _get_playable_cards(self) -> list[Card]:
+    @classmethod
+    def decide_batch(cls, games: list, ids: list[int]) -> list[CardModel]:
+        """为多个局面各做一次决策：能出牌（game.can_play_card）时选出要打出的牌，否则选出要弃置的牌
+        
+        默认逐个局面创建电脑玩家并决策；能一次评估多个局面的电脑玩家（如向量化的模型）可以重写此方法
+        """
+        cards = []
+        for game, id in zip(games, ids):
+            agent = cls(game, id)
+            cards.append(agent.get_card_to_play() if game.can_play_card else agent.get_card_to_discard())
+        return cards
+    
+    def _get_playable_cards(self) -> list[CardModel]:
         my_playable_cards = []
         for card in self.game.hand[self.id]:
             if card.playable:
@@ -25,25 +40,25 @@ class AiAgent:
     
 class AiAgentRandom(AiAgent):
     """使用随机出牌策略的电脑玩家"""
-    def __init__(self, id):
-        super().__init__(id)
+    def __init__(self, game: DaTongSolitaire, id):
+        super().__init__(game, id)
     
-    def get_card_to_play(self) -> Card:
+    def get_card_to_play(self) -> CardModel:
         return choice(self._get_playable_cards())
 
-    def get_card_to_discard(self) -> Card:
-        return choice(self.game.hand[self.id].sprites())
+    def get_card_to_discard(self) -> CardModel:
+        return choice(self.game.hand[self.id])
 
 class AiAgentNormal(AiAgent):
     """一个正常的电脑玩家"""
-    def __init__(self, id):
-        super().__init__(id)
+    def __init__(self, game: DaTongSolitaire, id):
+        super().__init__(game, id)
         
-    def get_card_to_play(self) -> Card:
+    def get_card_to_play(self) -> CardModel:
         my_playable_cards = self._get_playable_cards()
         if len(my_playable_cards) == 1:
             return my_playable_cards[0]
-        card_point_list: list[list[Card, int]] = [[card, 0] for card in my_playable_cards]
+        card_point_list: list[list[CardModel, int]] = [[card, 0] for card in my_playable_cards]
         my_hand = self.game.hand[self.id]
         for card_point_pair in card_point_list:
             card = card_point_pair[0]
@@ -56,9 +71,9 @@ class AiAgentNormal(AiAgent):
                         card_point_pair[1] += hand_card.rank
         return sorted(card_point_list, key=lambda l: l[1], reverse=True)[0][0]
     
-    def get_card_to_discard(self) -> Card:
+    def get_card_to_discard(self) -> CardModel:
         my_hand = self.game.hand[self.id]
-        card_point_list: list[list[Card, int]] = [[card, card.rank] for card in my_hand]
+        card_point_list: list[list[CardModel, int]] = [[card, card.rank] for card in my_hand]
         for card_point_pair in card_point_list:
             card = card_point_pair[0]
             for hand_card in my_hand:
@@ -0,0 +1,313 @@
+"""向其他前端提供电脑玩家决策的本地服务
+
+服务通过 HTTP 提供，可以监听本机的 TCP 端口或 Unix 套接字：
+    POST /decide   请求体为 {"agent": 名称, "observations": [局面, ...]}，返回 {"cards": [卡牌编号, ...], "actions": ["play" 或 "discard", ...]}
+    GET /agents    返回已注册的电脑玩家的名称
+    GET /stats     返回每种电脑玩家的请求数、决策数、平均批大小、延迟（p50/p99）和吞吐量
+局面为一名玩家所能看到的信息，卡牌编号与 protocol.py 相同（花色 * 13 + 点数 - 1）：
+    {"hand": [自己的手牌], "playable": [可打出的牌，可省略], "history": [[玩家, 卡牌编号或 null, "play" 或 "discard"], ...，可省略], "seat": 座位，可省略}
+省略 playable 时由 history 中打出的牌推算（其他玩家暗扣的牌编号为 null）。手牌中有可打出的牌时必须出牌，否则弃牌。
+
+同一种电脑玩家的请求在 batch_delay 秒内合并为一批（最多 max_batch 个局面），一次调用 AiAgent.decide_batch，
+能一次评估多个局面的电脑玩家因此可以在一次调用中处理多个客户端的局面。
+一批中有局面无法决策时逐个请求重新决策，只有含有这个局面的请求返回500，其余请求不受影响。
+
+运行 `python ai_service.py [--port 端口] [--unix 路径]` 启动服务。
+"""
+from __future__ import annotations
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from typing import Optional
+from ai_agent import AiAgent, AiAgentRandom, AiAgentNormal
+from card_model import CardModel
+import protocol
+import rules
+
+AGENTS: dict[str, type[AiAgent]] = {
+    'random': AiAgentRandom,
+    'normal': AiAgentNormal,
+}
+
+def register_agent(name: str, agent_class: type[AiAgent]) -> None:
+    """注册一种电脑玩家，之后可以在请求中按名称使用"""
+    AGENTS[name] = agent_class
+
+
+class AiServiceSettings:
+    """决策服务的设置类"""
+    def __init__(self):
+        self.host = '127.0.0.1'
+        self.port = 8767
+        self.unix_path: Optional[str] = None   # 设置后改为监听此路径的 Unix 套接字
+        self.batch_delay = 0.002   # 第一个局面到达后最多等待这么多秒，与之后到达的局面合并为一批
+        self.max_batch = 256   # 一批最多的局面数，攒够后立即决策
+        self.max_body = 1024 * 1024   # 请求体的最大字节数
+        self.latency_samples = 4096   # 每种电脑玩家保留最近这么多个请求的延迟，用于计算分位数
+
+
+class BadRequest(Exception):
+    """请求的内容无法处理"""
+
+
+class Observation:
+    """一名玩家所能看到的局面，提供电脑玩家所需的 hand 和 can_play_card 等状态（名称与 DaTongSolitaire 相同）"""
+
+    __slots__ = ('settings', 'seat', 'hand', 'playable_cards', 'history', 'can_play_card')
+
+    def __init__(self, data: dict):
+        if not isinstance(data, dict) or not data.get('hand'):
+            raise BadRequest("局面中没有手牌")
+        self.settings = None   # 电脑玩家的决策不需要游戏的设置
+        self.seat = int(data.get('seat', 0)) % 4
+        self.history: list[tuple[int, Optional[int], str]] = [tuple(move) for move in data.get('history', ())]
+        if 'playable' in data:
+            self.playable_cards = [self._card_info(id) for id in data['playable']]
+        else:
+            played = {self._card_info(id) for _, id, action in self.history if action == 'play'}
+            self.playable_cards = rules.playable_cards_from_played(played)
+        self.hand: list[list[CardModel]] = [[], [], [], []]
+        for id in data['hand']:
+            card = CardModel(*self._card_info(id), self.seat)
+            card.playable = card.info in self.playable_cards
+            self.hand[self.seat].append(card)
+        self.can_play_card = rules.can_play(self.hand[self.seat], self.playable_cards)
+
+    def _card_info(self, id) -> tuple[int, int]:
+        if not isinstance(id, int) or not 0 <= id < 52:
+            raise BadRequest(f"无效的卡牌编号：{id}")
+        return protocol.card_info(id)
+
+
+class AgentStats:
+    """一种电脑玩家的请求统计"""
+
+    def __init__(self, samples: int):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.decisions = 0
+        self.batches = 0
+        self.compute_time = 0.0   # decide_batch 的总耗时（秒）
+        self.latencies: deque[float] = deque(maxlen=samples)   # 最近的请求从到达到得出决策的秒数
+
+    def report(self) -> dict:
+        latencies = sorted(self.latencies)
+        elapsed = time.monotonic() - self.started
+        return {
+            'requests': self.requests,
+            'decisions': self.decisions,
+            'batches': self.batches,
+            'mean_batch': round(self.decisions / self.batches, 2) if self.batches else 0,
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+            'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 3) if latencies else None,
+            'decisions_per_s': round(self.decisions / elapsed, 1) if elapsed > 0 else 0,
+            'compute_us_per_decision': round(self.compute_time / self.decisions * 1e6, 2) if self.decisions else None
+        }
+
+
+class Batcher:
+    """把同一种电脑玩家的局面合并为批，一次调用 decide_batch"""
+
+    def __init__(self, agent_class: type[AiAgent], settings: AiServiceSettings):
+        self.agent_class = agent_class
+        self.settings = settings
+        self.stats = AgentStats(settings.latency_samples)
+        self.pending: list[tuple[list[Observation], asyncio.Future, float]] = []   # (局面, 结果, 到达的时间)
+        self.pending_count = 0
+        self.flush_handle: Optional[asyncio.Handle] = None
+
+    def submit(self, observations: list[Observation]) -> asyncio.Future:
+        """加入一个请求的局面，返回得出决策后完成的 Future，结果为选出的卡牌列表"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((observations, future, time.monotonic()))
+        self.pending_count += len(observations)
+        self.stats.requests += 1
+        if self.pending_count >= self.settings.max_batch:
+            if self.flush_handle is not None:
+                self.flush_handle.cancel()
+            self.flush_handle = loop.call_soon(self._flush)
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.settings.batch_delay, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        self.flush_handle = None
+        requests, self.pending, self.pending_count = self.pending, [], 0
+        observations = [observation for request in requests for observation in request[0]]
+        start = time.monotonic()
+        try:
+            cards = self._decide(observations)
+        except Exception:
+            # 有局面无法决策时逐个请求重新决策，只有含有这个局面的请求失败
+            for request in requests:
+                self._finish([request], start)
+            return
+        self._resolve(requests, cards, start)
+
+    def _finish(self, requests: list[tuple], start: float) -> None:
+        observations = [observation for request in requests for observation in request[0]]
+        try:
+            cards = self._decide(observations)
+        except Exception as e:
+            for _, future, _ in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self._resolve(requests, cards, start)
+
+    def _decide(self, observations: list[Observation]) -> list[CardModel]:
+        if not observations:
+            return []
+        return self.agent_class.decide_batch(observations, [observation.seat for observation in observations])
+
+    def _resolve(self, requests: list[tuple], cards: list[CardModel], start: float) -> None:
+        """把一批的决策按请求分开，完成各个请求的 Future"""
+        end = time.monotonic()
+        count = sum(len(request[0]) for request in requests)
+        if count:
+            self.stats.batches += 1
+            self.stats.decisions += count
+            self.stats.compute_time += end - start
+        pos = 0
+        for request_observations, future, arrived in requests:
+            count = len(request_observations)
+            if not future.done():
+                future.set_result(cards[pos:pos + count])
+            pos += count
+            self.stats.latencies.append(end - arrived)
+
+
+class AiService:
+    """接收 HTTP 请求并返回电脑玩家决策的服务"""
+
+    def __init__(self, settings: AiServiceSettings = None):
+        self.settings = settings if settings is not None else AiServiceSettings()
+        self.batchers: dict[str, Batcher] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.connections: set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        """开始监听，端口为0时由系统分配，实际端口可从 port 获取"""
+        if self.settings.unix_path:
+            self.server = await asyncio.start_unix_server(self._handle_connection, self.settings.unix_path)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, self.settings.host, self.settings.port)
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self) -> None:
+        """停止监听并断开所有连接"""
+        if self.server is not None:
+            self.server.close()
+        for writer in list(self.connections):
+            writer.transport.abort()
+        if self.server is not None:
+            await self.server.wait_closed()
+
+    def stats(self) -> dict:
+        return {name: batcher.stats.report() for name, batcher in self.batchers.items()}
+
+    async def decide(self, agent: str, observations: list[Observation]) -> list[CardModel]:
+        """按名称用电脑玩家为多个局面决策，同一种电脑玩家的并发请求合并为一批"""
+        batcher = self.batchers.get(agent)
+        if batcher is None:
+            if agent not in AGENTS:
+                raise BadRequest(f"没有名为 {agent} 的电脑玩家")
+            batcher = self.batchers[agent] = Batcher(AGENTS[agent], self.settings)
+        if not observations:
+            return []
+        return await batcher.submit(observations)
+
+    # HTTP
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """处理一个连接上的请求（支持 keep-alive），直到客户端断开或要求关闭"""
+        self.connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > self.settings.max_body:
+                    self._respond(writer, 413, {'error': "请求体过大"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await self._route(method, path, body)
+                close = headers.get('connection', '').lower() == 'close'
+                self._respond(writer, status, payload, close)
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        if method == 'GET' and path == '/agents':
+            return 200, {'agents': sorted(AGENTS)}
+        if method == 'GET' and path == '/stats':
+            return 200, self.stats()
+        if method != 'POST' or path != '/decide':
+            return 404, {'error': "未知的请求"}
+        try:
+            request = json.loads(body)
+            observations = [Observation(data) for data in request.get('observations', ())]
+            cards = await self.decide(request.get('agent', 'normal'), observations)
+        except (BadRequest, ValueError, TypeError, AttributeError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            # 电脑玩家决策时出错（如局面不完整时的 IndexError），由服务返回错误而不是断开连接
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+        return 200, {
+            'cards': [protocol.card_id(card.info) for card in cards],
+            'actions': ['play' if observation.can_play_card else 'discard' for observation in observations]
+        }
+
+    def _respond(self, writer: asyncio.StreamWriter, status: int, payload: dict, close: bool = False) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large', 500: 'Internal Server Error'}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode() + body
+        )
+
+
+def main():
+    settings = AiServiceSettings()
+    if '--port' in sys.argv:
+        settings.port = int(sys.argv[sys.argv.index('--port') + 1])
+    if '--unix' in sys.argv:
+        settings.unix_path = sys.argv[sys.argv.index('--unix') + 1]
+    service = AiService(settings)
+    print(f"电脑玩家决策服务正在监听 {settings.unix_path or f'{settings.host}:{settings.port}'}")
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""将游戏的所有资源文件打包为单个资源包，并通过内存映射读取
+
+资源包的格式为：
+    魔数 b'DTPK'，版本号（uint32），索引长度（uint32），索引（UTF-8 编码的 JSON），各个资源文件的内容
+索引将资源的相对路径（如 'images/cards/ace_of_spades.png'）映射为 [偏移, 长度, 格式]，偏移从索引之后的第一个字节算起。
+
+运行 `python asset_pack.py` 即可将 images、music、fonts 文件夹打包为 assets.pack。
+"""
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Optional, Union
+
+MAGIC = b'DTPK'
+VERSION = 1
+HEADER = struct.Struct('<4sII')
+PACK_NAME = 'assets.pack'
+ASSET_DIRS = ['images', 'music', 'fonts']
+
+
+class AssetFile(io.RawIOBase):
+    """资源包中单个资源的只读文件对象，直接读取内存映射，不会复制整个资源"""
+
+    def __init__(self, name: str, data: memoryview):
+        self.name = name
+        self.data = data
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = max(0, min(len(buffer), len(self.data) - self.pos))
+        buffer[:size] = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.pos = offset
+        elif whence == io.SEEK_CUR:
+            self.pos += offset
+        elif whence == io.SEEK_END:
+            self.pos = len(self.data) + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+
+class AssetPack:
+    """通过内存映射读取的资源包"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_size = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC:
+            raise Exception(f"{path} is not an asset pack!")
+        if version != VERSION:
+            raise Exception(f"Unsupported asset pack version {version}!")
+        self.index: dict[str, list] = json.loads(bytes(self.mmap[HEADER.size:HEADER.size + index_size]))
+        self.data_start = HEADER.size + index_size
+        self.mtime = os.path.getmtime(path)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def open(self, name: str) -> AssetFile:
+        """打开资源包中的一个资源"""
+        offset, length, _ = self.index[name]
+        start = self.data_start + offset
+        return AssetFile(name, memoryview(self.mmap)[start:start + length])
+
+    def format(self, name: str) -> str:
+        """资源的格式（即文件扩展名）"""
+        return self.index[name][2]
+
+
+def build(output: str = PACK_NAME, asset_dirs: list[str] = ASSET_DIRS) -> None:
+    """将各个文件夹中的资源文件打包为资源包"""
+    names = []
+    for asset_dir in asset_dirs:
+        for root, _, files in os.walk(asset_dir):
+            for filename in files:
+                names.append(os.path.join(root, filename).replace(os.sep, '/'))
+    names.sort()
+
+    index = {}
+    offset = 0
+    for name in names:
+        length = os.path.getsize(name)
+        index[name] = [offset, length, os.path.splitext(name)[1].lstrip('.').lower()]
+        offset += length
+    index = json.dumps(index, ensure_ascii=False).encode('utf-8')
+
+    with open(output, 'wb') as pack:
+        pack.write(HEADER.pack(MAGIC, VERSION, len(index)))
+        pack.write(index)
+        for name in names:
+            with open(name, 'rb') as file:
+                pack.write(file.read())
+
+
+_pack: Optional[AssetPack] = None
+_pack_loaded = False
+
+def get_pack() -> Optional[AssetPack]:
+    """获取游戏的资源包，没有资源包时返回None
+
+    资源包位于当前目录，或者 PyInstaller 打包后的临时解压目录中
+    """
+    global _pack, _pack_loaded
+    if not _pack_loaded:
+        _pack_loaded = True
+        for directory in ['.', getattr(sys, '_MEIPASS', '.')]:
+            path = os.path.join(directory, PACK_NAME)
+            if os.path.exists(path):
+                _pack = AssetPack(path)
+                break
+    return _pack
+
+def open_asset(path: str) -> Union[str, AssetFile]:
+    """打开一个资源，返回可直接交给 pygame 加载的对象
+
+    如果资源包中有此资源，返回读取资源包的文件对象，否则原样返回文件路径
+    """
+    pack = get_pack()
+    if pack is not None and path in pack:
+        return pack.open(path)
+    return path
+
+def asset_format(path: str) -> str:
+    """资源的格式（即文件扩展名），作为 namehint 交给 pygame，使其不必从文件对象的内容猜测格式
+
+    pygame.mixer.Sound 不接受 namehint，只能由 SDL_mixer 从内容判断（包括没有 ID3 标签的 MP3）
+    """
+    pack = get_pack()
+    if pack is not None and path in pack:
+        return pack.format(path)
+    return os.path.splitext(path)[1].lstrip('.').lower()
+
+def asset_mtime(path: str) -> float:
+    """资源的修改时间，资源在资源包中时为资源包的修改时间"""
+    pack = get_pack()
+    if pack is not None and path in pack:
+        return pack.mtime
+    return os.path.getmtime(path)
+
+
+if __name__ == '__main__':
+    build()
@@ -1,25 +1,30 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
 import pygame
 from pygame.sprite import Sprite
 from pygame import Surface
 from pygame.rect import Rect
-from settings import Settings
+from font_bank import FontBank
+
+if TYPE_CHECKING:
+    from datong_solitaire import DaTongSolitaire
 
 class Board(Sprite):
     """管理用于显示信息的面板的类"""
     
-    def __init__(self):
+    def __init__(self, game: DaTongSolitaire):
         super().__init__()
         # 暂时采用纯色背景
-        self.settings = Settings()
-        self.game = self.settings.game
-        self.screen = pygame.display.get_surface()
+        self.game = game
+        self.settings = game.settings
+        self.screen = game.screen
         self.image = Surface((self.settings.board.width, self.settings.board.height))
         self.image.fill(self.settings.board.color)
         self.rect = self.image.get_rect(
             x=self.settings.board.left_margin,
             y=self.settings.board.top_margin
         )
-        self.font = pygame.font.Font(self.settings.font_path, self.settings.board.font_size)
+        self.font = FontBank().get(self.settings.font_path, self.settings.board.font_size)
         
         self.curr_player_text = self.font.render(
             "当前玩家：0",
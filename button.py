@@ -1,14 +1,19 @@
-from typing import Optional
+from __future__ import annotations
+from typing import Optional, TYPE_CHECKING
 import pygame
 from pygame import Rect, Surface
 from pygame.sprite import Sprite
-from settings import Settings
+from font_bank import FontBank
 from utils import darken
 
+if TYPE_CHECKING:
+    from datong_solitaire import DaTongSolitaire
+
 class Button(Sprite):
     
     def __init__(
             self,
+            game: DaTongSolitaire,
             msg,
             width=200,
             height=50,
@@ -19,11 +24,11 @@ class Button(Sprite):
             font_size=20,
             parent_obj=None
         ):
-        """初始化按钮的属性"""
-        self.settings = Settings()
-        self.game = self.settings.game
-        super().__init__(self.game.buttons)
-        self.screen = pygame.display.get_surface()
+        """初始化按钮的属性（按钮由创建它的界面或窗口登记在自己的 buttons 中）"""
+        self.game = game
+        self.settings = game.settings
+        super().__init__()
+        self.screen = game.screen
         self.screen_rect = self.screen.get_rect()
         self.image = Surface((width, height))
         self.image.fill(button_color)
@@ -34,7 +39,7 @@ class Button(Sprite):
         self.height = height
         self.button_color = button_color
         self.text_color = text_color
-        self.font = pygame.font.Font(self.settings.font_path, font_size)
+        self.font = FontBank().get(self.settings.font_path, font_size)
         self.focused = False   # 是否有光标停留
         
         # 创建按钮的rect对象，并使其居中
@@ -60,20 +65,25 @@ class Button(Sprite):
         self.msg_image = self.font.render(msg, True, self.text_color)
         self.msg_image_rect = self.msg_image.get_rect()
         self.msg_image_rect.center = (self.rect.width // 2, self.rect.height // 2)
+        # 预先绘制好按钮平时和聚焦时的图像，每帧绘制时无需再复制和变暗
+        self.normal_image = self.image.copy()
+        self.normal_image.blit(self.msg_image, self.msg_image_rect)
+        self.focused_image = self.image.copy()
+        darken(self.focused_image, ratio=0.8)
+        self.focused_image.blit(self.msg_image, self.msg_image_rect)
     
     def blitme(self, surface: Optional[Surface]=None) -> None:
-        if surface == None:
-            surface = self.screen
-        button = self.image.copy()
-        if self.focused:
-            darken(button, ratio=0.8)
-        button.blit(self.msg_image, self.msg_image_rect)
-        surface.blit(button, self.rect)
+        """绘制按钮，不指定 surface 时按绝对位置绘制到屏幕上，否则按相对于父对象的位置绘制到 surface 上"""
+        image = self.focused_image if self.focused else self.normal_image
+        if surface is None:
+            self.screen.blit(image, self.abs_rect)
+        else:
+            surface.blit(image, self.rect)
     
     def update(self) -> None:
-        if (not self.game.windows) or (not self.parent_obj is None and self.game.windows and self.game.windows[-1] == self.parent_obj):
-            mouse_pos = pygame.mouse.get_pos()
-            if self.abs_rect.collidepoint(mouse_pos):
-                self.focused = True
-            else:
-                self.focused = False
\ No newline at end of file
+        """根据鼠标位置更新按钮的聚焦状态，游戏只更新当前能响应鼠标的界面或窗口的按钮"""
+        mouse_pos = pygame.mouse.get_pos()
+        if self.abs_rect.collidepoint(mouse_pos):
+            self.focused = True
+        else:
+            self.focused = False
\ No newline at end of file
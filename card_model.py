@@ -0,0 +1,60 @@
+class CardModel:
+    """一张卡牌的游戏状态
+    
+    只记录游戏逻辑需要的数据，不含图像和位置，游戏逻辑、电脑玩家和模拟只需使用此类。
+    卡牌的绘制由所有卡牌共享的 CardView 负责。
+    """
+    
+    __slots__ = ('suit', 'rank', 'owner', 'visible', 'playable', 'discarded')
+    
+    def __init__(self, suit: int, rank: int, owner: int):
+        self.suit = suit
+        self.rank = rank
+        self.owner = owner
+        self.visible = True
+        self.playable = (suit, rank) == (0, 7)
+        self.discarded = False
+    
+    @property
+    def info(self) -> tuple[int, int]:
+        return (self.suit, self.rank)
+    
+    @property
+    def sound_path(self) -> str:
+        return 'music/cards/' + CardModel._card_sound_filename(self.suit, self.rank)
+    
+    def copy(self) -> 'CardModel':
+        """复制卡牌的状态，用于搜索等需要复制整个牌局的场合"""
+        card = CardModel.__new__(CardModel)
+        card.suit = self.suit
+        card.rank = self.rank
+        card.owner = self.owner
+        card.visible = self.visible
+        card.playable = self.playable
+        card.discarded = self.discarded
+        return card
+    
+    def _card_sound_filename(suit, rank) -> str:
+        """根据参数生成对应的卡牌音频名称"""
+        suits = ['黑桃', '梅花', '红桃', '方块']
+        rank_str = ''
+        if rank <= 10:
+            rank_str = str(rank)
+        elif rank == 11:
+            rank_str = 'J'
+        elif rank == 12:
+            rank_str = 'Q'
+        elif rank == 13:
+            rank_str = 'K'
+            
+        filename = suits[suit] + rank_str + '.mp3'
+        return filename
+    
+    def cmp(x, y):
+        """返回两个卡牌的顺序关系"""
+        if x[0] < y[0] or x[0] == y[0] and x[1] < y[1]:
+            return -1
+        elif x[0] > y[0] or x[0] == y[0] and x[1] > y[1]:
+            return 1
+        else:
+            return 0
@@ -0,0 +1,162 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import pygame
+from pygame import Surface, Rect
+from asset_pack import open_asset, asset_format
+from card_model import CardModel
+from utils import darken
+
+if TYPE_CHECKING:
+    from datong_solitaire import DaTongSolitaire
+
+class CardView:
+    """一局游戏中所有卡牌共享的绘制器
+    
+    卡牌图像按 (花色, 点数) 缓存，卡牌显示哪张图像完全由 CardModel 的状态决定。
+    解码后的多级缩小图存放于类的静态变量中，进程中的所有对局共享；缩放到卡牌尺寸后的图像则属于各局游戏，
+    因为不同的对局可能使用不同的画面大小。
+    """
+    
+    # 卡牌图像的多级缩小图，键为 (花色, 点数)，卡背的键为 'back'；改变窗口大小时从中缩放，无需重新解码
+    mipmaps: dict[object, list[Surface]] = {}
+    
+    def __init__(self, game: DaTongSolitaire):
+        self.game = game
+        self.settings = game.settings
+        self.screen = game.screen
+        self.back_image: Surface = None
+        self.discarded_back_image: Surface = None
+        self.face_images: dict[tuple[int, int], Surface] = {}   # 缩放后的卡牌正面图像
+        self.discarded_face_images: dict[tuple[int, int], Surface] = {}   # 变暗后的被弃置卡牌正面图像
+        self.rects: dict[tuple[int, int], Rect] = {}   # 本局中各张卡牌在屏幕上的位置
+    
+    def reset(self):
+        """开始新的对局时清空所有卡牌的位置"""
+        self.rects.clear()
+    
+    def rect(self, card: CardModel) -> Rect:
+        """卡牌在屏幕上的矩形，由游戏布局时设置位置"""
+        if card.info not in self.rects:
+            self.rects[card.info] = self.back_image.get_rect()
+        return self.rects[card.info]
+    
+    def image(self, card: CardModel) -> Surface:
+        """根据卡牌的状态选择其图像"""
+        if card.visible:
+            if card.discarded:
+                return self._load_discarded_card_image(card.suit, card.rank)
+            return self._load_card_image(card.suit, card.rank)
+        if card.discarded:
+            return self.discarded_back_image
+        return self.back_image
+    
+    def draw(self, card: CardModel, highlighted: bool = False):
+        """在卡牌的位置绘制卡牌，highlighted 为真时在卡牌周围绘制可打出的提示框"""
+        rect = self.rect(card)
+        if highlighted:
+            frame_rect = rect.inflate(
+                self.settings.card.playable_frame.width,
+                self.settings.card.playable_frame.width
+            )
+            pygame.draw.rect(
+                self.screen,
+                self.settings.card.playable_frame.color,
+                frame_rect,
+                width=self.settings.card.playable_frame.width,
+                border_radius=self.settings.card.playable_frame.border_radius
+            )
+        self.screen.blit(self.image(card), rect)
+    
+    def rescale(self):
+        """卡牌尺寸改变后，重新生成卡牌图像并更新所有卡牌矩形的大小（位置需要重新布局）"""
+        self.screen = self.game.screen
+        self.rescale_images()
+        if self.back_image is None:
+            return
+        size = self.back_image.get_size()
+        for rect in self.rects.values():
+            rect.size = size
+    
+    def _build_mipmaps(image: Surface, levels: int) -> list[Surface]:
+        """生成多级缩小图：第0级为原始尺寸的图像，之后的 levels 级逐级缩小一半"""
+        # 没有创建窗口时（如只有离屏的对局）无法转换为屏幕的像素格式，统一转换为32位
+        if pygame.display.get_surface() is not None:
+            image = image.convert()
+        else:
+            image = image.convert(32)
+        mipmaps = [image]   # 保留原始尺寸，卡牌比缩小图大时（如高分辨率的屏幕）从原图缩小，而不是放大缩小图
+        for _ in range(levels):
+            image = pygame.transform.smoothscale_by(image, 0.5)
+            mipmaps.append(image)
+        return mipmaps
+    
+    def _scale_from_mipmaps(self, mipmaps: list[Surface]) -> Surface:
+        """从不小于目标尺寸的最小一级缩小图缩放到当前的卡牌尺寸"""
+        size = (round(self.settings.card.width), round(self.settings.card.height))
+        source = mipmaps[0]
+        for image in mipmaps[1:]:
+            if image.get_width() < size[0]:
+                break
+            source = image
+        if source.get_size() == size:
+            return source
+        return pygame.transform.smoothscale(source, size)
+    
+    def _load_mipmaps(self, key, path: str) -> list[Surface]:
+        """获取卡牌图像的多级缩小图，只在第一次获取时解码"""
+        if key not in CardView.mipmaps:
+            CardView.mipmaps[key] = CardView._build_mipmaps(pygame.image.load(open_asset(path), asset_format(path)), self.settings.card.mipmap_levels)
+        return CardView.mipmaps[key]
+    
+    def _load_card_image(self, suit, rank) -> Surface:
+        """加载卡牌正面图像，只在第一次加载时解码，之后从缓存中获取"""
+        if (suit, rank) not in self.face_images:
+            mipmaps = self._load_mipmaps((suit, rank), 'images/cards/' + self._card_image_filename(suit, rank))
+            # 原始图像太大了，需要适当缩小
+            self.face_images[(suit, rank)] = self._scale_from_mipmaps(mipmaps)
+        return self.face_images[(suit, rank)]
+    
+    def _load_discarded_card_image(self, suit, rank) -> Surface:
+        """获取被弃置卡牌变暗后的正面图像，只在第一次获取时生成"""
+        if (suit, rank) not in self.discarded_face_images:
+            image = self._load_card_image(suit, rank).copy()
+            darken(image)
+            self.discarded_face_images[(suit, rank)] = image
+        return self.discarded_face_images[(suit, rank)]
+    
+    def _load_card_back_image(self):
+        """加载卡背图像，需要在绘制卡牌之前调用"""
+        mipmaps = self._load_mipmaps('back', 'images/cards/card_back.png')
+        self.back_image = self._scale_from_mipmaps(mipmaps)
+        self.discarded_back_image = self.back_image.copy()
+        darken(self.discarded_back_image)
+    
+    def rescale_images(self):
+        """卡牌尺寸改变后，从多级缩小图重新生成所有卡牌图像"""
+        self.face_images.clear()
+        self.discarded_face_images.clear()
+        if self.back_image is not None:
+            self._load_card_back_image()
+    
+    def _card_image_filename(self, suit, rank) -> str:
+        """根据参数生成对应的卡牌图像名称"""
+        rank_str = ''
+        if type(suit) == int:
+            suit = self.settings.card.suits[suit]
+        
+        if rank >= 2 and rank <= 10:
+            rank_str = str(rank)
+        elif rank == 1:
+            rank_str = 'ace'
+        elif rank == 11:
+            rank_str = 'jack'
+        elif rank == 12:
+            rank_str = 'queen'
+        elif rank == 13:
+            rank_str = 'king'
+        
+        filename = rank_str + '_of_' + suit + 's'
+        if rank >= 11 and rank <= 13:
+            filename += '2'
+        filename += '.png'
+        return filename
@@ -0,0 +1,253 @@
+"""连接游戏服务器的电脑玩家客户端和观众客户端，用于在本机测试服务器
+
+运行 `python client.py [--port 端口] [--bots 客户端数] [--rounds 局数]` 即可让多个电脑玩家连接到本机的服务器进行游戏，
+加上 `--spectators 观众数` 时，另有这么多观众观看第一名电脑玩家所在的牌桌。
+"""
+from __future__ import annotations
+import asyncio
+import sys
+from typing import Optional
+from ai_agent import AiAgent, AiAgentNormal
+from card_model import CardModel
+import protocol
+import rules
+
+class RemoteTable:
+    """客户端一侧的牌桌镜像，根据服务器发来的事件更新状态
+
+    状态的名称与服务器上的牌桌相同，电脑玩家可以直接在镜像上做出决策；其他玩家的手牌是未知的，只记录张数。
+    轮到谁行动由镜像自己推算，服务器不再另行通知。
+    """
+
+    def __init__(self):
+        self.settings = None   # 电脑玩家的决策不需要游戏的设置
+        self.table = -1
+        self.seat = -1
+        self.round = 0
+        self.rounds_finished = 0
+        self.playing = False
+        self.moves = 0   # 本局已经进行的行动数
+        self.hand: list[list[CardModel]] = [[], [], [], []]
+        self.hand_size = [0, 0, 0, 0]
+        self.trash_size = [0, 0, 0, 0]
+        self.playable_cards: list[tuple] = []
+        self.start_player = 0
+        self.current_player = 0
+        self.can_play_card = False
+        self.humans_mask = 0
+        self.score = [0, 0, 0, 0]
+        self.last_result: Optional[tuple] = None   # 上一局的 (得分倍数, 名次, 点数, 得分)
+        self.errors: list[str] = []
+
+    def apply(self, fields: tuple) -> None:
+        """根据服务器的一个事件更新镜像"""
+        kind = fields[0]
+        if kind < 52:
+            self._apply_play(protocol.card_info(kind))
+        elif protocol.DISCARD <= kind < protocol.DISCARD + 52:
+            self._apply_discard(protocol.card_info(kind - protocol.DISCARD))
+        elif kind == protocol.HIDDEN_DISCARD:
+            self._apply_discard(None)
+        elif kind == protocol.WELCOME:
+            _, _, self.table, self.seat = fields
+            if self.seat == protocol.SPECTATOR:
+                self.seat = -1
+        elif kind == protocol.DEAL:
+            _, self.round, self.start_player, self.humans_mask, hand_mask = fields[:5]
+            self.score = list(fields[5:9])
+            self._reset_round(hand_mask, set(), 0)
+            self.hand_size = [13, 13, 13, 13]
+            self.trash_size = [0, 0, 0, 0]
+            self.current_player = self.start_player
+            self.playing = True
+            self._update_can_play()
+        elif kind == protocol.ROUND_OVER:
+            multiply = fields[1]
+            ranking = fields[2:6]
+            points = [point / 10 for point in fields[6:10]]
+            deltas = fields[10:14]
+            self.score = list(fields[14:18])
+            self.last_result = (multiply, ranking, points, deltas)
+            self.playing = False
+            self.rounds_finished += 1
+        elif kind == protocol.SNAPSHOT:
+            _, self.round, flags, self.start_player, self.current_player, self.humans_mask = fields[:6]
+            hand_mask, played_mask, trash_mask = fields[6:9]
+            self.playing = bool(flags & 1)
+            self.hand_size = list(fields[9:13])
+            self.trash_size = list(fields[13:17])
+            self.score = list(fields[17:21])
+            self._reset_round(hand_mask, set(protocol.mask_to_cards(played_mask)), 52 - sum(self.hand_size))
+            self.rounds_finished = self.round - (1 if self.playing else 0)
+            self._update_can_play()
+        elif kind == protocol.ERROR:
+            self.errors.append(protocol.ERROR_MESSAGES.get(fields[1], f"错误码 {fields[1]}"))
+
+    def _reset_round(self, hand_mask: int, played: set, moves: int) -> None:
+        self.hand = [[], [], [], []]
+        self.playable_cards = rules.playable_cards_from_played(played)
+        if self.seat >= 0:
+            self.hand[self.seat] = [CardModel(suit, rank, self.seat) for suit, rank in protocol.mask_to_cards(hand_mask)]
+            for card in self.hand[self.seat]:
+                card.playable = card.info in self.playable_cards
+        self.moves = moves
+
+    def _apply_play(self, info: tuple[int, int]) -> None:
+        player = self.current_player
+        card = self._take_own_card(player, info)
+        if card is None:
+            card = CardModel(info[0], info[1], player)
+        rules.update_playable_cards(self.playable_cards, self.hand, card)
+        self._advance()
+
+    def _apply_discard(self, info: Optional[tuple[int, int]]) -> None:
+        player = self.current_player
+        if info is not None:
+            self._take_own_card(player, info)
+        self.trash_size[player] += 1
+        self._advance()
+
+    def _take_own_card(self, player: int, info: tuple[int, int]) -> Optional[CardModel]:
+        self.hand_size[player] -= 1
+        if player != self.seat:
+            return None
+        for card in self.hand[player]:
+            if card.info == info:
+                self.hand[player].remove(card)
+                return card
+        return None
+
+    def _advance(self) -> None:
+        """一次行动之后轮到下一名玩家"""
+        self.moves += 1
+        self.current_player = (self.current_player + 1) % 4
+        self._update_can_play()
+
+    def _update_can_play(self) -> None:
+        if self.seat >= 0:
+            self.can_play_card = rules.can_play(self.hand[self.seat], self.playable_cards)
+
+    def my_turn(self) -> bool:
+        return self.playing and self.current_player == self.seat and self.hand_size[self.seat] > 0
+
+
+class RemoteClient:
+    """连接到服务器、按帧读取事件并更新牌桌镜像的客户端"""
+
+    def __init__(self, room: str = ''):
+        self.remote = RemoteTable()
+        self.room = room   # 同一房间的客户端坐到同一张牌桌上
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self, host: str, port: int) -> None:
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    def send(self, payload: bytes) -> None:
+        self.writer.write(protocol.frame(0, payload))
+
+    async def read_frame(self) -> Optional[int]:
+        """读取一帧并更新牌桌镜像，返回帧的序号，连接断开时返回 None"""
+        try:
+            header = await self.reader.readexactly(protocol.FRAME_HEADER.size)
+            length, seq = protocol.parse_frame_header(header)
+            payload = await self.reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return None
+        except ConnectionError as e:
+            self.remote.errors.append(f"连接中断：{e}")
+            return None
+        for fields in protocol.server_events(payload):
+            self.remote.apply(fields)
+        return seq
+
+
+class BotClient(RemoteClient):
+    """通过网络参与游戏的电脑玩家"""
+
+    def __init__(self, agent_class: type[AiAgent] = AiAgentNormal, room: str = ''):
+        super().__init__(room)
+        self.agent_class = agent_class
+        self.agent: Optional[AiAgent] = None
+        self.acted_at = (-1, -1)   # 上一次行动时的 (局数, 行动数)，避免同一回合重复行动
+
+    async def play(self, rounds: int = 1) -> RemoteTable:
+        """加入牌桌并进行指定局数的游戏，返回最终的牌桌镜像"""
+        self.send(protocol.hello(self.room))
+        try:
+            while self.remote.rounds_finished < rounds:
+                seq = await self.read_frame()
+                if seq is None:
+                    break
+                if self.agent is None and self.remote.seat >= 0:
+                    self.agent = self.agent_class(self.remote, self.remote.seat)
+                # 确认收到这一帧，轮到自己时把行动放在同一帧中
+                reply = protocol.ack(seq)
+                if self.remote.my_turn() and self.acted_at != (self.remote.round, self.remote.moves):
+                    self.acted_at = (self.remote.round, self.remote.moves)
+                    reply += bytes((protocol.card_id(self._choose_card().info),))
+                self.send(reply)
+        finally:
+            self.writer.close()
+        return self.remote
+
+    def _choose_card(self) -> CardModel:
+        if self.remote.can_play_card:
+            return self.agent.get_card_to_play()
+        return self.agent.get_card_to_discard()
+
+
+class SpectatorClient(RemoteClient):
+    """观看一张牌桌的观众，只接收公开的事件"""
+
+    def __init__(self, table: int = protocol.ANY_TABLE, room: str = ''):
+        super().__init__(room)
+        self.table = table
+
+    async def watch(self, rounds: int = 1) -> RemoteTable:
+        """观看牌桌直到又有指定局数的游戏结束，返回最终的牌桌镜像"""
+        self.send(protocol.watch(self.table, self.room))
+        try:
+            target = None
+            while target is None or self.remote.rounds_finished < target:
+                if await self.read_frame() is None or self.remote.errors:
+                    break
+                if target is None and self.remote.table >= 0 and self.remote.round > 0:
+                    # 第一帧快照之后才知道已经结束的局数
+                    target = self.remote.rounds_finished + rounds
+        finally:
+            self.writer.close()
+        return self.remote
+
+
+async def run_bots(host: str, port: int, bots: int, rounds: int, spectators: int = 0) -> list[RemoteTable]:
+    """同时运行多个电脑玩家客户端，返回它们各自的牌桌镜像，观众的镜像排在最后"""
+    clients = [BotClient() for _ in range(bots)]
+    for client in clients:
+        await client.connect(host, port)
+    tasks = [asyncio.ensure_future(client.play(rounds)) for client in clients]
+    if spectators > 0:
+        # 等第一名电脑玩家坐下后再观看它所在的牌桌
+        while clients[0].remote.table < 0 and not tasks[0].done():
+            await asyncio.sleep(0.01)
+        watchers = [SpectatorClient(clients[0].remote.table, clients[0].room) for _ in range(spectators)]
+        for watcher in watchers:
+            await watcher.connect(host, port)
+        tasks += [asyncio.ensure_future(watcher.watch(rounds)) for watcher in watchers]
+    return await asyncio.gather(*tasks)
+
+
+def main():
+    port = int(sys.argv[sys.argv.index('--port') + 1]) if '--port' in sys.argv else 8765
+    bots = int(sys.argv[sys.argv.index('--bots') + 1]) if '--bots' in sys.argv else 4
+    rounds = int(sys.argv[sys.argv.index('--rounds') + 1]) if '--rounds' in sys.argv else 1
+    spectators = int(sys.argv[sys.argv.index('--spectators') + 1]) if '--spectators' in sys.argv else 0
+    remotes = asyncio.run(run_bots('127.0.0.1', port, bots, rounds, spectators))
+    for remote in remotes[:bots]:
+        print(f"牌桌{remote.table} 座位{remote.seat}：分数 {remote.score}，错误 {len(remote.errors)} 个")
+    if spectators > 0:
+        errors = sum(len(remote.errors) for remote in remotes[bots:])
+        print(f"观众 {spectators} 名：最终分数 {remotes[-1].score}，错误 {errors} 个")
+
+if __name__ == '__main__':
+    main()
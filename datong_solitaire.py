@@ -1,131 +1,286 @@
+from __future__ import annotations
+# 最先开始计时，以便统计导入模块的耗时
+from startup_timeline import StartupTimeline
+startup_timeline = StartupTimeline()
+
 import sys
+import sqlite3
 import pygame
-import numpy
+from pygame import Surface
 from pygame.sprite import Sprite, Group
 from pygame.event import Event
-from pygame.mixer import Sound
-from random import shuffle, choice, random
-from functools import cmp_to_key
+from random import random
+from bisect import bisect_right
+from collections import deque
+from functools import partial
+from typing import Callable, TYPE_CHECKING
 
-from singleton import Singleton
 from settings import Settings
-from card import Card
+from card_model import CardModel
+from card_view import CardView
 from board import Board
 from button import Button
 from game_stage import GameStage
 from start_menu import StartMenu
 from game_over_menu import GameOverMenu
 from ai_agent import AiAgent, AiAgentRandom, AiAgentNormal
-from window import Window
-from rule_window import RuleWindow
-from exit_window import ExitWindow
-from stop_game_window import StopGameWindow
+from sound_bank import SoundBank
+from font_bank import FontBank
+from music_player import MusicPlayer
+from scheduler import Scheduler
+from journal import Journal
+from score_history import ScoreHistory, deal_id
+from rating import Ratings
+from table import Table
+import rules
+from asset_pack import open_asset, asset_format
 from utils import darken
 
-class DaTongSolitaire(Singleton):
+# 各个弹出窗口（以及它们用到的 ptext）在第一次打开时才导入，以加快游戏启动
+if TYPE_CHECKING:
+    from window import Window
+    from rule_window import RuleWindow
+    from exit_window import ExitWindow
+    from stop_game_window import StopGameWindow
+
+class DaTongSolitaire:
     """管理游戏资源和行为的类"""
     
-    def __init__(self):
-        """初始化游戏并创建游戏资源"""
+    def __init__(self, screen: Surface=None):
+        """初始化游戏并创建游戏资源
+        
+        不提供 screen 时创建游戏窗口，并负责播放音乐和音效；
+        提供 screen（如离屏的 Surface）时游戏只绘制到该画面上，不占用窗口和音频，由调用者推进游戏，
+        这样同一进程中可以同时运行多局互不影响的游戏（如多张牌桌或无界面的模拟）
+        """
+        startup_timeline.mark("导入模块")
         pygame.init()
         self.clock = pygame.time.Clock()
-        self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        self.owns_display = screen is None
+        if screen is not None:
+            self.screen = screen
+        elif '--windowed' in sys.argv:
+            self.screen = pygame.display.set_mode(Settings.windowed_size, pygame.RESIZABLE)
+        else:
+            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        if self.owns_display:
+            pygame.display.set_caption("大通纸牌")
+            startup_timeline.mark("初始化pygame并创建窗口")
+            self._show_splash()
+            startup_timeline.mark("显示启动画面")
         self.settings = Settings(game=self)
-        pygame.display.set_caption("大通纸牌")
         self.game_stage = GameStage.start_menu
         self.score:list[int] = [0, 0, 0, 0]
-        self.buttons = Group()
+        # 对局日志：恢复上次意外退出前的分数，被中断的一局在开始游戏时继续
+        self.journal: Journal = None
+        self.resume_table: Table = None
+        if self.owns_display and self.settings.journal.enabled:
+            self._recover_journal()
+        # 对局历史：每局的结果在后台写入数据库
+        self.score_history: ScoreHistory = None
+        if self.owns_display and self.settings.score_history.enabled:
+            self.score_history = ScoreHistory(self.settings.score_history)
+        self.ratings: Ratings = None
+        if self.owns_display and self.settings.rating.enabled:
+            self.ratings = Ratings.load(self.settings.rating.path)
         self.start_menu = StartMenu(self)
-        Card._load_card_back_image()
-        self.ai_act_event = pygame.event.custom_type()
+        startup_timeline.mark("创建开始界面")
+        self.sim_speed = 1   # 游戏逻辑相对于真实时间的速度倍率，大于1时快进
+        self.sim_accumulator = 0   # 尚未推进的游戏逻辑时间（毫秒）
+        self.scheduler = Scheduler()   # 对局中的定时动作（如电脑出牌），随游戏暂停
+        self.cue_scheduler = Scheduler()   # 音效等演出的定时动作，不随游戏暂停
         self.windows: list[Window] = []
-        pygame.mixer.init()
-        self.start_menu_music = Sound(choice(self.settings.start_menu_music))
-        self.start_menu_music.play()
-        self.discard_sound = Sound('music/音效/要不起.mp3')
+        self.window_pool: dict[type, Window] = {}   # 创建过的弹出窗口，关闭后留待下次打开时重复使用
+        self.card_view = CardView(self)
+        self.music_player: MusicPlayer = None
+        self.sound_bank: SoundBank = None
+        if self.owns_display:
+            pygame.mixer.init()
+            # 背景音乐以流的方式播放，无需在启动时解码整首音乐
+            self.music_player = MusicPlayer(self.settings.music_fade_ms)
+            self.music_player.play_playlist(self.settings.start_menu_music)
+            self.sound_bank = SoundBank(self.settings.sound_bank)
+            startup_timeline.mark("播放背景音乐")
         self.discovered = False
+        self.easter_egg_playing = False
+        self.pending_events: list[Event] = []   # 空闲等待时收到的事件，留给下一次事件检查处理
+        self.last_input_time = pygame.time.get_ticks()
+        self.window_focused = True
+        self.window_minimized = False
+        
+        # 其余资源在显示开始界面后每帧加载一项
+        self.loading_tasks: deque[tuple[str, Callable[[], None]]] = deque()
+        self.loading_tasks.append(("加载卡背图像", self.card_view._load_card_back_image))
+        for suit in range(4):
+            for rank in range(1, 13+1):
+                self.loading_tasks.append(("加载卡牌图像", partial(self.card_view._load_card_image, suit, rank)))
+        self._queue_font_tasks()
+        self.show_startup_report = self.owns_display and '--startup-report' in sys.argv
+    
+    def _recover_journal(self):
+        """从对局日志恢复分数和被中断的一局"""
+        self.journal = Journal(self.settings.journal)
+        table = Table(0, self.settings)
+        if self.journal.recover(table):
+            self.score = table.score
+            if table.playing:
+                self.resume_table = table
+        startup_timeline.mark("恢复对局日志")
+    
+    def _show_splash(self):
+        """在加载其余资源之前先显示启动画面"""
+        self.screen.fill(Settings.Color.olivedrab)
+        title = pygame.image.load(open_asset('images/title.png'), asset_format('images/title.png'))
+        self.screen.blit(title, title.get_rect(center=self.screen.get_rect().center))
+        pygame.display.flip()
+    
+    def _queue_font_tasks(self):
+        """将界面中用到的各个字号的字体加入加载队列，按设置同时准备要显示的字符"""
+        if not self.settings.font.preload:
+            return
+        font_bank = FontBank()
+        for size, text in self.settings.font_texts().items():
+            self.loading_tasks.append(("加载字体", partial(font_bank.get, self.settings.font_path, size)))
+            if self.settings.font.prepare_glyphs:
+                self.loading_tasks.append(("准备字形", partial(font_bank.prepare_glyphs, self.settings.font_path, size, [text])))
+    
+    def _load_next_asset(self):
+        """加载一项尚未加载的资源，全部加载完毕后按需输出启动时间线"""
+        if not self.loading_tasks:
+            return
+        phase, task = self.loading_tasks.popleft()
+        startup_timeline.skip()
+        task()
+        startup_timeline.mark(phase)
+        if not self.loading_tasks and self.show_startup_report:
+            print(startup_timeline.report())
+    
+    def _finish_loading(self):
+        """立即加载所有尚未加载的资源"""
+        while self.loading_tasks:
+            self._load_next_asset()
     
     def new_game(self):
         """重置游戏的所有状态，以开始一场新的游戏"""
-        pygame.mixer.fadeout(1000)
+        if self.music_player:
+            pygame.mixer.fadeout(1000)
+            self.music_player.stop(fade_ms=1000)
+        self._finish_loading()
         self.game_stage = GameStage.playing
-        self.board = Board()
-        self.stop_button = Button(
-            msg=self.settings.field.stop_button.msg,
-            width=self.settings.field.stop_button.width,
-            height=self.settings.field.stop_button.height,
-            x=self.settings.field.stop_button.centerx,
-            y=self.settings.field.stop_button.centery,
-            button_color=self.settings.field.stop_button.color,
-            font_size=self.settings.field.stop_button.font_size
-        )
-        self.hand: list[Group] = [Group(), Group(), Group(), Group()]
-        self.trashed_cards: list[Group] = [Group(), Group(), Group(), Group()]
-        self.played_cards_less_7: list[list[Card]] = [[], [], [], []]
-        self.played_cards_greater_7: list[list[Card]] = [[], [], [], []]
-        self.played_cards_7: list[list[Card]] = [[], [], [], []]
+        self.board = Board(self)
+        self._create_stop_button()
+        self.trashed_cards: list[list[CardModel]] = [[], [], [], []]
+        self.played_cards_less_7: list[list[CardModel]] = [[], [], [], []]
+        self.played_cards_greater_7: list[list[CardModel]] = [[], [], [], []]
+        self.played_cards_7: list[list[CardModel]] = [[], [], [], []]
+        self.card_view.reset()
         # self.ai_player:list[AiAgent] = [AiAgentRandom(0), AiAgentRandom(1), AiAgentRandom(2), AiAgentRandom(3)]
-        self.ai_player: list[AiAgent] = [AiAgentNormal(0), AiAgentNormal(1), AiAgentNormal(2), AiAgentNormal(3)]
+        self.ai_player: list[AiAgent] = [AiAgentNormal(self, i) for i in range(4)]
         
         # 生成卡牌，洗牌并发牌
-        cards = [(i, j) for i in range(4) for j in range(1, 13+1)]
-        shuffle(cards)
-        for i in range(4):
-            hand_cards = cards[i*13:(i+1)*13]
-            hand_cards.sort(key=cmp_to_key(Card.cmp))
-            if (0, 7) in hand_cards:
-                start_player = i
-            for card_tuple in hand_cards:
-                Card(*card_tuple, i, self.hand[i])
+        self.hand, start_player = rules.deal()
         
         # 将非己方手牌设置为不可见
         for i in range(1, 4):
             for card in self.hand[i]:
-                card.to_invisible()
+                card.visible = False
         
         # 状态
-        self.focused_card: Card = None
+        self.focused_card: CardModel = None
         self.playable_cards: list[tuple] = [(0, 7)]   # 开局只能出黑桃7
         self.start_player = start_player
         self.current_player = start_player
         self.can_play_card = True   # 根据规则，当前玩家是否能出牌
         self.end_turn = False
+        self.cards_moved = True   # 卡牌是否移动过，需要重新计算布局
+        self.last_mouse_pos = None
+        self.scheduler.cancel_all()
+        self.scheduler.resume()
+        # 彩蛋播放期间开始新的一局时，剩下的音效和音乐不再播放
+        self.cue_scheduler.cancel_all()
+        self.easter_egg_playing = False
+        
+        self.deal_id = deal_id(self.hand)   # 从对局日志恢复的一局不知道发牌，为 None
+        if self.resume_table is not None:
+            self._resume_round()
+            self.deal_id = None
+        if self.journal:
+            self.journal.record_deal(self)
         
-        # 如果黑桃7在电脑玩家手中，则设置计时器
+        # 如果当前玩家（开局时为持有黑桃7的玩家）是电脑玩家，则开始计时
         if self.current_player != 0:
-            pygame.time.set_timer(self.ai_act_event, self.settings.ai_act_interval, 4 - self.current_player)
+            self.scheduler.schedule(self.settings.ai_act_interval, self._ai_act)
         
+    def _resume_round(self):
+        """用从对局日志恢复的状态代替新发的牌，继续上次被中断的一局"""
+        table = self.resume_table
+        self.resume_table = None
+        self.hand = table.hand
+        self.trashed_cards = table.trashed_cards
+        self.start_player = table.start_player
+        self.current_player = table.current_player
+        self.playable_cards = table.playable_cards
+        self.can_play_card = table.can_play_card
+        for i in range(1, 4):
+            for card in self.hand[i] + self.trashed_cards[i]:
+                card.visible = False
+        # 不在手中也没有被弃置的牌按接龙的顺序放回场上（场上的牌不属于任何玩家）
+        held = {card.info for cards in self.hand + self.trashed_cards for card in cards}
+        for suit in range(4):
+            if (suit, 7) in held:
+                continue
+            self.played_cards_7[suit].append(CardModel(suit, 7, -1))
+            for rank in range(6, 0, -1):
+                if (suit, rank) in held:
+                    break
+                self.played_cards_less_7[suit].append(CardModel(suit, rank, -1))
+            for rank in range(8, 14):
+                if (suit, rank) in held:
+                    break
+                self.played_cards_greater_7[suit].append(CardModel(suit, rank, -1))
+    
+    def _create_stop_button(self):
+        """创建游戏时的暂停按钮"""
+        self.stop_button = Button(
+            self,
+            msg=self.settings.field.stop_button.msg,
+            width=self.settings.field.stop_button.width,
+            height=self.settings.field.stop_button.height,
+            x=self.settings.field.stop_button.centerx,
+            y=self.settings.field.stop_button.centery,
+            button_color=self.settings.field.stop_button.color,
+            font_size=self.settings.field.stop_button.font_size
+        )
+        self.field_buttons = Group(self.stop_button)
+    
     def new_test_game(self):
         """重置游戏的所有状态，以开始一场新的测试游戏"""
+        self._finish_loading()
         self.game_stage = GameStage.testing
-        self.board = Board()
-        self.hand: list[Group] = [Group(), Group(), Group(), Group()]
-        self.trashed_cards: list[Group] = [Group(), Group(), Group(), Group()]
-        self.played_cards_less_7: list[list[Card]] = [[], [], [], []]
-        self.played_cards_greater_7: list[list[Card]] = [[], [], [], []]
-        self.played_cards_7: list[list[Card]] = [[], [], [], []]
+        self.board = Board(self)
+        self.trashed_cards: list[list[CardModel]] = [[], [], [], []]
+        self.played_cards_less_7: list[list[CardModel]] = [[], [], [], []]
+        self.played_cards_greater_7: list[list[CardModel]] = [[], [], [], []]
+        self.played_cards_7: list[list[CardModel]] = [[], [], [], []]
+        self.card_view.reset()
         
         # 生成卡牌，洗牌并发牌
-        cards = []
-        for i in range(4):
-            for j in range(1, 13+1):
-                cards.append((i, j))
-        shuffle(cards)
-        for i in range(4):
-            hand_cards = cards[i*13:(i+1)*13]
-            hand_cards.sort(key=cmp_to_key(Card.cmp))
-            if (0, 7) in hand_cards:
-                start_player = i
-            for card_tuple in hand_cards:
-                Card(*card_tuple, i, self.hand[i])
+        self.hand, start_player = rules.deal()
         
         # 状态
-        self.focused_card: Card = None
+        self.focused_card: CardModel = None
         self.playable_cards: list[tuple] = [(0, 7)]   # 开局只能出黑桃7
         self.start_player = start_player
         self.current_player = start_player
         self.can_play_card = True   # 根据规则，当前玩家是否能出牌
         self.end_turn = False
+        self.cards_moved = True   # 卡牌是否移动过，需要重新计算布局
+        self.last_mouse_pos = None
+        self.scheduler.cancel_all()
+        self.scheduler.resume()
+        # 彩蛋播放期间开始新的一局时，剩下的音效和音乐不再播放
+        self.cue_scheduler.cancel_all()
+        self.easter_egg_playing = False
     
     # def new_test_game_one_card_per_player(self):
     #     """重置游戏的所有状态，以开始一场新的测试游戏，测试游戏中每名玩家只有一张牌，以便快速测试游戏结束的场景"""
@@ -160,45 +315,166 @@ class DaTongSolitaire(Singleton):
     
     def run_game(self):
         """开始游戏的主循环"""
+        self._update_screen()
+        startup_timeline.mark("绘制开始界面")
         while True:
             self._check_events()
+            self._run_simulation()
             self._update_objects()
-            self._update_screen()
-            self.clock.tick(30)
+            # 窗口失去焦点或最小化时画面不可见，无需绘制
+            if self.window_focused and not self.window_minimized:
+                self._update_screen()
+            self._load_next_asset()
+            self._wait_for_next_frame()
+    
+    def _wait_for_next_frame(self):
+        """等待到下一帧，空闲时阻塞等待事件以降低CPU占用"""
+        idle_time = pygame.time.get_ticks() - self.last_input_time
+        if self._is_animating() or idle_time < self.settings.idle_delay:
+            self.clock.tick(self.settings.fps)
+            return
+        # 空闲时最多等待一个低帧率的周期，有任何事件（包括输入和电脑出牌计时器）都会立即唤醒
+        event = pygame.event.wait(1000 // self.settings.idle_fps)
+        if event.type != pygame.NOEVENT:
+            self.pending_events.append(event)
+        self.clock.tick()
+    
+    def _is_animating(self) -> bool:
+        """画面是否会在没有输入的情况下发生变化，如电脑玩家即将出牌"""
+        if self.loading_tasks or self.cue_scheduler.pending():
+            return True
+        if self.game_stage not in (GameStage.playing, GameStage.testing):
+            return False
+        if self.end_turn:
+            return True
+        return self.scheduler.pending() and not self.scheduler.paused
+    
+    def _run_simulation(self):
+        """按上一帧经过的时间，以固定步长推进游戏逻辑
+        
+        游戏逻辑与绘制分离：一帧中可以推进多步逻辑（如快进时），不绘制时逻辑也照常推进
+        """
+        self.sim_accumulator += self.clock.get_time() * self.sim_speed
+        steps = 0
+        while self.sim_accumulator >= self.settings.sim_tick:
+            if steps == self.settings.max_sim_steps:
+                # 落后太多时放弃追赶，以免逻辑推进占满整帧
+                self.sim_accumulator = 0
+                break
+            self._simulate()
+            self.sim_accumulator -= self.settings.sim_tick
+            steps += 1
+    
+    def _simulate(self):
+        """推进一个固定步长的游戏逻辑"""
+        self.cue_scheduler.advance(self.settings.sim_tick)
+        if self.game_stage == GameStage.playing:
+            self.scheduler.advance(self.settings.sim_tick)
+            if self.end_turn:
+                self._next_turn()
+        elif self.game_stage == GameStage.testing:
+            if self.end_turn:
+                self._next_turn()
 
     def _update_objects(self):
         """更新游戏中的物体属性等"""
-        self.buttons.update()
+        self._active_buttons().update()
         if self.game_stage == GameStage.start_menu:
             pass
         elif self.game_stage == GameStage.playing:
             self.board.update()
             self._update_cards()
-            if self.end_turn:
-                self._next_turn()
         elif self.game_stage == GameStage.testing:
             self.board.update()
             self._update_cards()
-            if self.end_turn:
-                self._next_turn()
         elif self.game_stage == GameStage.game_over_menu:
             self.game_over_menu.update()
 
+    def _active_buttons(self) -> Group:
+        """当前能响应鼠标的按钮：有窗口时为最上层窗口的按钮，否则为当前界面的按钮"""
+        if self.windows:
+            return self.windows[-1].buttons
+        if self.game_stage == GameStage.start_menu:
+            return self.start_menu.buttons
+        elif self.game_stage == GameStage.playing:
+            return self.field_buttons
+        elif self.game_stage == GameStage.game_over_menu:
+            return self.game_over_menu.buttons
+        return Group()
+
     def _check_events(self):
         """响应按键和鼠标事件"""
-        for event in pygame.event.get():
+        events = self.pending_events + pygame.event.get()
+        self.pending_events = []
+        resized = False
+        for event in events:
             if event.type == pygame.QUIT:
-                sys.exit()
+                self._quit()
+            if self.music_player and self.music_player.check_event(event):
+                continue
+            if event.type == pygame.VIDEORESIZE:
+                # 拖动窗口边缘时会连续产生多个事件，处理完本批事件后只重新布局一次
+                resized = True
+                continue
+            if event.type in (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP,
+                              pygame.MOUSEWHEEL, pygame.KEYDOWN, pygame.KEYUP):
+                self.last_input_time = pygame.time.get_ticks()
+            elif self._check_window_state_events(event):
+                continue
             # 对不同场景进行分类处理
             if self.windows:
                 self._check_events_with_window(event, self.windows[-1])
             else:
                 self._check_events_without_window(event)
-            
-            
+        if resized:
+            self._resize()
+    
+    def _resize(self):
+        """窗口大小改变后，重新计算布局，并按新的大小重建界面元素和卡牌图像"""
+        if self.owns_display:
+            self.screen = pygame.display.get_surface()
+        self.settings.update_screen_size()
+        self.last_input_time = pygame.time.get_ticks()
+        self.card_view.rescale()
+        # 新的字号在之后的帧中加载，已加载过的字号直接从字体库中获取
+        self._queue_font_tasks()
+        self.start_menu = StartMenu(self)
+        # 缓存的窗口按旧的大小绘制，全部丢弃后按新的大小重新创建
+        self.window_pool.clear()
+        self.windows = [self._get_window(type(window)) for window in self.windows]
+        if not hasattr(self, 'hand'):
+            return
+        
+        self.board = Board(self)
+        self.board.update()
+        if hasattr(self, 'stop_button'):
+            self._create_stop_button()
+        if self.game_stage == GameStage.game_over_menu:
+            self.game_over_menu = GameOverMenu(self, *self.game_over_result)
+        self.cards_moved = True
+        self.last_mouse_pos = None
+
+    def _check_window_state_events(self, event: Event) -> bool:
+        """记录游戏窗口的焦点和最小化状态，返回事件是否为窗口状态事件"""
+        if event.type == pygame.WINDOWFOCUSLOST:
+            self.window_focused = False
+        elif event.type == pygame.WINDOWFOCUSGAINED:
+            self.window_focused = True
+        elif event.type == pygame.WINDOWMINIMIZED:
+            self.window_minimized = True
+        elif event.type in (pygame.WINDOWRESTORED, pygame.WINDOWMAXIMIZED, pygame.WINDOWSHOWN):
+            self.window_minimized = False
+        else:
+            return False
+        # 窗口重新可见时立即以全帧率刷新
+        self.last_input_time = pygame.time.get_ticks()
+        return True
 
     def _check_events_with_window(self, event: Event, window: Window):
         """有弹出窗口时的事件检查"""
+        from rule_window import RuleWindow
+        from exit_window import ExitWindow
+        from stop_game_window import StopGameWindow
         if isinstance(window, RuleWindow):
             self._check_events_with_rule_window(event, window)
         elif isinstance(window, ExitWindow):
@@ -223,7 +499,7 @@ class DaTongSolitaire(Singleton):
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == pygame.BUTTON_LEFT:
             mouse_pos = pygame.mouse.get_pos()
             if window.confirm_button.abs_rect.collidepoint(mouse_pos):
-                sys.exit()
+                self._quit()
             elif window.cancel_button.abs_rect.collidepoint(mouse_pos):
                 self.windows.pop()
                 self._continue_game()
@@ -324,15 +600,6 @@ class DaTongSolitaire(Singleton):
                     self._on_focused_card_clicked()
             if self.stop_button.abs_rect.collidepoint(mouse_pos):
                 self._open_stop_game_window()
-        
-        # 如果是电脑出牌事件
-        elif event.type == self.ai_act_event:
-            if self.can_play_card:
-                card = self.ai_player[self.current_player].get_card_to_play()
-                self._play_card(card)
-            else:
-                card = self.ai_player[self.current_player].get_card_to_discard()
-                self._discard_card(card)
     
     def _check_events_in_testing_game(self, event: Event):
         # 如果左键点击
@@ -355,32 +622,68 @@ class DaTongSolitaire(Singleton):
                 elif self.game_over_menu.exit_button.rect.collidepoint(mouse_pos):
                     self.exit_confirm()
     
+    def _get_window(self, window_class: type) -> Window:
+        """获取指定类型的弹出窗口，第一次打开时创建，之后重复使用"""
+        window = self.window_pool.get(window_class)
+        if window is None:
+            window = window_class(self)
+            self.window_pool[window_class] = window
+        else:
+            window.reset()
+        return window
+    
     def _open_stop_game_window(self):
         """打开游戏暂停窗口"""
+        from stop_game_window import StopGameWindow
         self._stop_game()
-        self.windows.append(StopGameWindow())
+        self.windows.append(self._get_window(StopGameWindow))
         
 
     def open_rule(self):
         """打开游戏规则界面"""
+        from rule_window import RuleWindow
         self.game_stage = GameStage.rule
-        rule_window = RuleWindow()
+        rule_window = self._get_window(RuleWindow)
         self.windows.append(rule_window)
     
     def _stop_game(self):
+        if self.music_player:
+            self.music_player.pause()
         if self.game_stage == GameStage.playing:
-            pygame.time.set_timer(self.ai_act_event, 0, loops=3)
+            self.scheduler.pause()
     
     def _continue_game(self):
-        if self.game_stage == GameStage.playing:
-            if self.current_player != 0:
-                pygame.time.set_timer(self.ai_act_event, self.settings.ai_act_interval, loops=4 - self.current_player)
+        # 关闭叠在暂停窗口之上的窗口时，游戏仍处于暂停状态
+        if self.windows:
+            return
+        if self.music_player:
+            self.music_player.unpause()
+        # 彩蛋播放完毕前游戏保持暂停
+        if self.game_stage == GameStage.playing and not self.easter_egg_playing:
+            self.scheduler.resume()
     
     def exit_confirm(self):
         """确认退出"""
-        self.windows.append(ExitWindow())
+        from exit_window import ExitWindow
+        self.windows.append(self._get_window(ExitWindow))
         self._stop_game()
     
+    def _quit(self):
+        """退出游戏，退出前等待对局日志和对局历史的写入线程把剩余的记录写入磁盘，并保存等级分"""
+        if self.journal:
+            try:
+                self.journal.close()
+            except OSError as e:
+                print(f"对局日志写入失败：{e}")
+        if self.score_history:
+            try:
+                self.score_history.close()
+            except (sqlite3.Error, OSError) as e:
+                print(f"对局历史写入失败：{e}")
+        if self.ratings:
+            self.ratings.save(self.settings.rating.path)
+        sys.exit()
+    
     def _next_turn(self):
         """即将进入下一个玩家的回合"""
         self.end_turn = False
@@ -389,50 +692,55 @@ class DaTongSolitaire(Singleton):
         if not any(self.hand):
             self._end_game()
             return
-
-        # 玩家打出牌后开始计时，每过一秒电脑行动一次
-        if self.current_player == 0:
-            pygame.time.set_timer(self.ai_act_event, self.settings.ai_act_interval, loops=3)
         
         # 更新当前玩家 和 当前玩家是否可出牌的状态
         self.current_player = (self.current_player + 1) % 4
-        self.can_play_card = False
-        for card in self.hand[self.current_player]:
-            if card.info in self.playable_cards:
-                self.can_play_card = True
-                break
+        self.can_play_card = rules.can_play(self.hand[self.current_player], self.playable_cards)
+        
+        # 轮到电脑玩家时开始计时，一秒后电脑行动
+        if self.game_stage == GameStage.playing and self.current_player != 0:
+            self.scheduler.schedule(self.settings.ai_act_interval, self._ai_act)
+    
+    def _ai_act(self):
+        """当前的电脑玩家出牌或弃牌"""
+        if self.can_play_card:
+            card = self.ai_player[self.current_player].get_card_to_play()
+            self._play_card(card)
+        else:
+            card = self.ai_player[self.current_player].get_card_to_discard()
+            self._discard_card(card)
     
     def _end_game(self):
         """游戏结束时的结算"""
         # 如果还在计时，则停止计时
-        pygame.time.set_timer(self.ai_act_event, 0)
+        self.scheduler.cancel_all()
         
-        score_multiply_power = 1
-        # 弃牌点数加总
-        points = [0, 0, 0, 0]
-        for i, player_trashed_cards in enumerate(self.trashed_cards):
-            for card in player_trashed_cards:
-                points[i] += card.rank
-        # 后手玩家惩罚点数
+        sorted_player_points_pairs, score_multiply_power, deltas = rules.settle(
+            self.trashed_cards, self.start_player, self.settings.base_score
+        )
         for i in range(4):
-            points[(self.start_player + i) % 4] += i / 10
-        # 排序得出分数
-        sorted_player_points_pairs = sorted(enumerate(points), key=lambda x: x[1])
-        if sorted_player_points_pairs[0][1] < 1:
-            score_multiply_power = 2   # 大通
-        for i, pair in enumerate(sorted_player_points_pairs):
-            self.score[pair[0]] += self.settings.base_score[i] * score_multiply_power
+            self.score[i] += deltas[i]
+        if self.game_stage == GameStage.playing and self.score_history:
+            self.score_history.record_round(
+                self.deal_id, self.start_player, sorted_player_points_pairs, score_multiply_power, deltas, self.settings.player_name
+            )
+        if self.game_stage == GameStage.playing and self.ratings:
+            self.ratings.record(
+                [self.settings.player_name[player] for player, _ in sorted_player_points_pairs],
+                [deltas[player] for player, _ in sorted_player_points_pairs]
+            )
         
         self.game_stage = GameStage.game_over_menu
-        self.game_over_menu = GameOverMenu(self, sorted_player_points_pairs, score_multiply_power)
+        self.game_over_result = (sorted_player_points_pairs, score_multiply_power)   # 窗口大小改变时用于重建游戏结束菜单
+        self.game_over_menu = GameOverMenu(self, *self.game_over_result)
         
         if sorted_player_points_pairs[0][0] == 0:
             if score_multiply_power == 1:
-                self.game_over_menu.win_sound.play()
+                self._play_sound(self.settings.sound.win)
             elif score_multiply_power == 2:
-                self.game_over_menu.datong_sound.play()
+                self._play_sound(self.settings.sound.datong)
         else:
-            self.game_over_menu.lose_sound.play()
+            self._play_sound(self.settings.sound.lose)
     
     def _on_focused_card_clicked(self):
         """当聚焦的卡牌被点击时"""
@@ -448,9 +756,9 @@ class DaTongSolitaire(Singleton):
         else:
             print("不能打出此牌！")
     
-    def _play_card(self, card: Card):
+    def _play_card(self, card: CardModel):
         """当前玩家打出指定的卡牌"""
-        card.to_visible()
+        card.visible = True
         # 将此牌从手中移动到场上
         if card.rank < 7:
             self.played_cards_less_7[card.suit].append(card)
@@ -459,63 +767,66 @@ class DaTongSolitaire(Singleton):
         else:
             self.played_cards_7[card.suit].append(card)
         self.hand[self.current_player].remove(card)
+        self.cards_moved = True
+        self._record_move(card)
         
         # 更新可打出牌的列表
-        self.playable_cards.remove(card.info)
-        card.playable = False
-        if card.info == (0, 7):
-            for i in range(1, 4):
-                self.playable_cards.append((i, 7))
-            self.playable_cards.append((0, 6))
-            self.playable_cards.append((0, 8))
-        elif card.rank == 7:
-            self.playable_cards.append((card.suit, 6))
-            self.playable_cards.append((card.suit, 8))
-        elif card.rank == 1 or card.rank == 13:
-            pass
-        elif card.rank < 7:
-            self.playable_cards.append((card.suit, card.rank - 1))
-        elif card.rank > 7:
-            self.playable_cards.append((card.suit, card.rank + 1))
-        else:
-            raise Exception("We met a mistake in updating playable_cards!")
-
-        for hand in self.hand:
-            for hand_card in hand:
-                if hand_card.info in self.playable_cards:
-                    hand_card.playable = True
+        rules.update_playable_cards(self.playable_cards, self.hand, card)
         
         self.end_turn = True
         
         # 埋个彩蛋
-        if card.info == (1, 13) and self.current_player == 0 and random() < 0.2 and not self.discovered:
-            self._stop_game()
-            extra_sound1 = Sound('music/cards/梅花13.mp3')
-            extra_sound1.play()
-            pygame.time.wait(3000)
-            extra_sound2 = Sound('music/cards/梅花567.mp3')
-            extra_sound2.play(fade_ms=2000)
-            pygame.time.wait(10000)
-            extra_sound2.fadeout(2000)
-            pygame.time.wait(2000)
-            extra_sound3 = Sound('music/彩蛋.mp3')
-            extra_sound3.play()
-            pygame.time.wait(1000)
-            self._continue_game()
-            self.discovered = True
+        if card.info == (1, 13) and self.current_player == 0 and random() < 0.2 and not self.discovered and self.owns_display:
+            self._play_easter_egg()
             return
         
-        card.sound.play()
+        self._play_sound(card.sound_path)
+    
+    def _record_move(self, card: CardModel):
+        """把当前玩家的行动记入对局日志（测试游戏不记录）"""
+        if self.game_stage == GameStage.playing and self.journal:
+            self.journal.record_move(card.info)
+    
+    def _play_sound(self, path: str):
+        """播放音效，不占用音频的游戏（如离屏的对局）不播放"""
+        if self.sound_bank:
+            self.sound_bank.play(path)
     
-    def _discard_card(self, card: Card):
+    def _play_easter_egg(self):
+        """播放彩蛋，播放期间游戏暂停，但窗口仍能正常响应"""
+        self.easter_egg_playing = True
+        self.discovered = True
+        self._stop_game()
+        extra_sound1 = self.sound_bank.get(self.settings.sound.easter_egg[0])
+        extra_sound2 = self.sound_bank.get(self.settings.sound.easter_egg[1])
+        self.cue_scheduler.schedule(0, extra_sound1.play)
+        self.cue_scheduler.schedule(3000, lambda: extra_sound2.play(fade_ms=2000))
+        self.cue_scheduler.schedule(13000, lambda: extra_sound2.fadeout(2000))
+        self.cue_scheduler.schedule(15000, self._play_easter_egg_music)
+        self.cue_scheduler.schedule(16000, self._end_easter_egg)
+    
+    def _play_easter_egg_music(self):
+        """彩蛋的音乐，打开着窗口（游戏暂停）时先暂停，关闭窗口后与游戏一起继续"""
+        self.music_player.play(self.settings.easter_egg_music)
+        if self.windows:
+            self.music_player.pause()
+    
+    def _end_easter_egg(self):
+        """彩蛋播放完毕，继续游戏"""
+        self.easter_egg_playing = False
+        self._continue_game()
+    
+    def _discard_card(self, card: CardModel):
         """当前玩家弃置指定的卡牌"""
-        self.discard_sound.play()
+        self._play_sound(self.settings.sound.discard)
         # 将此牌从手中移动到弃牌堆
-        self.trashed_cards[self.current_player].add(card)
+        self.trashed_cards[self.current_player].append(card)
         self.hand[self.current_player].remove(card)
+        self.cards_moved = True
+        self._record_move(card)
         
-        # 改变被弃牌的UI
-        card.to_discard_UI()
+        # 被弃置的卡牌由 CardView 绘制为变暗的图像
+        card.discarded = True
         
         self.end_turn = True
             
@@ -548,106 +859,167 @@ class DaTongSolitaire(Singleton):
                 covered.blitme()
             darken(self.screen)
             self.windows[-1].blitme()
-            
-        pygame.display.flip()
+        
+        if self.owns_display:
+            pygame.display.flip()
     
     def _update_cards(self):
-        """更新所有卡牌的图像"""
+        """更新所有卡牌的位置，以及鼠标聚焦的卡牌"""
+        mouse_pos = pygame.mouse.get_pos()
+        if self.cards_moved:
+            self._layout_cards()
+        elif mouse_pos == self.last_mouse_pos:
+            # 卡牌和鼠标都没有移动，无需做任何计算
+            return
+        self.last_mouse_pos = mouse_pos
+        self._update_focused_card(mouse_pos)
+    
+    def _layout_cards(self):
+        """重新计算所有卡牌的位置，只需在手牌、弃牌堆或场上卡牌变化时调用"""
+        self.cards_moved = False
         
         #  设置我的手牌位置
         left_margin = (self.settings.screen_width
                        - (len(self.hand[0])+len(self.trashed_cards[0])-1) * self.settings.card.hand_xspacing
                        - self.settings.card.width) // 2
-        for i, card in enumerate(self.hand[0].sprites() + self.trashed_cards[0].sprites()):
-            card.rect.left = left_margin + i * self.settings.card.hand_xspacing
-            card.rect.bottom = self.settings.screen_height + 0.6 * self.settings.card.height
+        for i, card in enumerate(self.hand[0] + self.trashed_cards[0]):
+            rect = self.card_view.rect(card)
+            rect.left = left_margin + i * self.settings.card.hand_xspacing
+            rect.bottom = self.settings.screen_height + 0.6 * self.settings.card.height
         
         # 设置右侧玩家手牌位置
         top_margin = (self.settings.screen_height
                        - (len(self.hand[1])+len(self.trashed_cards[1])-1) * self.settings.card.hand_yspacing
                        - self.settings.card.height) // 2
-        for i, card in enumerate(self.hand[1].sprites() + self.trashed_cards[1].sprites()):
-            card.rect.top = top_margin + i * self.settings.card.hand_yspacing
-            card.rect.right = self.settings.screen_width + 0.6 * self.settings.card.width
+        for i, card in enumerate(self.hand[1] + self.trashed_cards[1]):
+            rect = self.card_view.rect(card)
+            rect.top = top_margin + i * self.settings.card.hand_yspacing
+            rect.right = self.settings.screen_width + 0.6 * self.settings.card.width
         
         # 设置对侧玩家的手牌位置
         right_margin = (self.settings.screen_width
                        - (len(self.hand[2])+len(self.trashed_cards[2])-1) * self.settings.card.hand_xspacing
                        - self.settings.card.width) // 2
-        for i, card in enumerate(self.hand[2].sprites() + self.trashed_cards[2].sprites()):
-            card.rect.right = self.settings.screen_width - (right_margin + i * self.settings.card.hand_xspacing)
-            card.rect.top = 0 - 0.6 * self.settings.card.height
+        for i, card in enumerate(self.hand[2] + self.trashed_cards[2]):
+            rect = self.card_view.rect(card)
+            rect.right = self.settings.screen_width - (right_margin + i * self.settings.card.hand_xspacing)
+            rect.top = 0 - 0.6 * self.settings.card.height
         
         # 设置左侧玩家手牌位置
         top_margin = (self.settings.screen_height
                        - (len(self.hand[3])+len(self.trashed_cards[3])-1) * self.settings.card.hand_yspacing
                        - self.settings.card.height) // 2
-        for i, card in enumerate(self.hand[3].sprites() + self.trashed_cards[3].sprites()):
-            card.rect.top = top_margin + i * self.settings.card.hand_yspacing
-            card.rect.left = 0 - 0.6 * self.settings.card.width
+        for i, card in enumerate(self.hand[3] + self.trashed_cards[3]):
+            rect = self.card_view.rect(card)
+            rect.top = top_margin + i * self.settings.card.hand_yspacing
+            rect.left = 0 - 0.6 * self.settings.card.width
         
         # 设置场上卡牌位置
         for i in range(4):
             for j, card in enumerate(reversed(self.played_cards_greater_7[i])):
-                card.rect.centerx = self.settings.field.left_margin + i * self.settings.field.xspacing
+                rect = self.card_view.rect(card)
+                rect.centerx = self.settings.field.left_margin + i * self.settings.field.xspacing
                 n = len(self.played_cards_greater_7[i])
-                card.rect.centery = self.settings.screen_height // 2 - (n-j) * self.settings.field.yspacing
+                rect.centery = self.settings.screen_height // 2 - (n-j) * self.settings.field.yspacing
 
         for i in range(4):
             for j, card in enumerate(self.played_cards_7[i]):
-                card.rect.centerx = self.settings.field.left_margin + i * self.settings.field.xspacing
-                card.rect.centery = self.settings.screen_height // 2
+                rect = self.card_view.rect(card)
+                rect.centerx = self.settings.field.left_margin + i * self.settings.field.xspacing
+                rect.centery = self.settings.screen_height // 2
         
         for i in range(4):
             for j, card in enumerate(self.played_cards_less_7[i]):
-                card.rect.centerx = self.settings.field.left_margin + i * self.settings.field.xspacing
-                card.rect.centery = self.settings.screen_height // 2 + (j+1) * self.settings.field.yspacing
+                rect = self.card_view.rect(card)
+                rect.centerx = self.settings.field.left_margin + i * self.settings.field.xspacing
+                rect.centery = self.settings.screen_height // 2 + (j+1) * self.settings.field.yspacing
         
-        # 检测鼠标是否聚焦手牌
+        # 布局重置后，所有手牌都不再处于聚焦（抬起）状态
         self.focused_card = None
-        pos = pygame.mouse.get_pos()
-        for i, hand in enumerate(self.hand):
-            for card in reversed(hand.sprites()):
-                # 检测鼠标是否聚焦手牌
-                if not self.focused_card and card.rect.collidepoint(pos):
-                    self.focused_card = card
-                    card.focused = True
-                    if i == 0:
-                        card.rect.bottom = self.settings.screen_height
-                    elif i == 1:
-                        card.rect.right = self.settings.screen_width
-                    elif i == 2:
-                        card.rect.top = 0
-                    elif i == 3:
-                        card.rect.left = 0
-                    else:
-                        raise Exception("Too many hand!")
-                else:
-                    card.focused = False
+        self._build_hand_index()
+    
+    def _build_hand_index(self):
+        """为每名玩家的手牌建立按位置排序的索引，以便用二分查找确定鼠标指向的卡牌
+        
+        每名玩家的手牌按绘制顺序排列，后绘制的卡牌覆盖在先绘制的卡牌之上。
+        索引的键值随绘制顺序递增，因此键值不大于鼠标坐标的最后一张卡牌就是鼠标指向的最上层卡牌。
+        """
+        self.hand_index: list[tuple[list[int], list[CardModel]]] = []
+        for i, cards in enumerate(self.hand):
+            rects = [self.card_view.rect(card) for card in cards]
+            if i == 0:
+                keys = [rect.left for rect in rects]
+            elif i == 2:
+                # 对侧玩家的手牌从右向左排列，以右边界的相反数作为键值
+                keys = [1 - rect.right for rect in rects]
+            else:
+                keys = [rect.top for rect in rects]
+            self.hand_index.append((keys, list(cards)))
+    
+    def _update_focused_card(self, mouse_pos: tuple[int, int]):
+        """根据鼠标位置更新聚焦的手牌，被聚焦的手牌会被抬起"""
+        focused_card = None
+        for i, (keys, cards) in enumerate(self.hand_index):
+            if i == 0:
+                key = mouse_pos[0]
+            elif i == 2:
+                key = -mouse_pos[0]
+            else:
+                key = mouse_pos[1]
+            j = bisect_right(keys, key) - 1
+            if j >= 0 and self.card_view.rect(cards[j]).collidepoint(mouse_pos):
+                focused_card = cards[j]
+                break
+        
+        if focused_card is self.focused_card:
+            return
+        if self.focused_card:
+            self._raise_card(self.focused_card, False)
+        if focused_card:
+            self._raise_card(focused_card, True)
+        self.focused_card = focused_card
+    
+    def _raise_card(self, card: CardModel, raised: bool):
+        """抬起或放下一张手牌"""
+        rect = self.card_view.rect(card)
+        offset = 0 if raised else 0.6
+        if card.owner == 0:
+            rect.bottom = self.settings.screen_height + offset * self.settings.card.height
+        elif card.owner == 1:
+            rect.right = self.settings.screen_width + offset * self.settings.card.width
+        elif card.owner == 2:
+            rect.top = 0 - offset * self.settings.card.height
+        elif card.owner == 3:
+            rect.left = 0 - offset * self.settings.card.width
+        else:
+            raise Exception("Too many hand!")
                 
     def _draw_cards(self):
         """在屏幕上绘制所有卡牌"""
         # 显示场上卡牌
         for i in range(4):
             for card in reversed(self.played_cards_greater_7[i]):
-                self.screen.blit(card.image, card.rect)
+                self.card_view.draw(card)
 
         for i in range(4):
             for card in self.played_cards_7[i]:
-                self.screen.blit(card.image, card.rect)
+                self.card_view.draw(card)
         
         for i in range(4):
             for card in self.played_cards_less_7[i]:
-                self.screen.blit(card.image, card.rect)
+                self.card_view.draw(card)
         
         # 显示手牌
+        # TODO 正式版需要修改为其他玩家的可打出牌不发红光
         for hand in self.hand:
             for card in hand:
-                card.blitme()
+                highlighted = card.playable and card.owner == self.current_player and self.current_player == 0
+                self.card_view.draw(card, highlighted)
         
         # 显示弃牌堆
         for player_trashed_cards in self.trashed_cards:
-            player_trashed_cards.draw(self.screen)
+            for card in player_trashed_cards:
+                self.card_view.draw(card)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,292 @@
+"""把牌桌分散到多个工作进程上的调度进程
+
+单个进程受 GIL 限制，只能用满一个核心。调度进程监听客户端的端口，读出客户端的第一帧（HELLO 或 WATCH），
+按其中的房间名用一致性哈希选出工作进程（观众因此与同一房间的玩家在同一个进程中），再把连接本身转交给该进程，之后的通信不再经过调度进程。
+默认房间（空的房间名）与其他房间一样按名称选出工作进程，第一帧中没有 HELLO 或 WATCH 的连接按连接的序号分散到各个工作进程上。
+
+工作进程被清空（drain）时先从哈希环上移除，新的连接改由其他进程接收，已有的牌桌在原进程中打完后该进程退出；
+意外退出的工作进程会被重新启动。管理端口返回汇总的健康状况和负载，也可以用来清空或增加工作进程：
+    echo stats | nc 127.0.0.1 8766
+    echo "drain 0" | nc 127.0.0.1 8766
+    echo add | nc 127.0.0.1 8766
+
+转交连接依赖 Unix 套接字，调度进程只能在 Linux 等类 Unix 系统上运行。
+运行 `python dispatcher.py [--port 端口] [--workers 进程数] [--admin-port 端口] [--fill-delay 秒数]` 启动。
+"""
+from __future__ import annotations
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from typing import Optional
+from hash_ring import HashRing
+from server import ServerSettings
+from shard_worker import run_worker
+import protocol
+
+class DispatcherSettings:
+    """调度进程的设置类"""
+    def __init__(self):
+        self.host = '127.0.0.1'
+        self.port = 8765
+        self.admin_port = 8766
+        self.workers = os.cpu_count() or 1
+        self.replicas = 64   # 每个工作进程在哈希环上的虚拟节点数
+        self.stats_interval = 1.0   # 查询工作进程负载的间隔（秒）
+        self.hello_timeout = 10.0   # 客户端连接后必须在这么多秒内发来第一帧
+        self.server = ServerSettings()   # 工作进程中游戏服务器的设置
+
+
+class WorkerHandle:
+    """调度进程中记录的一个工作进程"""
+
+    def __init__(self, index: int, process: multiprocessing.Process, control: socket.socket):
+        self.index = index
+        self.process = process
+        self.control = control
+        self.draining = False
+        self.drained = False
+        self.handoffs = 0   # 转交给此进程的连接数
+        self.stats: dict = {}
+        self.stats_time = 0.0   # 最近一次收到负载的时间
+
+    def health(self) -> dict:
+        health = {
+            'index': self.index,
+            'pid': self.process.pid,
+            'alive': self.process.is_alive(),
+            'draining': self.draining,
+            'handoffs': self.handoffs,
+            'report_age': round(time.monotonic() - self.stats_time, 3) if self.stats_time else None
+        }
+        for key in ('tables', 'clients', 'spectators', 'rounds', 'moves', 'loop_lag'):
+            health[key] = self.stats.get(key, 0)
+        return health
+
+
+class Dispatcher:
+    """接收客户端连接并转交给工作进程的调度进程"""
+
+    def __init__(self, settings: DispatcherSettings = None):
+        self.settings = settings if settings is not None else DispatcherSettings()
+        self.context = multiprocessing.get_context('spawn')
+        self.ring = HashRing(self.settings.replicas)
+        self.workers: dict[int, WorkerHandle] = {}
+        self.next_index = 0
+        self.listener: Optional[socket.socket] = None
+        self.admin_server: Optional[asyncio.AbstractServer] = None
+        self.tasks: set[asyncio.Task] = set()
+        self.connections = 0
+        self.rejected = 0   # 没有可用的工作进程或客户端超时未发来消息而被关闭的连接数
+        self.closing = False
+
+    async def start(self) -> None:
+        """启动工作进程并开始监听，端口为0时由系统分配"""
+        for _ in range(self.settings.workers):
+            self.add_worker()
+        self.listener = socket.create_server((self.settings.host, self.settings.port), backlog=1024)
+        self.listener.setblocking(False)
+        self.admin_server = await asyncio.start_server(self._handle_admin, self.settings.host, self.settings.admin_port)
+        self._spawn(self._accept_loop())
+        self._spawn(self._stats_loop())
+
+    @property
+    def port(self) -> int:
+        return self.listener.getsockname()[1]
+
+    @property
+    def admin_port(self) -> int:
+        return self.admin_server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self.listener is None:
+            await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """关闭监听和所有工作进程（工作进程在控制套接字关闭后自行退出）"""
+        self.closing = True
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.listener is not None:
+            self.listener.close()
+        if self.admin_server is not None:
+            self.admin_server.close()
+            await self.admin_server.wait_closed()
+        for handle in list(self.workers.values()):
+            self._remove_worker(handle)
+        loop = asyncio.get_running_loop()
+        for handle in list(self.workers.values()):
+            await loop.run_in_executor(None, handle.process.join, 5)
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    # 工作进程的管理
+
+    def add_worker(self) -> WorkerHandle:
+        """启动一个新的工作进程并把它加入哈希环"""
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        index = self.next_index
+        self.next_index += 1
+        process = self.context.Process(target=run_worker, args=(index, child, self.settings.server), daemon=True)
+        process.start()
+        child.close()
+        parent.setblocking(False)
+        handle = WorkerHandle(index, process, parent)
+        self.workers[index] = handle
+        self.ring.add(index)
+        asyncio.get_running_loop().add_reader(parent.fileno(), self._on_worker_message, handle)
+        return handle
+
+    def drain_worker(self, index: int) -> None:
+        """清空一个工作进程：不再给它转交新的连接，已有的牌桌结束后它自行退出"""
+        handle = self.workers.get(index)
+        if handle is None or handle.draining:
+            return
+        handle.draining = True
+        self.ring.remove(index)
+        self._send(handle, b'D')
+
+    def _remove_worker(self, handle: WorkerHandle) -> None:
+        self.ring.remove(handle.index)
+        asyncio.get_running_loop().remove_reader(handle.control.fileno())
+        handle.control.close()
+
+    def _send(self, handle: WorkerHandle, data: bytes, fds: list[int] = ()) -> bool:
+        """发送控制消息，工作进程的接收队列已满或已经退出时返回 False"""
+        try:
+            if fds:
+                socket.send_fds(handle.control, [data], fds)
+            else:
+                handle.control.send(data)
+            return True
+        except (BlockingIOError, OSError):
+            return False
+
+    def _on_worker_message(self, handle: WorkerHandle) -> None:
+        while True:
+            try:
+                data = handle.control.recv(65536)
+            except BlockingIOError:
+                return
+            except OSError:
+                data = b''
+            if not data:
+                # 工作进程已经退出，由负载查询循环回收
+                asyncio.get_running_loop().remove_reader(handle.control.fileno())
+                return
+            if data[:1] == b'S':
+                handle.stats = json.loads(data[1:])
+                handle.stats_time = time.monotonic()
+            elif data[:1] == b'D':
+                handle.drained = True
+
+    async def _stats_loop(self) -> None:
+        """定时查询各个工作进程的负载，回收已经退出的进程，重新启动意外退出的进程"""
+        while True:
+            for handle in list(self.workers.values()):
+                if handle.process.is_alive():
+                    self._send(handle, b'S')
+                    continue
+                self._remove_worker(handle)
+                del self.workers[handle.index]
+                if not handle.draining and not self.closing:
+                    print(f"工作进程{handle.index}意外退出（退出码 {handle.process.exitcode}），重新启动")
+                    self.add_worker()
+            await asyncio.sleep(self.settings.stats_interval)
+
+    # 客户端连接的转交
+
+    async def _accept_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            sock, _ = await loop.sock_accept(self.listener)
+            sock.setblocking(False)
+            self.connections += 1
+            self._spawn(self._hand_off(sock, self.connections))
+
+    async def _hand_off(self, sock: socket.socket, number: int) -> None:
+        """读出客户端的第一帧，确定房间后把连接转交给对应的工作进程"""
+        try:
+            prefix = await asyncio.wait_for(self._read_first_frame(sock), self.settings.hello_timeout)
+            key = self._room_key(prefix, number)
+            for index in self.ring.successors(key):
+                handle = self.workers[index]
+                if self._send(handle, b'C' + prefix, [sock.fileno()]):
+                    handle.handoffs += 1
+                    return
+            self.rejected += 1
+        except (asyncio.TimeoutError, ConnectionError):
+            self.rejected += 1
+        finally:
+            # 工作进程收到的是文件描述符的副本，调度进程中的这一份直接关闭
+            sock.close()
+
+    async def _read_first_frame(self, sock: socket.socket) -> bytes:
+        """读出第一帧，返回已经读出的所有数据（可能包含之后的帧的开头，一并转交）"""
+        loop = asyncio.get_running_loop()
+        data = b''
+        size = protocol.FRAME_HEADER.size
+        while len(data) < size or len(data) < size + protocol.parse_frame_header(data)[0]:
+            chunk = await loop.sock_recv(sock, 4096)
+            if not chunk:
+                raise ConnectionError("客户端在发送第一帧前断开")
+            data += chunk
+        return data
+
+    def _room_key(self, prefix: bytes, number: int) -> str:
+        room = protocol.first_frame_room(prefix)
+        if room is not None:
+            return 'room:' + room
+        return 'conn:' + str(number)
+
+    # 管理端口
+
+    def health(self) -> dict:
+        """汇总所有工作进程的健康状况和负载"""
+        workers = [handle.health() for handle in self.workers.values()]
+        total = {key: sum(worker[key] for worker in workers) for key in ('tables', 'clients', 'spectators', 'rounds', 'moves')}
+        total['workers'] = sum(1 for handle in self.workers.values() if not handle.draining)
+        total['connections'] = self.connections
+        total['rejected'] = self.rejected
+        return {'total': total, 'workers': workers}
+
+    async def _handle_admin(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            command = (await reader.readline()).decode().split()
+            if command[:1] == ['drain'] and len(command) == 2 and command[1].isdigit():
+                self.drain_worker(int(command[1]))
+            elif command[:1] == ['add']:
+                self.add_worker()
+            writer.write(json.dumps(self.health()).encode() + b'\n')
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+def main():
+    settings = DispatcherSettings()
+    for option, name in (('--port', 'port'), ('--workers', 'workers'), ('--admin-port', 'admin_port')):
+        if option in sys.argv:
+            setattr(settings, name, int(sys.argv[sys.argv.index(option) + 1]))
+    if '--fill-delay' in sys.argv:
+        settings.server.fill_delay = float(sys.argv[sys.argv.index('--fill-delay') + 1])
+    dispatcher = Dispatcher(settings)
+    print(f"大通纸牌调度进程正在监听 {settings.host}:{settings.port}，工作进程 {settings.workers} 个")
+    try:
+        asyncio.run(dispatcher.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
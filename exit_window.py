@@ -1,21 +1,26 @@
-from typing import Optional
+from __future__ import annotations
+from typing import Optional, TYPE_CHECKING
 import pygame
 import ptext
 from pygame import Surface
 from pygame.sprite import Sprite
-from settings import Settings
 from window import Window
 from button import Button
 
+if TYPE_CHECKING:
+    from datong_solitaire import DaTongSolitaire
+
 class ExitWindow(Window):
     """用于确认退出的窗口"""
-    def __init__(self):
-        self.settings = Settings()
+    def __init__(self, game: DaTongSolitaire):
+        self.settings = game.settings
         super().__init__(
+            game,
             width=self.settings.exit_window.width,
             height=self.settings.exit_window.height
         )
         self.confirm_button = Button(
+            self.game,
             msg=self.settings.exit_window.confirm_button.msg,
             width=self.settings.exit_window.confirm_button.width,
             height=self.settings.exit_window.confirm_button.height,
@@ -25,6 +30,7 @@ class ExitWindow(Window):
             parent_obj=self
         )
         self.cancel_button = Button(
+            self.game,
             msg=self.settings.exit_window.cancel_button.msg,
             width=self.settings.exit_window.cancel_button.width,
             height=self.settings.exit_window.cancel_button.height,
@@ -33,17 +39,15 @@ class ExitWindow(Window):
             font_size=self.settings.exit_window.cancel_button.font_size,
             parent_obj=self
         )
-    
-    def blitme(self, surface: Optional[Surface] = None) -> None:
-        super().blitme(surface)
+        self.buttons.add(self.confirm_button, self.cancel_button)
+        # 提示文字不会改变，直接绘制到窗口的图像上
         ptext.draw(
+            surf=self.image,
             text=self.settings.exit_window.text.text,
-            centerx=self.rect.x + self.settings.exit_window.text.centerx,
-            centery=self.rect.y + self.settings.exit_window.text.centery,
+            centerx=self.settings.exit_window.text.centerx,
+            centery=self.settings.exit_window.text.centery,
             fontname=self.settings.font_path,
             fontsize=self.settings.exit_window.text.font_size,
             color=self.settings.exit_window.text.color
         )
-        self.confirm_button.blitme(surface=self.image)
-        self.cancel_button.blitme(surface=self.image)
         
\ No newline at end of file
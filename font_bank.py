@@ -0,0 +1,48 @@
+import pygame
+from pygame.font import Font
+from singleton import Singleton
+from asset_pack import open_asset
+
+class FontBank(Singleton):
+    """全局共享的字体库
+
+    每种 (字体路径, 字号) 只解析一次字体文件，之后在所有对局、界面和按钮之间共享。
+    共享的字体对象不能被修改（如 set_bold），需要其他样式时应另行创建字体。
+    """
+
+    has_inited = False
+
+    def __init__(self):
+        """字体库的初始化（需要在 pygame.font 初始化之后进行）"""
+        # FontBank 作为单例类，只初始化一次
+        if FontBank.has_inited:
+            return
+        FontBank.has_inited = True
+
+        self.fonts: dict[tuple[str, int], Font] = {}
+        self.prepared_glyphs: dict[tuple[str, int], set[str]] = {}   # 已经渲染过一次的字符
+
+    def get(self, path: str, size: int) -> Font:
+        """获取指定路径和字号的字体，如果尚未加载则先加载"""
+        key = (path, size)
+        if key not in self.fonts:
+            self.fonts[key] = Font(open_asset(path), size)
+        return self.fonts[key]
+
+    def preload(self, path: str, sizes) -> None:
+        """预先加载同一字体的多种字号"""
+        for size in sizes:
+            self.get(path, size)
+
+    def prepare_glyphs(self, path: str, size: int, texts) -> None:
+        """将界面中用到的字符预先渲染一次，之后渲染文字时字形已在缓存中
+
+        中文字体的字形很多，渲染时才逐个从字体文件中读取和栅格化；只预先准备界面实际用到的少量字符
+        """
+        font = self.get(path, size)
+        prepared = self.prepared_glyphs.setdefault((path, size), set())
+        chars = set(''.join(texts)) - prepared - set(' \t\n')
+        if not chars:
+            return
+        font.render(''.join(sorted(chars)), True, (0, 0, 0))
+        prepared.update(chars)
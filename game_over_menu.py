@@ -1,7 +1,8 @@
 import pygame
 from pygame import Surface, Rect
-from pygame.sprite import Sprite
-from settings import Settings
+from pygame.sprite import Sprite, Group
+from asset_pack import open_asset, asset_format
+from font_bank import FontBank
 from button import Button
 
 class GameOverMenu(Sprite):
@@ -9,23 +10,20 @@ class GameOverMenu(Sprite):
     def __init__(self, game, sorted_player_points_pairs, score_multiply_power):
         super().__init__()
         self.game = game
-        self.settings = Settings()
-        self.screen = pygame.display.get_surface()
-        self.win_sound = pygame.mixer.Sound('music/音效/instant-win.wav')
-        self.datong_sound = pygame.mixer.Sound('music/音效/huge-win.mp3')
-        self.lose_sound = pygame.mixer.Sound('music/音效/horror-lose.wav')
+        self.settings = game.settings
+        self.screen = game.screen
         self.image = Surface((self.settings.game_over_menu.width, self.settings.game_over_menu.height))
         self.image.fill(self.settings.game_over_menu.color)
         self.rect = self.image.get_rect()
         self.rect.center = self.screen.get_rect().center
-        self.title_font = pygame.font.Font(self.settings.font_path, self.settings.game_over_menu.title.font_size)
-        self.content_font = pygame.font.Font(self.settings.font_path, self.settings.game_over_menu.content.font_size)
+        self.title_font = FontBank().get(self.settings.font_path, self.settings.game_over_menu.title.font_size)
+        self.content_font = FontBank().get(self.settings.font_path, self.settings.game_over_menu.content.font_size)
         self.winner = sorted_player_points_pairs[0][0]
         self.datong = False
         if score_multiply_power == 2:
             self.datong = True
             self.datong_icon_image = pygame.transform.scale_by(
-                pygame.image.load('images/emphasize_icon.png'),
+                pygame.image.load(open_asset('images/emphasize_icon.png'), asset_format('images/emphasize_icon.png')),
                 self.settings.game_over_menu.datong_icon.load_scale
             )
             self.datong_icon_rect = self.datong_icon_image.get_rect(
@@ -60,6 +58,7 @@ class GameOverMenu(Sprite):
                            + self.settings.game_over_menu.content.line_spacing)
             ))
         self.replay_button = Button(
+            game,
             msg=self.settings.game_over_menu.replay_button.msg,
             width=self.settings.game_over_menu.replay_button.width,
             height=self.settings.game_over_menu.replay_button.height,
@@ -71,6 +70,7 @@ class GameOverMenu(Sprite):
             parent_obj=self
         )
         self.exit_button = Button(
+            game,
             msg=self.settings.game_over_menu.exit_button.msg,
             width=self.settings.game_over_menu.exit_button.width,
             height=self.settings.game_over_menu.exit_button.height,
@@ -81,6 +81,7 @@ class GameOverMenu(Sprite):
             font_size=self.settings.game_over_menu.exit_button.font_size,
             parent_obj=self
         )
+        self.buttons = Group(self.replay_button, self.exit_button)
     
     def update(self):
         pass
@@ -0,0 +1,52 @@
+from bisect import bisect_right
+from hashlib import blake2b
+from typing import Hashable, Optional
+
+class HashRing:
+    """一致性哈希环
+
+    每个节点在环上放置 replicas 个虚拟节点，键归属于顺时针方向上的第一个虚拟节点。
+    增加或移除一个节点时，只有原本属于（或将要属于）该节点的键会改变归属。
+    """
+
+    def __init__(self, replicas: int = 64):
+        self.replicas = replicas
+        self.keys: list[int] = []   # 虚拟节点在环上的位置，保持有序
+        self.nodes: list[Hashable] = []   # 与 keys 一一对应的节点
+
+    def _hash(value: str) -> int:
+        return int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+    def add(self, node: Hashable) -> None:
+        for i in range(self.replicas):
+            key = HashRing._hash(f"{node}#{i}")
+            index = bisect_right(self.keys, key)
+            self.keys.insert(index, key)
+            self.nodes.insert(index, node)
+
+    def remove(self, node: Hashable) -> None:
+        pairs = [(key, n) for key, n in zip(self.keys, self.nodes) if n != node]
+        self.keys = [key for key, _ in pairs]
+        self.nodes = [n for _, n in pairs]
+
+    def get(self, key: str) -> Optional[Hashable]:
+        """键所归属的节点，环为空时返回 None"""
+        if not self.keys:
+            return None
+        index = bisect_right(self.keys, HashRing._hash(key)) % len(self.keys)
+        return self.nodes[index]
+
+    def successors(self, key: str):
+        """从键所归属的节点开始，按顺时针方向依次给出环上的各个不同节点，用于归属节点繁忙时顺延"""
+        if not self.keys:
+            return
+        start = bisect_right(self.keys, HashRing._hash(key))
+        seen = set()
+        for i in range(len(self.keys)):
+            node = self.nodes[(start + i) % len(self.keys)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+
+    def __contains__(self, node: Hashable) -> bool:
+        return node in self.nodes
@@ -0,0 +1,285 @@
+"""对局的日志，进程意外退出后从最近的快照和之后的行动恢复对局和分数
+
+日志由两个文件组成：
+    快照（snapshot.bin）：一局开始时完整的对局状态（分数、先手玩家、当前玩家、各玩家的手牌和按顺序排列的弃牌）
+    行动日志（journal.log）：快照之后的记录，只追加不修改。每次行动记录一个字节的卡牌编号，
+        每次发牌记录 DEAL 和先手玩家、四名玩家的手牌掩码；一局结束时的得分由重放行动得出，无需记录
+行动日志中的行动数超过 snapshot_interval 后，在下一次发牌时改为写一份快照，而不是追加 DEAL。
+快照和行动日志的开头都记录了代数（generation），每写一次快照代数加一，同时换用一个新的行动日志。
+两个文件都先写入临时文件再改名替换，因此任何时刻意外退出，磁盘上都是一对完整的文件；
+代数不一致时（快照已经替换、行动日志还没有替换）忽略行动日志，其中的行动都已经包含在快照中。
+
+写入磁盘和 fsync 在单独的写入线程中进行，游戏只需把记录放入队列。写入线程每次取出队列中的所有记录，
+一次写入并 fsync（group commit）：一次 fsync 期间产生的记录在下一次 fsync 时一起落盘。
+写入出错（如磁盘已满、目录不可写）时写入线程停止，之后的记录不再写入，sync 和 close 抛出这个错误。
+恢复时先载入快照，再用 Table 依次重放行动日志中的记录，遇到不合规则的行动或不完整的记录（如写了一半的文件尾部）时停止。
+
+这里只处理 Table 和 CardModel，不依赖 pygame。
+"""
+from __future__ import annotations
+import os
+import struct
+import threading
+import zlib
+from typing import TYPE_CHECKING, Optional
+from card_model import CardModel
+from table import Table, IllegalMove
+import protocol
+import rules
+
+if TYPE_CHECKING:
+    from settings import Settings
+
+SNAPSHOT_MAGIC = b'DTSN'
+LOG_MAGIC = b'DTJL'
+SNAPSHOT_HEADER = struct.Struct('<4sI4iBB4Q')   # 标志，代数，总分，先手玩家，当前玩家，四名玩家的手牌掩码
+LOG_HEADER = struct.Struct('<4sI')   # 标志，代数
+DEAL = 0x80   # 行动日志中发牌的记录，其后为 DEAL_RECORD
+DEAL_RECORD = struct.Struct('<B4Q')   # 先手玩家，四名玩家的手牌掩码
+
+class Journal:
+    """一局游戏的日志：记录行动、定期写快照，以及启动时恢复"""
+
+    def __init__(self, settings: Settings.Journal):
+        self.settings = settings
+        self.snapshot_path = os.path.join(settings.dir, 'snapshot.bin')
+        self.log_path = os.path.join(settings.dir, 'journal.log')
+        self.generation = 0
+        self.logged_moves = 0   # 当前行动日志中的行动数
+        self.has_log = False   # 是否已经有与快照同一代、可以继续追加的行动日志
+        # 以下由写入线程使用，queue 中为 (快照, 记录)，快照为 None 时把记录追加到行动日志
+        self.condition = threading.Condition()
+        self.queue: list[tuple[bytes, bytes]] = []
+        self.submitted = 0   # 放入队列的项数
+        self.written = 0   # 已经落盘的项数
+        self.commits = 0   # 行动日志 fsync 的次数
+        self.closing = False
+        self.idle = False   # 写入线程是否正在等待新的项，只有这时才需要唤醒它
+        self.error: Optional[Exception] = None   # 写入线程出错时的错误，之后不再写入
+        self.writer: threading.Thread = None
+        self.log = None   # 行动日志的文件对象，只在写入线程中使用
+
+    def recover(self, table: Table) -> bool:
+        """从磁盘上的快照和行动日志恢复对局到 table 中，没有可用的快照时返回 False
+
+        恢复后 table.playing 表示是否有一局被中断的游戏，table.score 为累计的分数。
+        """
+        if not self._load_snapshot(table):
+            return False
+        records = self._read_log()
+        pos = 0
+        while pos < len(records):
+            id = records[pos]
+            pos += 1
+            if id == DEAL:
+                if pos + DEAL_RECORD.size > len(records):
+                    break
+                start_player, *masks = DEAL_RECORD.unpack_from(records, pos)
+                pos += DEAL_RECORD.size
+                self._deal(table, start_player, masks)
+                continue
+            if not table.playing:
+                break
+            try:
+                table.act(table.current_player, protocol.card_info(id))
+            except IllegalMove:
+                break
+            if not table.next_turn():
+                table.settle()
+        return True
+
+    def record_deal(self, state) -> None:
+        """记录新的一局的发牌，行动日志过长（或者还没有行动日志）时改为写一份快照
+
+        state 为 DaTongSolitaire 或 Table，需要有 score、hand、trashed_cards、start_player 和 current_player
+        """
+        if not self.has_log or self.logged_moves >= self.settings.snapshot_interval:
+            self.snapshot(state)
+            return
+        self._submit(None, bytes((DEAL,)) + DEAL_RECORD.pack(state.start_player, *[protocol.cards_to_mask(hand) for hand in state.hand]))
+
+    def record_move(self, info: tuple[int, int]) -> None:
+        """记录当前玩家打出或弃置了一张牌"""
+        self.logged_moves += 1
+        self._submit(None, protocol.MOVES[protocol.card_id(info)])
+
+    def snapshot(self, state) -> None:
+        """写入正在进行的一局的完整快照，并换用一个空的行动日志"""
+        self.generation += 1
+        data = bytearray(SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC,
+            self.generation,
+            *state.score,
+            state.start_player,
+            state.current_player,
+            *[protocol.cards_to_mask(hand) for hand in state.hand]
+        ))
+        # 弃牌按弃置的先后顺序记录，恢复后的弃牌堆与原来的排列相同
+        for trash in state.trashed_cards:
+            data.append(len(trash))
+            data += bytes(protocol.card_id(card.info) for card in trash)
+        data += struct.pack('<I', zlib.crc32(data))
+        self.logged_moves = 0
+        self.has_log = True
+        self._submit(bytes(data), LOG_HEADER.pack(LOG_MAGIC, self.generation))
+
+    def sync(self) -> None:
+        """等待已经记录的所有内容落盘"""
+        with self.condition:
+            while self.written < self.submitted and self.error is None:
+                self.condition.wait()
+            if self.error is not None:
+                raise self.error
+
+    def close(self) -> None:
+        """把剩余的记录写入磁盘并结束写入线程"""
+        if self.writer is None:
+            return
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        self.writer.join()
+        self.writer = None
+        if self.error is not None:
+            raise self.error
+
+    def _submit(self, snapshot: bytes, record: bytes) -> None:
+        with self.condition:
+            if self.error is not None:
+                return
+            self.queue.append((snapshot, record))
+            self.submitted += 1
+            if self.idle:
+                self.condition.notify_all()
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_loop, name='journal', daemon=True)
+            self.writer.start()
+
+    def _write_loop(self) -> None:
+        """写入线程：每次取出队列中的所有项，追加的记录合并为一次写入和一次 fsync"""
+        while True:
+            with self.condition:
+                while not self.queue and not self.closing:
+                    self.idle = True
+                    self.condition.wait()
+                    self.idle = False
+                if not self.queue:
+                    break
+                items = self.queue
+                self.queue = []
+            try:
+                self._write(items)
+            except OSError as e:
+                self._fail(e)
+                break
+            with self.condition:
+                self.written += len(items)
+                self.condition.notify_all()
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    def _fail(self, error: Exception) -> None:
+        """写入出错：记下错误，丢弃队列中的记录，并唤醒等待写入的调用者"""
+        with self.condition:
+            self.error = error
+            self.queue = []
+            self.condition.notify_all()
+
+    def _write(self, items: list[tuple[bytes, bytes]]) -> None:
+        pending = bytearray()
+        for snapshot, record in items:
+            if snapshot is None:
+                pending += record
+                continue
+            # 先写快照再换用新的行动日志，之前攒下的记录都已经包含在快照中
+            pending.clear()
+            self._replace(self.snapshot_path, snapshot)
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+            self._replace(self.log_path, record)
+            self.log = open(self.log_path, 'ab')
+        if pending:
+            self.log.write(pending)
+            self.log.flush()
+            os.fsync(self.log.fileno())
+            self.commits += 1
+
+    def _load_snapshot(self, table: Table) -> bool:
+        try:
+            with open(self.snapshot_path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return False
+        if len(data) < SNAPSHOT_HEADER.size + 4 or struct.unpack_from('<I', data, len(data) - 4)[0] != zlib.crc32(data[:-4]):
+            return False
+        fields = SNAPSHOT_HEADER.unpack_from(data)
+        if fields[0] != SNAPSHOT_MAGIC:
+            return False
+        self.generation = fields[1]
+        table.playing = True
+        table.score = list(fields[2:6])
+        table.start_player, table.current_player = fields[6:8]
+        table.hand = self._hands(fields[8:12])
+        table.trashed_cards = [[], [], [], []]
+        pos = SNAPSHOT_HEADER.size
+        for i in range(4):
+            count = data[pos]
+            for id in data[pos + 1:pos + 1 + count]:
+                card = CardModel(*protocol.card_info(id), i)
+                card.discarded = True
+                table.trashed_cards[i].append(card)
+            pos += 1 + count
+        # 不在任何人手中、也没有被弃置的牌都在场上
+        held = {card.info for cards in table.hand + table.trashed_cards for card in cards}
+        played = {protocol.card_info(id) for id in range(52)} - held
+        table.playable_cards = rules.playable_cards_from_played(played)
+        for hand in table.hand:
+            for card in hand:
+                card.playable = card.info in table.playable_cards
+        table.can_play_card = rules.can_play(table.hand[table.current_player], table.playable_cards)
+        return True
+
+    def _deal(self, table: Table, start_player: int, masks: list[int]) -> None:
+        """按 DEAL 记录开始新的一局，与 Table.new_round 相同，只是手牌来自记录"""
+        table.round += 1
+        table.playing = True
+        table.hand = self._hands(masks)
+        table.start_player = start_player
+        table.trashed_cards = [[], [], [], []]
+        table.playable_cards = [(0, 7)]
+        table.current_player = start_player
+        table.can_play_card = True
+
+    def _hands(self, masks) -> list[list[CardModel]]:
+        """由手牌掩码生成四名玩家按顺序排列的手牌"""
+        return [[CardModel(suit, rank, i) for suit, rank in protocol.mask_to_cards(mask)] for i, mask in enumerate(masks)]
+
+    def _read_log(self) -> bytes:
+        """读出与快照同一代的行动日志中的记录"""
+        try:
+            with open(self.log_path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return b''
+        if len(data) < LOG_HEADER.size or LOG_HEADER.unpack_from(data) != (LOG_MAGIC, self.generation):
+            return b''
+        return data[LOG_HEADER.size:]
+
+    def _replace(self, path: str, data: bytes) -> None:
+        """写入临时文件并 fsync 后改名替换，文件要么是旧的内容，要么是完整的新内容"""
+        os.makedirs(self.settings.dir, exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+        if hasattr(os, 'O_DIRECTORY'):
+            # 改名本身也要落盘（Windows 上没有目录的 fsync）
+            dir_fd = os.open(self.settings.dir, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
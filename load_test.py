@@ -0,0 +1,230 @@
+"""游戏服务器的压力测试：大量电脑玩家客户端同时连接服务器，逐步增加并发的牌桌数
+
+每张牌桌坐满四个客户端，客户端用与 AiAgentRandom 相同的策略随机出牌或弃牌。测试分为若干个阶段，
+每个阶段先把牌桌增加到该阶段的数量，再持续 stage_seconds 秒，统计这段时间内的：
+    每秒行动数、行动延迟（从发出行动到收到服务器转发的这次行动）的 p50/p99、
+    服务器进程每张牌桌占用的内存、错误率（服务器返回的错误和意外断开的连接占行动数的比例）
+
+默认在子进程中启动一个服务器，这样测得的内存只包含服务器；也可以用 --port 测试已经在运行的服务器（此时不统计内存，
+服务器的 fill_delay 需要大于0，否则牌桌不等四个客户端到齐就会开局）。
+固定种子后，服务器的发牌和每个客户端的选择都可以复现：牌桌按顺序逐张创建，客户端的随机数由种子、牌桌和座位决定。
+
+运行 `python load_test.py [--seed 种子] [--stages 50,100,200] [--seconds 每个阶段的秒数] [--port 端口]`。
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import sys
+import time
+from random import Random
+from typing import Optional
+from card_model import CardModel
+from client import BotClient
+from server import GameServer, ServerSettings
+
+class LoadTestSettings:
+    """压力测试的设置类"""
+    def __init__(self):
+        self.host = '127.0.0.1'
+        self.port: Optional[int] = None   # 要测试的服务器的端口，为 None 时在子进程中启动一个服务器
+        self.seed = 1
+        self.stages = [50, 100, 200, 400]   # 每个阶段的并发牌桌数
+        self.stage_seconds = 5.0   # 每个阶段统计的秒数
+        self.server = ServerSettings()   # 子进程中服务器的设置
+        self.server.port = 0
+        self.server.fill_delay = 10.0   # 等四个客户端到齐再开局
+        self.server.round_delay = 0.0
+        self.server.bot_delay = 0.0
+
+
+class LoadStats:
+    """一个阶段中所有客户端的行动数、延迟和错误"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.moves = 0
+        self.latencies: list[float] = []
+        self.errors = 0
+
+    def report(self, tables: int, memory: Optional[int]) -> dict:
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+        return {
+            'tables': tables,
+            'clients': tables * 4,
+            'moves_per_s': round(self.moves / elapsed, 1),
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+            'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 3) if latencies else None,
+            'error_rate': round(self.errors / self.moves, 6) if self.moves else (1.0 if self.errors else 0.0),
+            'errors': self.errors,
+            'kb_per_table': round(memory / tables / 1024, 2) if memory is not None and tables else None
+        }
+
+
+class LoadBot(BotClient):
+    """压力测试中的客户端，随机选择合规的牌，并记录每次行动的延迟"""
+
+    def __init__(self, room: str, seed: str, load: LoadTest):
+        super().__init__(room=room)
+        self.seed = seed
+        self.load = load
+        self.rng: Optional[Random] = None
+        self.sent_at = 0.0   # 最近一次行动发出的时间，为0时没有等待转发的行动
+        self.seated = asyncio.Event()
+        self.stopping = False
+        self.error_count = 0   # 已经计入统计的错误数
+
+    async def read_frame(self) -> Optional[int]:
+        seq = await super().read_frame()
+        remote = self.remote
+        if remote.table >= 0 and not self.seated.is_set():
+            self.seated.set()
+        if self.sent_at and self.acted_at != (remote.round, remote.moves):
+            # 牌桌镜像已经越过了自己的行动，说明服务器转发的行动已经到达
+            self.load.stats.latencies.append(time.perf_counter() - self.sent_at)
+            self.load.stats.moves += 1
+            self.sent_at = 0.0
+        if len(remote.errors) > self.error_count:
+            self.load.stats.errors += len(remote.errors) - self.error_count
+            self.error_count = len(remote.errors)
+        return seq
+
+    def _choose_card(self) -> CardModel:
+        if self.rng is None:
+            # 随机数只由种子、牌桌和座位决定，与客户端连接的先后无关
+            self.rng = Random(f'{self.seed}:{self.remote.seat}')
+        hand = self.remote.hand[self.remote.seat]
+        if self.remote.can_play_card:
+            card = self.rng.choice([card for card in hand if card.playable])
+        else:
+            card = self.rng.choice(hand)
+        self.sent_at = time.perf_counter()
+        return card
+
+
+class LoadTest:
+    """按阶段增加牌桌并统计服务器负载的压力测试"""
+
+    def __init__(self, settings: LoadTestSettings = None):
+        self.settings = settings if settings is not None else LoadTestSettings()
+        self.stats = LoadStats()
+        self.bots: list[LoadBot] = []
+        self.tasks: list[asyncio.Task] = []
+        self.process: Optional[multiprocessing.Process] = None
+        self.port = self.settings.port
+        self.base_memory: Optional[int] = None
+
+    async def run(self) -> list[dict]:
+        """依次运行各个阶段，返回每个阶段的统计"""
+        if self.port is None:
+            await self._start_server()
+        results = []
+        try:
+            for tables in self.settings.stages:
+                started = time.perf_counter()
+                while len(self.bots) < tables * 4:
+                    await self._add_table(len(self.bots) // 4)
+                ramp = time.perf_counter() - started
+                self.stats = LoadStats()
+                await asyncio.sleep(self.settings.stage_seconds)
+                memory = self._server_memory()
+                result = self.stats.report(tables, None if memory is None else memory - self.base_memory)
+                result['ramp_s'] = round(ramp, 3)
+                results.append(result)
+        finally:
+            await self.close()
+        return results
+
+    async def close(self) -> None:
+        """断开所有客户端并停止子进程中的服务器"""
+        for bot in self.bots:
+            bot.stopping = True
+            if bot.writer is not None:
+                bot.writer.close()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+
+    async def _add_table(self, index: int) -> None:
+        """新开一张牌桌：第一个客户端坐下后（牌桌已经创建）再连接其余三个客户端，使牌桌的创建顺序固定"""
+        room = f'load-{self.settings.seed}-{index}'
+        bots = [LoadBot(room, f'{self.settings.seed}:{index}', self) for _ in range(4)]
+        await self._start_bot(bots[0])
+        await bots[0].seated.wait()
+        await asyncio.gather(*[self._start_bot(bot) for bot in bots[1:]])
+
+    async def _start_bot(self, bot: LoadBot) -> None:
+        self.bots.append(bot)
+        try:
+            await bot.connect(self.settings.host, self.port)
+        except OSError:
+            self.stats.errors += 1
+            bot.seated.set()
+            return
+        task = asyncio.ensure_future(self._play(bot))
+        self.tasks.append(task)
+
+    async def _play(self, bot: LoadBot) -> None:
+        await bot.play(sys.maxsize)
+        if not bot.stopping:
+            self.stats.errors += 1   # 测试结束前意外断开
+        bot.seated.set()
+
+    async def _start_server(self) -> None:
+        """在子进程中启动服务器，等它开始监听后记录端口和初始内存"""
+        context = multiprocessing.get_context('spawn')
+        parent, child = context.Pipe()
+        settings = self.settings.server
+        settings.seed = self.settings.seed
+        self.process = context.Process(target=_serve, args=(settings, child), daemon=True)
+        self.process.start()
+        loop = asyncio.get_running_loop()
+        self.port = await loop.run_in_executor(None, parent.recv)
+        self.base_memory = self._server_memory()
+
+    def _server_memory(self) -> Optional[int]:
+        """服务器子进程的常驻内存（字节），只在 Linux 上可以读到"""
+        if self.process is None:
+            return None
+        try:
+            with open(f'/proc/{self.process.pid}/status') as file:
+                for line in file:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+
+def _serve(settings: ServerSettings, conn) -> None:
+    """子进程中运行的服务器，开始监听后把端口发给父进程"""
+    async def serve():
+        server = GameServer(settings)
+        await server.start()
+        conn.send(server.port)
+        await server.serve_forever()
+    asyncio.run(serve())
+
+
+def main():
+    settings = LoadTestSettings()
+    if '--seed' in sys.argv:
+        settings.seed = int(sys.argv[sys.argv.index('--seed') + 1])
+    if '--stages' in sys.argv:
+        settings.stages = [int(tables) for tables in sys.argv[sys.argv.index('--stages') + 1].split(',')]
+    if '--seconds' in sys.argv:
+        settings.stage_seconds = float(sys.argv[sys.argv.index('--seconds') + 1])
+    if '--port' in sys.argv:
+        settings.port = int(sys.argv[sys.argv.index('--port') + 1])
+    results = asyncio.run(LoadTest(settings).run())
+    print(f"{'牌桌':>6}{'客户端':>8}{'行动/秒':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'KB/牌桌':>10}{'错误率':>10}")
+    for result in results:
+        print(
+            f"{result['tables']:>6}{result['clients']:>8}{result['moves_per_s']:>10}{result['p50_ms']!s:>10}"
+            f"{result['p99_ms']!s:>10}{result['kb_per_table']!s:>10}{result['error_rate']:>10}"
+        )
+
+if __name__ == '__main__':
+    main()
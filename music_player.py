@@ -0,0 +1,84 @@
+import pygame
+from pygame.event import Event
+from random import shuffle
+from asset_pack import open_asset, asset_format
+
+class MusicPlayer:
+    """背景音乐播放器
+
+    通过 pygame.mixer.music 流式播放音乐，边播放边解码，无需将整首音乐解码到内存中。
+    支持播放列表，切换曲目时先淡出当前曲目再淡入下一首。
+    """
+
+    def __init__(self, fade_ms: int = 0):
+        self.fade_ms = fade_ms
+        self.end_event = pygame.event.custom_type()
+        pygame.mixer.music.set_endevent(self.end_event)
+        self.playlist: list[str] = []
+        self.index = -1
+        self.loop = False
+        self.paused = False
+
+    def play_playlist(self, tracks: list[str], shuffled: bool = True, loop: bool = True) -> None:
+        """依次播放列表中的曲目，替换当前的播放列表"""
+        self.playlist = list(tracks)
+        if shuffled:
+            shuffle(self.playlist)
+        self.index = -1
+        self.loop = loop
+        self.next_track()
+
+    def play(self, path: str) -> None:
+        """播放一首曲目，播放完毕后停止"""
+        self.play_playlist([path], shuffled=False, loop=False)
+
+    def next_track(self) -> None:
+        """切换到播放列表中的下一首曲目"""
+        if pygame.mixer.music.get_busy():
+            # 淡出结束时会产生 end_event，届时再播放下一首
+            pygame.mixer.music.fadeout(self.fade_ms)
+        else:
+            self._play_next()
+
+    def stop(self, fade_ms: int = 0) -> None:
+        """清空播放列表，并淡出当前曲目"""
+        self.playlist = []
+        if fade_ms:
+            pygame.mixer.music.fadeout(fade_ms)
+        else:
+            pygame.mixer.music.stop()
+
+    def pause(self) -> None:
+        if pygame.mixer.music.get_busy():
+            pygame.mixer.music.pause()
+            self.paused = True
+
+    def unpause(self) -> None:
+        if self.paused:
+            pygame.mixer.music.unpause()
+            self.paused = False
+
+    def check_event(self, event: Event) -> bool:
+        """响应曲目结束的事件，返回该事件是否已被处理"""
+        if event.type != self.end_event:
+            return False
+        self._play_next()
+        return True
+
+    def _play_next(self) -> None:
+        """加载并播放列表中的下一首曲目，跳过无法加载的曲目"""
+        self.paused = False
+        for _ in range(len(self.playlist)):
+            self.index += 1
+            if self.index == len(self.playlist):
+                if not self.loop:
+                    break
+                self.index = 0
+            try:
+                pygame.mixer.music.load(open_asset(self.playlist[self.index]), asset_format(self.playlist[self.index]))
+            except pygame.error as e:
+                print(f"无法播放音乐{self.playlist[self.index]}：{e}")
+                continue
+            pygame.mixer.music.play(fade_ms=self.fade_ms)
+            return
+        self.playlist = []
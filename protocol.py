@@ -0,0 +1,189 @@
+"""服务器与客户端之间的二进制协议
+
+每一帧为：长度（uint16）、序号（uint16）、若干个事件，所有整数均为小端序。一帧中可以包含多个事件，
+服务器把一段时间内的事件合并为一帧发送。卡牌用一个字节的编号表示（花色 * 13 + 点数 - 1，即 0~51），
+一组卡牌（如手牌快照）用一个 52 位的掩码表示。
+
+轮到谁行动由客户端自己推算（每次行动后轮到下一名玩家，只有自己需要知道自己能否出牌），
+因此一次行动只需一个字节：
+    服务器 -> 客户端：0~51 当前玩家打出此牌，64~115 自己弃置了（编号 - 64）这张牌，127 当前玩家暗扣了一张牌
+    客户端 -> 服务器：0~51 出牌或弃牌
+其余事件的第一个字节不小于 128，其后的字段见 SERVER_EVENTS 和 CLIENT_EVENTS。
+
+客户端每处理完一帧就回复 ACK；客户端落后太多帧时服务器不再发送增量的事件，等其追上后改为发送一次完整的快照。
+
+观众用 WATCH 代替 HELLO 观看一张牌桌，WELCOME 中的座位为 SPECTATOR，之后收到的是公开的视图：
+其他玩家弃置的牌均为 127，DEAL 和 SNAPSHOT 中的手牌掩码和弃牌掩码为0。观众不需要回复 ACK。
+"""
+from __future__ import annotations
+import struct
+from typing import Iterator, Optional
+from card_model import CardModel
+
+VERSION = 1
+
+FRAME_HEADER = struct.Struct('<HH')
+MAX_FRAME = 0xFFFF
+
+DISCARD = 64   # 自己弃牌的事件为 DISCARD + 卡牌编号
+HIDDEN_DISCARD = 127   # 其他玩家暗扣了一张牌
+MOVES = tuple(bytes((i,)) for i in range(128))   # 预先编码的行动事件
+
+SPECTATOR = 0xFF   # 观众在 WELCOME 中的座位
+ANY_TABLE = 0xFFFFFFFF   # WATCH 中的牌桌编号为此值时，观看房间中最新的牌桌
+
+# 服务器发送的事件
+WELCOME = 0x80   # 协议版本，牌桌编号，座位
+DEAL = 0x81   # 局数，先手玩家，真人玩家的座位掩码，手牌掩码，四名玩家的总分
+ROUND_OVER = 0x82   # 得分倍数，按名次排列的玩家，四名玩家的点数（乘以10），得分，总分
+SNAPSHOT = 0x83   # 局数，标志（第0位：正在进行），先手玩家，当前玩家，真人玩家的座位掩码，手牌掩码，场上的牌的掩码，
+                  # 自己弃牌的掩码，四名玩家的手牌数，四名玩家的弃牌数，总分
+ERROR = 0x8F   # 错误码
+
+SERVER_EVENTS = {
+    WELCOME: struct.Struct('<BIB'),
+    DEAL: struct.Struct('<HBBQ4i'),
+    ROUND_OVER: struct.Struct('<B4B4H4b4i'),
+    SNAPSHOT: struct.Struct('<HBBBBQQQ4B4B4i'),
+    ERROR: struct.Struct('<B'),
+}
+
+# 客户端发送的事件
+HELLO = 0x80   # 协议版本，房间名的长度，房间名（UTF-8）
+ACK = 0x81   # 已处理的最后一帧的序号
+WATCH = 0x82   # 协议版本，牌桌编号，房间名的长度，房间名（UTF-8）
+
+CLIENT_EVENTS = {
+    HELLO: struct.Struct('<BB'),
+    ACK: struct.Struct('<H'),
+    WATCH: struct.Struct('<BIB'),
+}
+
+# 错误码
+ERROR_BAD_MESSAGE = 1
+ERROR_NOT_SEATED = 2
+ERROR_ILLEGAL_MOVE = 3
+ERROR_ALREADY_SEATED = 4
+ERROR_SERVER_FULL = 5
+ERROR_VERSION = 6
+ERROR_NO_TABLE = 7
+
+ERROR_MESSAGES = {
+    ERROR_BAD_MESSAGE: "无法解析的消息",
+    ERROR_NOT_SEATED: "还没有加入牌桌",
+    ERROR_ILLEGAL_MOVE: "不符合规则的行动",
+    ERROR_ALREADY_SEATED: "已经在牌桌上了",
+    ERROR_SERVER_FULL: "服务器已满",
+    ERROR_VERSION: "协议版本不一致",
+    ERROR_NO_TABLE: "要观看的牌桌不存在",
+}
+
+class ProtocolError(Exception):
+    """收到的数据不符合协议"""
+
+def card_id(info: tuple[int, int]) -> int:
+    return info[0] * 13 + info[1] - 1
+
+def card_info(id: int) -> tuple[int, int]:
+    return id // 13, id % 13 + 1
+
+def cards_to_mask(cards) -> int:
+    """将一组卡牌（CardModel 或 (花色, 点数)）编码为掩码"""
+    mask = 0
+    for card in cards:
+        mask |= 1 << card_id(card.info if isinstance(card, CardModel) else card)
+    return mask
+
+def mask_to_cards(mask: int) -> list[tuple[int, int]]:
+    """将掩码解码为按编号排序的 (花色, 点数) 列表"""
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(card_info(low.bit_length() - 1))
+        mask ^= low
+    return cards
+
+def frame(seq: int, payload) -> bytes:
+    if len(payload) > MAX_FRAME:
+        raise ProtocolError(f"一帧的长度超过了 {MAX_FRAME} 字节")
+    return FRAME_HEADER.pack(len(payload), seq) + bytes(payload)
+
+def event(kind: int, *fields) -> bytes:
+    """编码一个固定长度的服务器事件"""
+    return bytes((kind,)) + SERVER_EVENTS[kind].pack(*fields)
+
+def hello(room: str = '') -> bytes:
+    room_bytes = room.encode()[:255]
+    return bytes((HELLO,)) + CLIENT_EVENTS[HELLO].pack(VERSION, len(room_bytes)) + room_bytes
+
+def watch(table: int = ANY_TABLE, room: str = '') -> bytes:
+    room_bytes = room.encode()[:255]
+    return bytes((WATCH,)) + CLIENT_EVENTS[WATCH].pack(VERSION, table, len(room_bytes)) + room_bytes
+
+def ack(seq: int) -> bytes:
+    return bytes((ACK,)) + CLIENT_EVENTS[ACK].pack(seq)
+
+def parse_frame_header(data) -> tuple[int, int]:
+    """返回帧的 (长度, 序号)"""
+    return FRAME_HEADER.unpack_from(data)
+
+def server_events(payload) -> Iterator[tuple]:
+    """解码服务器发来的一帧，依次给出 (事件类型, 字段...)，行动事件为 (卡牌编号,)"""
+    payload = memoryview(payload)
+    pos = 0
+    while pos < len(payload):
+        kind = payload[pos]
+        pos += 1
+        if kind < 128:
+            yield (kind,)
+            continue
+        layout = SERVER_EVENTS.get(kind)
+        if layout is None or pos + layout.size > len(payload):
+            raise ProtocolError(f"无法解析的事件：{kind}")
+        yield (kind,) + layout.unpack_from(payload, pos)
+        pos += layout.size
+
+def client_events(payload) -> Iterator[tuple]:
+    """解码客户端发来的一帧，依次给出 (事件类型, 字段...)，行动事件为 (卡牌编号,)
+
+    HELLO 为 (HELLO, 版本, 房间名)，WATCH 为 (WATCH, 版本, 牌桌编号, 房间名)
+    """
+    payload = memoryview(payload)
+    pos = 0
+    while pos < len(payload):
+        kind = payload[pos]
+        pos += 1
+        if kind < 52:
+            yield (kind,)
+            continue
+        layout = CLIENT_EVENTS.get(kind)
+        if layout is None or pos + layout.size > len(payload):
+            raise ProtocolError(f"无法解析的事件：{kind}")
+        fields = layout.unpack_from(payload, pos)
+        pos += layout.size
+        if kind == HELLO or kind == WATCH:
+            # 最后一个字段为房间名的长度，房间名紧随其后
+            length = fields[-1]
+            if pos + length > len(payload):
+                raise ProtocolError("房间名不完整")
+            room = bytes(payload[pos:pos + length]).decode(errors='replace')
+            pos += length
+            yield (kind,) + fields[:-1] + (room,)
+        else:
+            yield (kind,) + fields
+
+def first_frame_room(data: bytes) -> Optional[str]:
+    """从客户端的第一帧中读出 HELLO 或 WATCH 的房间名，数据不完整或没有这两种事件时返回 None"""
+    if len(data) < FRAME_HEADER.size:
+        return None
+    length, _ = parse_frame_header(data)
+    payload = data[FRAME_HEADER.size:FRAME_HEADER.size + length]
+    if len(payload) < length:
+        return None
+    try:
+        for fields in client_events(payload):
+            if fields[0] == HELLO or fields[0] == WATCH:
+                return fields[-1]
+    except ProtocolError:
+        pass
+    return None
@@ -19,6 +19,12 @@ DEFAULT_PARAGRAPH_SPACE = 0.0
 DEFAULT_FONT_NAME = None
 DEFAULT_SYSFONT_NAME = None
 FONT_NAME_TEMPLATE = "%s"
+# Called with the font path before it is passed to pygame.font.Font. Set it to a function returning
+# a file-like object to load fonts from somewhere other than the file system.
+FONT_FILE_OPENER = None
+# Called as FONT_LOADER(fontpath, fontsize) to get plain (not bold, italic or underlined) fonts, so
+# they can be shared with the rest of the program. The returned font must not be modified.
+FONT_LOADER = None
 DEFAULT_COLOR = "white"
 DEFAULT_BACKGROUND = None
 DEFAULT_SHADE = 0
@@ -356,6 +362,17 @@ class _FitsizeOptions(_Options):
 	def towrapoptions(self):
 		return self.getsuboptions(_WrapOptions)
 
+# Surface.convert_alpha needs a display mode. Without one (e.g. when only drawing to off-screen
+# surfaces) fall back to an equivalent per-pixel alpha surface.
+def _convert_alpha(surf):
+	if pygame.display.get_surface() is not None:
+		return surf.convert_alpha()
+	if surf.get_flags() & pygame.SRCALPHA:
+		return surf
+	asurf = pygame.Surface(surf.get_size(), pygame.SRCALPHA)
+	asurf.blit(surf, (0, 0))
+	return asurf
+
 _font_cache = {}
 def getfont(**kwargs):
 	options = _GetfontOptions(**kwargs)
@@ -363,9 +380,16 @@ def getfont(**kwargs):
 	if key in _font_cache: return _font_cache[key]
 	if options.sysfontname is not None:
 		font = pygame.font.SysFont(options.sysfontname, options.fontsize, options.bold or False, options.italic or False)
+	elif FONT_LOADER is not None and options.getfontpath() is not None and not (options.bold or options.italic or options.underline):
+		font = FONT_LOADER(options.getfontpath(), options.fontsize)
+		_font_cache[key] = font
+		return font
 	else:
+		fontpath = options.getfontpath()
+		if fontpath is not None and FONT_FILE_OPENER is not None:
+			fontpath = FONT_FILE_OPENER(fontpath)
 		try:
-			font = pygame.font.Font(options.getfontpath(), options.fontsize)
+			font = pygame.font.Font(fontpath, options.fontsize)
 		except IOError:
 			raise IOError("unable to read font filename: %s" % options.getfontpath())
 	if options.bold is not None:
@@ -490,7 +514,7 @@ def _gradsurf(h, y0, y1, color0, color1):
 	key = h, y0, y1, color0, color1
 	if key in _grad_cache:
 		return _grad_cache[key]
-	surf = pygame.Surface((1, h)).convert_alpha()
+	surf = _convert_alpha(pygame.Surface((1, h)))
 	r0, g0, b0 = color0[:3]
 	r1, g1, b1 = color1[:3]
 	for y in range(h):
@@ -603,9 +627,9 @@ class _Span:
 			args = self.text, self.antialias, self.tagspec.color
 			if self.background is not None and not _istransparent(self.background):
 				args += (self.background,)
-			self.surf = self.font.render(*args).convert_alpha()
+			self.surf = _convert_alpha(self.font.render(*args))
 		else:
-			self.surf = self.font.render(self.text, self.antialias, (0, 0, 0)).convert_alpha()
+			self.surf = _convert_alpha(self.font.render(self.text, self.antialias, (0, 0, 0)))
 			w, h = self.surf.get_size()
 			asc = self.font.get_ascent()
 			gsurf0 = _gradsurf(h, 0.5 * asc, asc, self.tagspec.color, self.gcolor)
@@ -613,26 +637,63 @@ class _Span:
 			self.surf.blit(gsurf, (0, 0), None, pygame.BLEND_RGBA_ADD)
 
 
+# Glyph advance widths of a single font, measured on first use of each character. Fonts returned
+# by getfont are themselves cached, so the font object identifies a (font, size, style) combination.
+class _Advances(dict):
+	def __init__(self, font):
+		dict.__init__(self)
+		self.font = font
+	def __missing__(self, c):
+		# Characters the font can't render have no metrics, and are measured as a string instead.
+		metrics = self.font.metrics(c)[0]
+		advance = self[c] = metrics[4] if metrics else self.font.size(c)[0]
+		return advance
+
+_advance_cache = {}
+def _getadvances(font):
+	if font not in _advance_cache:
+		_advance_cache[font] = _Advances(font)
+	return _advance_cache[font]
+
+# Returns whether c is a CJK ideograph, kana, hangul or full-width character. Lines may be broken
+# before or after any such character, since CJK text does not separate words with spaces.
+def _iscjk(c):
+	o = ord(c)
+	return (0x2E80 <= o <= 0x9FFF or 0xAC00 <= o <= 0xD7AF or 0xF900 <= o <= 0xFAFF or
+		0xFE30 <= o <= 0xFE4F or 0xFF00 <= o <= 0xFFEF or 0x20000 <= o <= 0x2FFFF)
+
+# Characters that may not begin a line (closing punctuation) or end a line (opening punctuation).
+_NO_BREAK_BEFORE = set("，。、；：！？）」』】》〉〕”’…—,.;:!?)]}%")
+_NO_BREAK_AFTER = set("（「『【《〈〔“‘([{")
+
 # Finds the last valid breakpoint in the line of text. A breakpoint is a position at which the line
 # can be split without improperly breaking words.
+# Widths are accumulated from cached glyph advances as the text is scanned, and the scan stops at
+# the first character that no longer fits, so breaking a line costs time proportional to the length
+# of the line rather than to the square of it. The chosen break is then measured once with
+# font.size, which accounts for kerning.
 # Returns (breaktext, breakpoint)
 def _breaktext(text, width, font, canbreakatstart = False):
-	# TODO: binary search
-	# The text to be printed that actually comes from text. Does not include stripped characters,
-	# e.g. soft hyphens, trailing or otherwise. Does include trailing spaces.
-	btext = ""
-	# Index of the first character in text that does not appear in btext.
-	b = 0 if canbreakatstart else None
-	# Any additional characters to be appended on return, i.e. hyphen generated by soft hyphens.
-	bapp = ""
-	# Partial buildup of btext.
+	advances = _getadvances(font)
+	# Each candidate is (btext, b, bapp, w): the text preceding the breakpoint (including trailing
+	# spaces), the index of the first character of text after it, the string to be appended on
+	# return (i.e. hyphen generated by soft hyphens), and the approximate width of the line if it
+	# were broken there.
+	candidates = [("", 0, "", 0)] if canbreakatstart else []
+	# Partial buildup of the text to be printed, its width, and its width without trailing spaces.
 	ptext = ""
-
-	def isvalid(t):
-		return width is None or font.size(t)[0] <= width
+	w = wtrim = 0
 
 	for j, c in enumerate(text):
+		# Once the text without trailing spaces no longer fits, neither does any later breakpoint.
+		if width is not None and wtrim > width and candidates:
+			break
 		atbreak, napp = False, ""
+		# A breakpoint is allowed between two characters where either of them is CJK, unless
+		# punctuation forbids it.
+		if j > 0 and c != " " and text[j - 1] not in " -" and (_iscjk(c) or _iscjk(text[j - 1])):
+			if c not in _NO_BREAK_BEFORE and text[j - 1] not in _NO_BREAK_AFTER:
+				candidates.append((ptext, j, "", wtrim))
 		# Space and hyphen character allow for a breakpoint.
 		if c in [" ", "-"]:
 			atbreak = True
@@ -652,18 +713,33 @@ def _breaktext(text, width, font, canbreakatstart = False):
 			c = ""
 			napp = "-"
 		ptext += c
+		if c:
+			w += advances[c]
+			if c != " ":
+				wtrim = w
 		if atbreak:
-			if b is None or isvalid((ptext + napp).rstrip(" ")):
-				btext = ptext
-				b = j + 1
-				bapp = napp
-			else:
+			candidates.append((ptext, j + 1, napp, w + advances["-"] if napp else wtrim))
+			# Stop at the first breakpoint that does not fit, even if the rest of the text would.
+			if width is not None and len(candidates) > 1 and candidates[-1][3] > width:
 				break
 	else:
 		# One past the end of the line is always considered a breakpoint.
-		if b is None or isvalid(ptext):
+		if not candidates or width is None or w <= width and font.size(ptext)[0] <= width:
 			return ptext, len(text)
-	# Invalid breakpoint found. Take trailing spaces starting from the last valid breakpoint.
+
+	# Take the last breakpoint that fits. The scan stops at the first breakpoint that does not fit,
+	# since widths at breakpoints are not monotonic (a soft hyphen adds a hyphen, spaces are trimmed)
+	# and a later breakpoint must not be taken even if it fits again. The first breakpoint is used
+	# even if it does not fit, unless the line can be broken at its start.
+	k = len(candidates) - 1
+	while k > 0 and candidates[k][3] > width:
+		k -= 1
+	# Advances ignore kerning, so confirm the choice with a real measurement, stepping back to
+	# earlier breakpoints in the rare case that it does not fit after all.
+	while k > 0 and font.size((candidates[k][0] + candidates[k][2]).rstrip(" "))[0] > width:
+		k -= 1
+	btext, b, bapp, _ = candidates[k]
+	# Take trailing spaces starting from the last valid breakpoint.
 	while b < len(text) and text[b] == " ":
 		b += 1
 		bapp += " "
@@ -771,7 +847,7 @@ def getsurf(text, **kwargs):
 		ssurf = getsurf(text, **options.update(**sopts))
 		w0, h0 = surf0.get_size()
 		sx, sy = options._spx
-		surf = pygame.Surface((w0 + abs(sx), h0 + abs(sy))).convert_alpha()
+		surf = _convert_alpha(pygame.Surface((w0 + abs(sx), h0 + abs(sy))))
 		surf.fill(options.background or (0, 0, 0, 0))
 		dx, dy = max(sx, 0), max(sy, 0)
 		surf.blit(ssurf, (dx, dy))
@@ -794,7 +870,7 @@ def getsurf(text, **kwargs):
 		osurf = getsurf(text, **options.update(**oopts))
 		w0, h0 = surf0.get_size()
 		opx = options._opx
-		surf = pygame.Surface((w0 + 2 * opx, h0 + 2 * opx)).convert_alpha()
+		surf = _convert_alpha(pygame.Surface((w0 + 2 * opx, h0 + 2 * opx)))
 		surf.fill(options.background or (0, 0, 0, 0))
 		for dx, dy in _circlepoints(opx):
 			surf.blit(osurf, (dx + opx, dy + opx))
@@ -813,7 +889,7 @@ def getsurf(text, **kwargs):
 		# there is only one span Surface, just use that. (We can't use this optimization if there's
 		# a gradient color, because the background color still needs to be applied.)
 		if not spans:
-			surf = pygame.Surface((0, 0)).convert_alpha()
+			surf = _convert_alpha(pygame.Surface((0, 0)))
 		elif len(spans) == 1 and options.gcolor is None:
 			surf = spans[0].surf
 		else:
@@ -824,7 +900,7 @@ def getsurf(text, **kwargs):
 			for span in spans:
 				span.y = int(round(span.jline * linesize + span.jpara * parasize))
 			h = max(span.y for span in spans) + font.get_height()
-			surf = pygame.Surface((w, h)).convert_alpha()
+			surf = _convert_alpha(pygame.Surface((w, h)))
 			surf.fill(options.background or (0, 0, 0, 0))
 			for span in spans:
 				x = int(round(span.x + options.align * (w - span.linewidth)))
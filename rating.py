@@ -0,0 +1,207 @@
+"""电脑玩家和玩家的等级分，由每局的名次增量更新
+
+一局四名玩家的名次拆成六组两两之间的胜负（名次在前者胜），只累计到计数中，每局的更新为 O(1)：
+    players：每名玩家的局数、第一名的局数和得分之和
+    wins：wins[a][b] 为 a 名次在 b 之前的次数
+等级分是这些计数的 Bradley-Terry 模型的最大后验估计，换算为 Elo 的刻度（相差400分时胜率约为91%）。
+估计使用 MM 迭代（Hunter, 2004），每次迭代的计算量只与有过交手的玩家对数有关，与局数无关，
+并从上一次的估计开始迭代，新增少量对局后只需几次迭代。每名玩家与一名虚拟的1500分玩家各有 prior 胜 prior 负，
+避免全胜或全负的玩家等级分发散，也把整个刻度固定在1500分附近。
+计数的合并就是相加，与局的先后顺序无关：锦标赛的各个工作进程各自统计，最后合并为一份，结果与在一个进程中统计相同。
+
+状态保存为 JSON 文件，先写入临时文件再改名替换。
+
+运行 `python rating.py 文件...` 合并多个状态文件并显示等级分，加上 `-o 输出文件` 时保存合并后的状态。
+"""
+from __future__ import annotations
+import json
+import math
+import os
+import sys
+from typing import Optional
+
+class RatingSettings:
+    """等级分的设置类"""
+    def __init__(self):
+        self.base = 1500.0   # 虚拟玩家的等级分
+        self.scale = 400.0   # 等级分相差这么多时，胜负的比值为10
+        self.prior = 1.0   # 每名玩家与虚拟玩家的虚拟胜局数和负局数
+        self.tolerance = 1e-6   # 所有玩家的强度（对数）变化都小于这个值时停止迭代
+        self.max_iterations = 1000
+
+
+class Ratings:
+    """可合并的胜负计数，以及由计数估计的等级分"""
+
+    def __init__(self, settings: RatingSettings = None):
+        self.settings = settings if settings is not None else RatingSettings()
+        self.games = 0
+        self.players: dict[str, list] = {}   # 名称 -> [局数, 第一名的局数, 得分之和]
+        self.wins: dict[str, dict[str, int]] = {}
+        self.strength: dict[str, float] = {}   # 上一次估计的强度（虚拟玩家为1），作为下一次迭代的起点
+        self.fitted = True   # strength 是否已经包含了所有的计数
+
+    def record(self, ranking: list[str], deltas: Optional[list[int]] = None) -> None:
+        """记录一局的结果，ranking 为按名次从先到后排列的玩家名称，deltas 为对应的得分
+
+        同一名称出现多次时（如同一种电脑玩家坐了两个座位），它们之间的胜负不计入
+        """
+        self.games += 1
+        for i, name in enumerate(ranking):
+            stats = self.players.get(name)
+            if stats is None:
+                stats = self.players[name] = [0, 0, 0]
+                self.wins[name] = {}
+            stats[0] += 1
+            stats[1] += i == 0
+            if deltas is not None:
+                stats[2] += deltas[i]
+        for i, winner in enumerate(ranking):
+            row = self.wins[winner]
+            for loser in ranking[i + 1:]:
+                if loser != winner:
+                    row[loser] = row.get(loser, 0) + 1
+        self.fitted = False
+
+    def merge(self, other: Ratings) -> None:
+        """把另一份计数（如另一个工作进程的统计）加到这一份中"""
+        self.games += other.games
+        for name, stats in other.players.items():
+            mine = self.players.setdefault(name, [0, 0, 0])
+            for i in range(3):
+                mine[i] += stats[i]
+            self.wins.setdefault(name, {})
+        for winner, row in other.wins.items():
+            mine = self.wins[winner]
+            for loser, count in row.items():
+                mine[loser] = mine.get(loser, 0) + count
+        for name, strength in other.strength.items():
+            self.strength.setdefault(name, strength)
+        self.fitted = False
+
+    def rating(self, name: str) -> tuple[float, float]:
+        """玩家的等级分及其标准差，没有记录的玩家为虚拟玩家的等级分"""
+        self.fit()
+        strength = self.strength.get(name, 1.0)
+        factor = self.settings.scale / math.log(10)
+        # 标准差由对数强度的 Fisher 信息估计
+        information = self.settings.prior / 2
+        for other, games in self._games_against(name).items():
+            other_strength = self.strength[other]
+            information += games * strength * other_strength / (strength + other_strength) ** 2
+        return self.settings.base + factor * math.log(strength), factor / math.sqrt(information)
+
+    def leaderboard(self) -> list[dict]:
+        """按等级分从高到低排列的所有玩家"""
+        entries = []
+        for name, (games, firsts, score) in self.players.items():
+            rating, deviation = self.rating(name)
+            entries.append({
+                'name': name,
+                'rating': round(rating, 1),
+                'deviation': round(deviation, 1),
+                'games': games,
+                'first_rate': round(firsts / games, 4) if games else None,
+                'mean_score': round(score / games, 4) if games else None
+            })
+        entries.sort(key=lambda entry: entry['rating'], reverse=True)
+        return entries
+
+    def fit(self) -> int:
+        """用 MM 迭代更新所有玩家的强度，返回迭代次数"""
+        if self.fitted:
+            return 0
+        prior = self.settings.prior
+        losses: dict[str, dict[str, int]] = {name: {} for name in self.players}
+        for winner, row in self.wins.items():
+            for loser, count in row.items():
+                losses[loser][winner] = count
+        strength = {name: self.strength.get(name, 1.0) for name in self.players}
+        iterations = 0
+        while iterations < self.settings.max_iterations:
+            iterations += 1
+            change = 0.0
+            for name in self.players:
+                current = strength[name]
+                won = prior + sum(self.wins[name].values())
+                denominator = 2 * prior / (current + 1.0)
+                for other, count in self.wins[name].items():
+                    denominator += count / (current + strength[other])
+                for other, count in losses[name].items():
+                    denominator += count / (current + strength[other])
+                strength[name] = won / denominator
+                change = max(change, abs(math.log(strength[name] / current)))
+            if change < self.settings.tolerance:
+                break
+        self.strength = strength
+        self.fitted = True
+        return iterations
+
+    def to_dict(self) -> dict:
+        return {'games': self.games, 'players': self.players, 'wins': self.wins, 'strength': self.strength}
+
+    @classmethod
+    def from_dict(cls, data: dict, settings: RatingSettings = None) -> Ratings:
+        ratings = cls(settings)
+        ratings.games = data['games']
+        ratings.players = {name: list(stats) for name, stats in data['players'].items()}
+        ratings.wins = {name: dict(row) for name, row in data['wins'].items()}
+        ratings.strength = dict(data.get('strength', {}))
+        ratings.fitted = False
+        return ratings
+
+    def save(self, path: str) -> None:
+        """保存状态（先拟合，下次载入后可以从当前的估计开始迭代）"""
+        self.fit()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, settings: RatingSettings = None) -> Ratings:
+        """载入保存的状态，文件不存在时返回空的状态"""
+        try:
+            with open(path, encoding='utf-8') as file:
+                return cls.from_dict(json.load(file), settings)
+        except FileNotFoundError:
+            return cls(settings)
+
+    def _games_against(self, name: str) -> dict[str, int]:
+        games = dict(self.wins.get(name, {}))
+        for other, row in self.wins.items():
+            if name in row:
+                games[other] = games.get(other, 0) + row[name]
+        return games
+
+
+def print_leaderboard(ratings: Ratings) -> None:
+    print(f"{'名称':<16}{'等级分':>10}{'标准差':>8}{'局数':>10}{'第一名':>10}{'平均得分':>10}")
+    for entry in ratings.leaderboard():
+        print(
+            f"{entry['name']:<16}{entry['rating']:>10}{entry['deviation']:>8}{entry['games']:>10}"
+            f"{entry['first_rate']!s:>10}{entry['mean_score']!s:>10}"
+        )
+
+
+def main():
+    args = sys.argv[1:]
+    output = None
+    if '-o' in args:
+        index = args.index('-o')
+        output = args[index + 1]
+        del args[index:index + 2]
+    ratings = Ratings()
+    for path in args:
+        ratings.merge(Ratings.load(path))
+    print_leaderboard(ratings)
+    if output is not None:
+        ratings.save(output)
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,27 @@
-from typing import Optional
+from __future__ import annotations
+from typing import Optional, TYPE_CHECKING
 import pygame
 import ptext
 from pygame import Surface
 from pygame.sprite import Sprite
-from settings import Settings
 from window import Window
 from button import Button
 
+if TYPE_CHECKING:
+    from datong_solitaire import DaTongSolitaire
+
 class RuleWindow(Window):
     """用于显示规则的窗口"""
-    def __init__(self):
-        self.settings = Settings()
+    def __init__(self, game: DaTongSolitaire):
+        self.settings = game.settings
         super().__init__(
+            game,
             width=self.settings.rule_window.width,
             height=self.settings.rule_window.height
         )
         self.text = self.settings.rule_window.text
         self.exit_button = Button(
+            self.game,
             msg=self.settings.rule_window.exit_button.msg,
             width=self.settings.rule_window.exit_button.width,
             height=self.settings.rule_window.exit_button.height,
@@ -24,16 +29,15 @@ class RuleWindow(Window):
             y=self.settings.rule_window.exit_button.centery,
             parent_obj=self
         )
-    
-    def blitme(self, surface: Optional[Surface] = None) -> None:
-        super().blitme(surface)
+        self.buttons.add(self.exit_button)
+        # 规则文字不会改变，直接绘制到窗口的图像上
         ptext.draw(
+            surf=self.image,
             text=self.text,
-            pos=(self.rect.x + self.settings.rule_window.left_margin, self.rect.y + self.settings.rule_window.top_margin),
+            pos=(self.settings.rule_window.left_margin, self.settings.rule_window.top_margin),
             width=self.width - self.settings.rule_window.left_margin * 2,
             fontname=self.settings.font_path,
             fontsize=self.settings.rule_window.font_size,
             color=self.settings.rule_window.text_color
         )
-        self.exit_button.blitme(self.image)
         
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""大通纸牌的规则：发牌、更新可打出的牌和结算
+
+这里只处理 CardModel 和列表，不依赖 pygame，本地的游戏和服务器上的牌桌使用同一套规则。
+"""
+from random import Random
+from functools import cmp_to_key
+from card_model import CardModel
+
+def deal(rng: Random = None) -> tuple[list[list[CardModel]], int]:
+    """洗牌并发牌，返回四名玩家排好序的手牌和持有黑桃7的玩家（先手玩家）"""
+    cards = [(i, j) for i in range(4) for j in range(1, 13+1)]
+    if rng is None:
+        rng = Random()
+    rng.shuffle(cards)
+    hands: list[list[CardModel]] = [[], [], [], []]
+    start_player = 0
+    for i in range(4):
+        hand_cards = cards[i*13:(i+1)*13]
+        hand_cards.sort(key=cmp_to_key(CardModel.cmp))
+        if (0, 7) in hand_cards:
+            start_player = i
+        for card_tuple in hand_cards:
+            hands[i].append(CardModel(*card_tuple, i))
+    return hands, start_player
+
+def update_playable_cards(playable_cards: list[tuple], hands: list[list[CardModel]], card: CardModel) -> None:
+    """打出 card 后更新可打出牌的列表，并标记手牌中新的可打出的牌"""
+    playable_cards.remove(card.info)
+    card.playable = False
+    if card.info == (0, 7):
+        for i in range(1, 4):
+            playable_cards.append((i, 7))
+        playable_cards.append((0, 6))
+        playable_cards.append((0, 8))
+    elif card.rank == 7:
+        playable_cards.append((card.suit, 6))
+        playable_cards.append((card.suit, 8))
+    elif card.rank == 1 or card.rank == 13:
+        pass
+    elif card.rank < 7:
+        playable_cards.append((card.suit, card.rank - 1))
+    elif card.rank > 7:
+        playable_cards.append((card.suit, card.rank + 1))
+    else:
+        raise Exception("We met a mistake in updating playable_cards!")
+
+    for hand in hands:
+        for hand_card in hand:
+            if hand_card.info in playable_cards:
+                hand_card.playable = True
+
+def can_play(hand: list[CardModel], playable_cards: list[tuple]) -> bool:
+    """手牌中是否有可以打出的牌"""
+    for card in hand:
+        if card.info in playable_cards:
+            return True
+    return False
+
+def settle(trashed_cards: list[list[CardModel]], start_player: int, base_score: list[int]) -> tuple[list[tuple[int, float]], int, list[int]]:
+    """结算一局游戏
+
+    返回按名次排序的 (玩家, 点数) 列表、得分倍数（大通时为2）和每名玩家的得分
+    """
+    score_multiply_power = 1
+    # 弃牌点数加总
+    points = [0, 0, 0, 0]
+    for i, player_trashed_cards in enumerate(trashed_cards):
+        for card in player_trashed_cards:
+            points[i] += card.rank
+    # 后手玩家惩罚点数
+    for i in range(4):
+        points[(start_player + i) % 4] += i / 10
+    # 排序得出分数
+    sorted_player_points_pairs = sorted(enumerate(points), key=lambda x: x[1])
+    if sorted_player_points_pairs[0][1] < 1:
+        score_multiply_power = 2   # 大通
+    deltas = [0, 0, 0, 0]
+    for i, pair in enumerate(sorted_player_points_pairs):
+        deltas[pair[0]] = base_score[i] * score_multiply_power
+    return sorted_player_points_pairs, score_multiply_power, deltas
+
+def playable_cards_from_played(played: set[tuple[int, int]]) -> list[tuple]:
+    """根据场上已经打出的牌推算可打出牌的列表（用于从快照恢复状态）"""
+    if (0, 7) not in played:
+        return [(0, 7)]
+    playable_cards = []
+    for suit in range(4):
+        if (suit, 7) not in played:
+            playable_cards.append((suit, 7))
+            continue
+        low = 7
+        while (suit, low - 1) in played:
+            low -= 1
+        if low > 1:
+            playable_cards.append((suit, low - 1))
+        high = 7
+        while (suit, high + 1) in played:
+            high += 1
+        if high < 13:
+            playable_cards.append((suit, high + 1))
+    return playable_cards
@@ -0,0 +1,56 @@
+import heapq
+from itertools import count
+from typing import Callable
+
+class Scheduler:
+    """按游戏时间调度定时动作的调度器
+
+    调度器不会自己计时，而是由游戏主循环每推进一步游戏逻辑就调用一次 advance，
+    因此暂停、快进游戏逻辑时，定时动作也随之暂停、快进。
+    """
+
+    def __init__(self):
+        self.time = 0   # 当前的游戏时间（毫秒）
+        self.paused = False
+        # 按到期时间排列的小根堆，元素为 (到期时间, 任务编号, 动作)，任务编号保证同时到期的动作按调度顺序执行
+        self.queue: list[tuple[int, int, Callable[[], None]]] = []
+        self.cancelled: set[int] = set()
+        self.task_ids = count()
+
+    def schedule(self, delay: int, action: Callable[[], None]) -> int:
+        """在 delay 毫秒的游戏时间后执行 action，返回可用于取消的任务编号"""
+        task_id = next(self.task_ids)
+        heapq.heappush(self.queue, (self.time + delay, task_id, action))
+        return task_id
+
+    def cancel(self, task_id: int) -> None:
+        """取消尚未执行的任务"""
+        if any(task[1] == task_id for task in self.queue):
+            self.cancelled.add(task_id)
+
+    def cancel_all(self) -> None:
+        """取消所有尚未执行的任务"""
+        self.queue = []
+        self.cancelled.clear()
+
+    def pause(self) -> None:
+        self.paused = True
+
+    def resume(self) -> None:
+        self.paused = False
+
+    def pending(self) -> bool:
+        """是否还有尚未执行的任务"""
+        return len(self.queue) > len(self.cancelled)
+
+    def advance(self, dt: int) -> None:
+        """推进 dt 毫秒的游戏时间，并依次执行所有到期的任务"""
+        if self.paused:
+            return
+        self.time += dt
+        while self.queue and self.queue[0][0] <= self.time:
+            _, task_id, action = heapq.heappop(self.queue)
+            if task_id in self.cancelled:
+                self.cancelled.remove(task_id)
+                continue
+            action()
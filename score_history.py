@@ -0,0 +1,264 @@
+"""每局游戏结果的历史记录，保存在 SQLite 数据库中，用于显示玩家的生涯统计和排行榜
+
+数据库使用 WAL 模式，写入在单独的写入线程中进行，查询可以与写入同时进行。表结构：
+    rounds：每局一行，记录结束时间、牌局编号（deal）、先手玩家和是否大通
+    results：每局每名玩家一行，记录名次（0为第一名）、弃牌的点数之和和得分，按 (玩家, 局) 建有索引，用于查询最近的对局
+    players：每名玩家一行的累计统计（局数、胜局数、大通次数、总分、名次和点数之和），
+        与对局记录在同一个事务中更新，生涯统计和排行榜只需读取这张表，无需扫描所有对局
+牌局编号为13字节：按卡牌编号的顺序，每张牌用2位记录发牌时持有它的座位，可以由编号还原整副牌的发牌。
+
+游戏只需把一局的结果放入队列。写入线程等待 batch_delay 秒（或者攒够 max_batch 局）后，
+把队列中的所有结果在一个事务中写入，每名玩家的累计统计在一批中只更新一次。
+查询在调用者的线程中使用单独的连接，不包括还在队列中的结果，需要时先调用 sync。
+写入出错（如数据库被锁定、磁盘已满）时写入线程停止，之后的结果不再记录，sync 和 close 抛出这个错误。
+
+这里不依赖 pygame。
+"""
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+from card_model import CardModel
+import protocol
+
+if TYPE_CHECKING:
+    from settings import Settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    deal BLOB,
+    start_player INTEGER NOT NULL,
+    datong INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rounds_deal ON rounds (deal);
+CREATE TABLE IF NOT EXISTS results (
+    round_id INTEGER NOT NULL,
+    seat INTEGER NOT NULL,
+    player TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    delta INTEGER NOT NULL,
+    PRIMARY KEY (round_id, seat)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_player ON results (player, round_id);
+CREATE TABLE IF NOT EXISTS players (
+    player TEXT PRIMARY KEY,
+    rounds INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    datongs INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    rank_sum INTEGER NOT NULL,
+    points_sum INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS players_score ON players (score);
+"""
+
+UPSERT_PLAYER = """
+INSERT INTO players (player, rounds, wins, datongs, score, rank_sum, points_sum) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (player) DO UPDATE SET
+    rounds = rounds + excluded.rounds,
+    wins = wins + excluded.wins,
+    datongs = datongs + excluded.datongs,
+    score = score + excluded.score,
+    rank_sum = rank_sum + excluded.rank_sum,
+    points_sum = points_sum + excluded.points_sum
+"""
+
+def deal_id(hand: list[list[CardModel]]) -> bytes:
+    """由发牌时四名玩家的手牌生成13字节的牌局编号"""
+    value = 0
+    for seat, cards in enumerate(hand):
+        for card in cards:
+            value |= seat << (2 * protocol.card_id(card.info))
+    return value.to_bytes(13, 'little')
+
+def deal_from_id(deal: bytes) -> list[list[tuple[int, int]]]:
+    """由牌局编号还原四名玩家的手牌"""
+    value = int.from_bytes(deal, 'little')
+    hand: list[list[tuple[int, int]]] = [[], [], [], []]
+    for id in range(52):
+        hand[(value >> (2 * id)) & 3].append(protocol.card_info(id))
+    return hand
+
+
+class ScoreHistory:
+    """对局结果的历史记录：在写入线程中批量写入，在调用者的线程中查询"""
+
+    def __init__(self, settings: Settings.ScoreHistory):
+        self.settings = settings
+        # 以下由写入线程使用，queue 中为待写入的一局结果
+        self.condition = threading.Condition()
+        self.queue: list[tuple] = []
+        self.submitted = 0   # 放入队列的局数
+        self.written = 0   # 已经提交事务的局数
+        self.commits = 0   # 写入事务的次数
+        self.closing = False
+        self.flushing = False   # 是否有调用者在等待写入，这时不再等待 batch_delay
+        self.idle = False   # 写入线程是否正在等待新的结果，只有这时才需要唤醒它
+        self.error: Optional[Exception] = None   # 写入线程出错时的错误，之后不再写入
+        self.writer: threading.Thread = None
+        self.reader: Optional[sqlite3.Connection] = None   # 查询用的连接，只在第一次查询的线程中使用
+
+    def record_round(
+        self,
+        deal: Optional[bytes],
+        start_player: int,
+        sorted_player_points_pairs: list[tuple[int, float]],
+        score_multiply_power: int,
+        deltas: list[int],
+        player_name: list[str]
+    ) -> None:
+        """记录一局结束时的结算结果，deal 为牌局编号，不知道发牌时（如从对局日志恢复的一局）为 None"""
+        # 结算的点数中含有按出牌顺序区分名次的零头（不超过0.3），记录的是弃牌的点数之和
+        results = [(seat, player_name[seat], rank, int(points), deltas[seat]) for rank, (seat, points) in enumerate(sorted_player_points_pairs)]
+        with self.condition:
+            if self.error is not None:
+                return
+            self.queue.append((time.time(), deal, start_player, score_multiply_power == 2, results))
+            self.submitted += 1
+            if self.idle or len(self.queue) >= self.settings.max_batch:
+                self.condition.notify_all()
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_loop, name='score-history', daemon=True)
+            self.writer.start()
+
+    def player_stats(self, player: str) -> Optional[dict]:
+        """玩家的生涯统计，没有记录时返回 None"""
+        row = self._query('SELECT * FROM players WHERE player = ?', (player,))
+        return self._stats(row[0]) if row else None
+
+    def leaderboard(self, limit: int = 10) -> list[dict]:
+        """按总分从高到低排列的玩家及其生涯统计"""
+        rows = self._query('SELECT * FROM players ORDER BY score DESC LIMIT ?', (limit,))
+        return [self._stats(row) for row in rows]
+
+    def recent_rounds(self, player: str, limit: int = 10) -> list[dict]:
+        """玩家最近的几局，从新到旧排列"""
+        rows = self._query(
+            'SELECT r.id, r.played_at, r.datong, s.seat, s.rank, s.points, s.delta FROM results s '
+            'JOIN rounds r ON r.id = s.round_id WHERE s.player = ? ORDER BY s.round_id DESC LIMIT ?',
+            (player, limit)
+        )
+        keys = ('round', 'played_at', 'datong', 'seat', 'rank', 'points', 'delta')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def sync(self) -> None:
+        """等待已经记录的所有结果写入数据库"""
+        with self.condition:
+            if self.written < self.submitted:
+                self.flushing = True
+                self.condition.notify_all()
+            while self.written < self.submitted and self.error is None:
+                self.condition.wait()
+            if self.error is not None:
+                raise self.error
+
+    def close(self) -> None:
+        """把剩余的结果写入数据库并结束写入线程"""
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        if self.writer is None:
+            return
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        self.writer.join()
+        self.writer = None
+        if self.error is not None:
+            raise self.error
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.settings.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.settings.path, timeout=self.settings.busy_timeout)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')   # WAL 模式下只在检查点时 fsync，意外断电最多丢失最近的几批
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _query(self, sql: str, params: tuple) -> list[tuple]:
+        if self.reader is None:
+            self.reader = self._connect()
+        return self.reader.execute(sql, params).fetchall()
+
+    def _stats(self, row: tuple) -> dict:
+        player, rounds, wins, datongs, score, rank_sum, points_sum = row
+        return {
+            'player': player,
+            'rounds': rounds,
+            'wins': wins,
+            'datongs': datongs,
+            'score': score,
+            'mean_rank': rank_sum / rounds + 1 if rounds else None,
+            'mean_points': points_sum / rounds if rounds else None
+        }
+
+    def _write_loop(self) -> None:
+        """写入线程：等待一批结果攒齐，在一个事务中写入对局记录并更新累计统计"""
+        try:
+            conn = self._connect()
+        except (sqlite3.Error, OSError) as e:
+            self._fail(e)
+            return
+        while True:
+            with self.condition:
+                while not self.queue and not self.closing:
+                    self.idle = True
+                    self.condition.wait()
+                    self.idle = False
+                # 第一局结果到达后再等待 batch_delay 秒，让之后的结果一起写入
+                deadline = time.monotonic() + self.settings.batch_delay
+                while len(self.queue) < self.settings.max_batch and not self.closing and not self.flushing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self.condition.wait(remaining):
+                        break
+                if not self.queue:
+                    break
+                items = self.queue
+                self.queue = []
+                self.flushing = False
+            try:
+                self._write(conn, items)
+            except (sqlite3.Error, OSError) as e:
+                self._fail(e)
+                break
+            with self.condition:
+                self.written += len(items)
+                self.condition.notify_all()
+        conn.close()
+
+    def _fail(self, error: Exception) -> None:
+        """写入出错：记下错误，丢弃队列中的结果，并唤醒等待写入的调用者"""
+        with self.condition:
+            self.error = error
+            self.queue = []
+            self.condition.notify_all()
+
+    def _write(self, conn: sqlite3.Connection, items: list[tuple]) -> None:
+        totals: dict[str, list] = {}
+        with conn:
+            for played_at, deal, start_player, datong, results in items:
+                round_id = conn.execute(
+                    'INSERT INTO rounds (played_at, deal, start_player, datong) VALUES (?, ?, ?, ?)',
+                    (played_at, deal, start_player, datong)
+                ).lastrowid
+                conn.executemany(
+                    'INSERT INTO results (round_id, seat, player, rank, points, delta) VALUES (?, ?, ?, ?, ?, ?)',
+                    [(round_id, *result) for result in results]
+                )
+                for seat, player, rank, points, delta in results:
+                    total = totals.setdefault(player, [0, 0, 0, 0, 0, 0])
+                    total[0] += 1
+                    total[1] += rank == 0
+                    total[2] += datong and rank == 0
+                    total[3] += delta
+                    total[4] += rank
+                    total[5] += points
+            conn.executemany(UPSERT_PLAYER, [(player, *total) for player, total in totals.items()])
+        self.commits += 1
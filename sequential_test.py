@@ -0,0 +1,87 @@
+"""比较两种电脑玩家的序贯检验：对局结果逐局到达，结论已经显著时提前停止
+
+每局的观测值为第一种电脑玩家的座位的平均得分减去第二种的（座位轮换，每局各坐两个座位）。
+检验 H0：平均得分差为 delta0，H1：平均得分差为 delta1，使用正态近似的序贯概率比检验（GSPRT）：
+    LLR = n * (delta1 - delta0) * (2 * 均值 - delta0 - delta1) / (2 * 方差)
+其中方差由已有的观测估计。LLR 不低于 log((1 - beta) / alpha) 时接受 H1，不高于 log(beta / (1 - alpha)) 时接受 H0，
+两类错误的概率分别约为 alpha 和 beta。观测少于 min_games 时方差的估计还不可靠，不做判断。
+均值和方差用 Welford 算法逐个更新，每个观测为 O(1)。
+"""
+from __future__ import annotations
+import math
+from statistics import NormalDist
+from typing import Optional
+
+H0 = 'H0'
+H1 = 'H1'
+
+class SequentialTestSettings:
+    """序贯检验的设置类"""
+    def __init__(self):
+        self.alpha = 0.05   # H0 成立时错误接受 H1 的概率
+        self.beta = 0.05   # H1 成立时错误接受 H0 的概率
+        self.delta0 = 0.0   # H0 的平均得分差
+        self.delta1 = 0.5   # H1 的平均得分差
+        self.min_games = 200
+        self.confidence = 0.95   # 报告的得分差置信区间的置信水平
+
+
+class SequentialTest:
+    """逐个加入观测值的序贯概率比检验"""
+
+    def __init__(self, settings: SequentialTestSettings = None):
+        self.settings = settings if settings is not None else SequentialTestSettings()
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0   # 与均值之差的平方和
+        self.lower = math.log(self.settings.beta / (1 - self.settings.alpha))
+        self.upper = math.log((1 - self.settings.beta) / self.settings.alpha)
+
+    def add(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def llr(self) -> float:
+        """当前的对数似然比，方差为0时为0"""
+        variance = self.variance
+        if variance <= 0:
+            return 0.0
+        delta0, delta1 = self.settings.delta0, self.settings.delta1
+        return self.n * (delta1 - delta0) * (2 * self.mean - delta0 - delta1) / (2 * variance)
+
+    def decision(self) -> Optional[str]:
+        """已经可以下结论时返回 H0 或 H1，否则返回 None"""
+        if self.n < self.settings.min_games:
+            return None
+        llr = self.llr()
+        if llr >= self.upper:
+            return H1
+        if llr <= self.lower:
+            return H0
+        return None
+
+    def interval(self) -> tuple[float, float]:
+        """平均得分差的置信区间（正态近似）"""
+        if self.n < 2:
+            return -math.inf, math.inf
+        z = NormalDist().inv_cdf((1 + self.settings.confidence) / 2)
+        half = z * math.sqrt(self.variance / self.n)
+        return self.mean - half, self.mean + half
+
+    def report(self) -> dict:
+        low, high = self.interval()
+        return {
+            'games': self.n,
+            'decision': self.decision(),
+            'mean_diff': round(self.mean, 4),
+            'interval': (round(low, 4), round(high, 4)),
+            'llr': round(self.llr(), 3),
+            'bounds': (round(self.lower, 3), round(self.upper, 3))
+        }
+
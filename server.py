@@ -0,0 +1,585 @@
+"""多牌桌的大通纸牌游戏服务器
+
+一个进程用 asyncio 同时运行多张牌桌。客户端通过 TCP 连接，使用 protocol.py 中的二进制协议通信：
+客户端先发送 HELLO（可以带房间名），之后每次行动发送一个字节的卡牌编号。
+加入的玩家坐到同一房间中正在等待的牌桌上，牌桌坐满或等待 fill_delay 秒后开局，空座位由电脑玩家补上。
+牌桌不创建任务，电脑的行动和超时都通过事件循环的定时回调完成，每张牌桌只占用固定大小的内存。
+
+观众发送 WATCH 观看一张牌桌。牌桌的公开事件每一帧只编码一次，同一份数据写给所有观众；
+发送缓冲区积压的观众跳过增量，缓冲区清空后改发一次快照，积压过多则被断开，都不会拖慢牌桌。
+
+运行 `python server.py [--port 端口] [--fill-delay 秒数]` 启动服务器。
+"""
+from __future__ import annotations
+import asyncio
+import socket
+import sys
+from random import Random
+from typing import Optional
+from ai_agent import AiAgent, AiAgentNormal
+from table import Table, IllegalMove
+import protocol
+
+class ServerSettings:
+    """游戏服务器的设置类"""
+    def __init__(self):
+        self.host = '127.0.0.1'
+        self.port = 8765
+        self.base_score = [6, -1, -2, -3]
+        self.bot_class: type[AiAgent] = AiAgentNormal   # 补上空座位的电脑玩家
+        self.bot_delay = 1.0   # 电脑玩家行动前等待的秒数，为0时立即行动
+        self.turn_timeout = 30.0   # 玩家超过这么多秒没有行动，则由电脑代替其行动
+        self.fill_delay = 10.0   # 牌桌没有坐满时，等待其他玩家加入的秒数，为0时第一名玩家坐下后立即开局
+        self.round_delay = 3.0   # 一局结束后到下一局开始的秒数
+        self.max_tables = 10000
+        self.flush_delay = 0.01   # 事件最多积攒这么多秒后合并为一帧发送，为0时在事件循环的下一轮发送
+        self.ack_window = 64   # 客户端有这么多帧没有确认时，暂停发送增量，追上后改发快照
+        self.write_buffer_limit = 64 * 1024   # 发送缓冲区超过这么多字节的客户端视为过慢，将被断开
+        self.spectator_buffer_limit = 16 * 1024   # 观众的发送缓冲区超过这么多字节时暂停发送增量，清空后改发快照
+        self.max_frame = 512   # 客户端的一帧的最大长度
+        self.seed: Optional[int] = None   # 固定随机数种子后，牌桌的发牌可以复现
+
+
+class Client:
+    """一个连接到服务器的客户端，以及发给它、尚未发送的事件"""
+
+    __slots__ = ('writer', 'table', 'seat', 'watching', 'closed', 'pending', 'seq', 'acked', 'stalled', 'flush_handle')
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.table: Optional[ServerTable] = None
+        self.seat = -1
+        self.watching: Optional[ServerTable] = None   # 正在观看的牌桌
+        self.closed = False
+        self.pending = bytearray()   # 下一帧的事件
+        self.seq = 0   # 下一帧的序号
+        self.acked = 0xFFFF   # 客户端确认过的最后一帧的序号
+        self.stalled = False   # 客户端落后太多，暂停发送增量
+        self.flush_handle: Optional[asyncio.Handle] = None
+
+    def unacked(self) -> int:
+        """已经发送但客户端还没有确认的帧数"""
+        return (self.seq - 1 - self.acked) & 0xFFFF
+
+    def close(self, abort: bool = False) -> None:
+        """断开连接，abort 为 True 时丢弃发送缓冲区中的数据（不等待过慢的客户端读完）"""
+        if not self.closed:
+            self.closed = True
+            if self.flush_handle is not None:
+                self.flush_handle.cancel()
+            if not abort:
+                self.writer.close()
+        if abort:
+            # 已经关闭、但还在等待发送缓冲区清空的连接也立即断开
+            self.writer.transport.abort()
+
+
+class SpectatorFeed:
+    """一张牌桌的所有观众，以及发给观众、尚未发送的公开事件
+
+    所有观众看到的内容相同，因此共用一个序号，每一帧只编码一次。
+    观众的 stalled 表示下一次发送时要改发快照（刚开始观看或者跳过了增量）。
+    """
+
+    __slots__ = ('spectators', 'pending', 'seq', 'flush_handle')
+
+    def __init__(self):
+        self.spectators: set[Client] = set()
+        self.pending = bytearray()
+        self.seq = 0
+        self.flush_handle: Optional[asyncio.Handle] = None
+
+
+class ServerTable(Table):
+    """服务器上的牌桌，记录每个座位上的客户端（None 为电脑玩家）和等待中的定时回调"""
+
+    def __init__(self, id: int, settings: ServerSettings, rng: Random):
+        super().__init__(id, settings, rng)
+        self.clients: list[Optional[Client]] = [None, None, None, None]
+        self.bots: list[AiAgent] = [settings.bot_class(self, i) for i in range(4)]
+        self.timer: Optional[asyncio.TimerHandle] = None   # 下一次电脑行动、玩家超时或开局
+        self.room = ''
+        self.feed: Optional[SpectatorFeed] = None   # 有观众时才创建
+
+    def humans(self) -> int:
+        return sum(client is not None for client in self.clients)
+
+    def humans_mask(self) -> int:
+        return sum(1 << i for i, client in enumerate(self.clients) if client is not None)
+
+    def free_seat(self) -> int:
+        for i, client in enumerate(self.clients):
+            if client is None:
+                return i
+        return -1
+
+    def cancel_timer(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def snapshot(self, seat: int) -> bytes:
+        """座位 seat 所能看到的完整状态，seat 为 -1 时为观众看到的公开状态"""
+        hand_masks = [protocol.cards_to_mask(hand) for hand in self.hand]
+        trash_masks = [protocol.cards_to_mask(trash) for trash in self.trashed_cards]
+        # 不在任何人手中、也没有被弃置的牌都在场上
+        played_mask = 0
+        if self.round > 0:
+            played_mask = (1 << 52) - 1
+            for mask in hand_masks + trash_masks:
+                played_mask &= ~mask
+        return protocol.event(
+            protocol.SNAPSHOT,
+            self.round & 0xFFFF,
+            1 if self.playing else 0,
+            self.start_player,
+            self.current_player,
+            self.humans_mask(),
+            hand_masks[seat] if seat >= 0 else 0,
+            played_mask,
+            trash_masks[seat] if seat >= 0 else 0,
+            *[len(hand) for hand in self.hand],
+            *[len(trash) for trash in self.trashed_cards],
+            *self.score
+        )
+
+
+class GameServer:
+    """管理所有牌桌和客户端连接的服务器"""
+
+    def __init__(self, settings: ServerSettings = None):
+        self.settings = settings if settings is not None else ServerSettings()
+        self.rng = Random(self.settings.seed)
+        self.tables: dict[int, ServerTable] = {}
+        self.waiting_tables: dict[str, ServerTable] = {}   # 各个房间中还没有开局、可以加入的牌桌
+        self.latest_tables: dict[str, ServerTable] = {}   # 各个房间中最新的牌桌，供观众观看
+        self.next_table_id = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.handlers: dict[asyncio.Task, Client] = {}   # 每个连接的处理任务及其客户端
+        self.rounds_played = 0
+        self.moves_played = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.snapshots_sent = 0
+        self.spectators = 0
+        self.feed_frames = 0   # 为观众编码的帧数，每一帧写给该牌桌的所有观众
+        self.spectators_coalesced = 0   # 观众因发送缓冲区积压而跳过增量的次数
+        self.spectators_dropped = 0
+
+    async def start(self) -> None:
+        """开始监听连接，端口为0时由系统分配，实际端口可从 port 获取"""
+        self.server = await asyncio.start_server(self._handle_client, self.settings.host, self.settings.port)
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def adopt(self, sock: socket.socket, prefix: bytes = b'') -> None:
+        """接管一个已经建立的客户端连接（如由调度进程转交的连接），prefix 为转交前已经读出的数据"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(loop=loop)
+        reader.feed_data(prefix)
+        stream_protocol = asyncio.StreamReaderProtocol(reader, self._handle_client, loop=loop)
+        await loop.connect_accepted_socket(lambda: stream_protocol, sock)
+
+    def stats(self) -> dict:
+        """服务器当前的负载"""
+        return {
+            'tables': len(self.tables),
+            'clients': len(self.handlers),
+            'rounds': self.rounds_played,
+            'moves': self.moves_played,
+            'frames': self.frames_sent,
+            'bytes': self.bytes_sent,
+            'snapshots': self.snapshots_sent,
+            'spectators': self.spectators,
+            'feed_frames': self.feed_frames,
+            'coalesced': self.spectators_coalesced,
+            'dropped': self.spectators_dropped
+        }
+
+    async def close(self) -> None:
+        """停止服务器，断开所有客户端并取消所有牌桌的定时回调"""
+        if self.server is not None:
+            self.server.close()
+        for table in list(self.tables.values()):
+            self._close_table(table)
+        for client in self.handlers.values():
+            client.close(abort=True)
+        # 连接断开后，处理任务读到 EOF 自行结束
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """处理一个客户端连接，直到客户端断开"""
+        client = Client(writer)
+        task = asyncio.current_task()
+        self.handlers[task] = client
+        try:
+            while not client.closed:
+                try:
+                    header = await reader.readexactly(protocol.FRAME_HEADER.size)
+                    length, _ = protocol.parse_frame_header(header)
+                    if length > self.settings.max_frame:
+                        break
+                    payload = await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                try:
+                    for fields in protocol.client_events(payload):
+                        self._on_event(client, fields)
+                except protocol.ProtocolError:
+                    self._error(client, protocol.ERROR_BAD_MESSAGE)
+        finally:
+            self._leave(client)
+            client.close()
+            del self.handlers[task]
+
+    # 发送
+
+    def _queue(self, client: Client, data: bytes) -> None:
+        """把事件加入客户端的下一帧，落后太多的客户端暂不发送增量"""
+        if client.closed or client.stalled:
+            return
+        client.pending += data
+        if client.flush_handle is None:
+            loop = asyncio.get_running_loop()
+            if self.settings.flush_delay > 0:
+                client.flush_handle = loop.call_later(self.settings.flush_delay, self._flush, client)
+            else:
+                client.flush_handle = loop.call_soon(self._flush, client)
+
+    def _flush(self, client: Client) -> None:
+        """把积攒的事件合并为一帧发送"""
+        client.flush_handle = None
+        if client.closed or not client.pending:
+            return
+        if client.writer.transport.get_write_buffer_size() > self.settings.write_buffer_limit:
+            # 发送缓冲区积压过多，断开连接，不让过慢的客户端拖累牌桌
+            client.close(abort=True)
+            self._leave(client)
+            return
+        data = protocol.frame(client.seq, client.pending)
+        client.writer.write(data)
+        client.pending.clear()
+        client.seq = (client.seq + 1) & 0xFFFF
+        self.frames_sent += 1
+        self.bytes_sent += len(data)
+        if client.unacked() >= self.settings.ack_window:
+            client.stalled = True
+
+    def _broadcast(self, table: ServerTable, data: bytes) -> None:
+        for client in table.clients:
+            if client is not None:
+                self._queue(client, data)
+
+    def _publish(self, table: ServerTable, data: bytes) -> None:
+        """把公开事件加入观众的下一帧"""
+        feed = table.feed
+        if feed is None:
+            return
+        feed.pending += data
+        self._schedule_feed_flush(table)
+
+    def _schedule_feed_flush(self, table: ServerTable) -> None:
+        feed = table.feed
+        if feed.flush_handle is None:
+            loop = asyncio.get_running_loop()
+            if self.settings.flush_delay > 0:
+                feed.flush_handle = loop.call_later(self.settings.flush_delay, self._flush_feed, table)
+            else:
+                feed.flush_handle = loop.call_soon(self._flush_feed, table)
+
+    def _flush_feed(self, table: ServerTable) -> None:
+        """把积攒的公开事件编码为一帧，写给所有观众
+
+        发送缓冲区超过 spectator_buffer_limit 的观众跳过这一帧，缓冲区清空后改发一次快照；
+        超过 write_buffer_limit 的观众被断开。快照同样只编码一次。
+        """
+        feed = table.feed
+        feed.flush_handle = None
+        data = None
+        if feed.pending:
+            data = protocol.frame(feed.seq, feed.pending)
+            feed.pending.clear()
+            feed.seq = (feed.seq + 1) & 0xFFFF
+            self.feed_frames += 1
+        snapshot = None
+        dropped = []
+        for client in feed.spectators:
+            buffered = client.writer.transport.get_write_buffer_size()
+            if buffered > self.settings.write_buffer_limit:
+                dropped.append(client)
+                continue
+            if client.stalled:
+                if buffered > 0:
+                    continue
+                if snapshot is None:
+                    snapshot = protocol.frame((feed.seq - 1) & 0xFFFF, table.snapshot(-1))
+                    self.snapshots_sent += 1
+                client.stalled = False
+                client.writer.write(snapshot)
+                self.frames_sent += 1
+                self.bytes_sent += len(snapshot)
+            elif data is not None:
+                if buffered > self.settings.spectator_buffer_limit:
+                    client.stalled = True
+                    self.spectators_coalesced += 1
+                    continue
+                client.writer.write(data)
+                self.frames_sent += 1
+                self.bytes_sent += len(data)
+        for client in dropped:
+            self.spectators_dropped += 1
+            self._unwatch(client)
+            client.close(abort=True)
+
+    def _error(self, client: Client, code: int) -> None:
+        self._queue(client, protocol.event(protocol.ERROR, code))
+
+    def _on_event(self, client: Client, fields: tuple) -> None:
+        kind = fields[0]
+        if kind < 52:
+            self._on_act(client, protocol.card_info(kind))
+        elif kind == protocol.HELLO:
+            if fields[1] != protocol.VERSION:
+                self._error(client, protocol.ERROR_VERSION)
+                return
+            self._join(client, fields[2])
+        elif kind == protocol.WATCH:
+            if fields[1] != protocol.VERSION:
+                self._error(client, protocol.ERROR_VERSION)
+                return
+            self._watch(client, fields[2], fields[3])
+        elif kind == protocol.ACK:
+            self._on_ack(client, fields[1])
+
+    def _on_ack(self, client: Client, seq: int) -> None:
+        """客户端确认收到了某一帧；暂停发送的客户端追上之后，发送一次快照代替错过的增量"""
+        client.acked = seq
+        if client.stalled and client.unacked() == 0:
+            client.stalled = False
+            if client.table is not None:
+                self.snapshots_sent += 1
+                self._queue(client, client.table.snapshot(client.seat))
+
+    # 牌桌的生命周期
+
+    def _join(self, client: Client, room: str) -> None:
+        """让客户端坐到房间中等待的牌桌上，没有时新开一张牌桌"""
+        if client.table is not None or client.watching is not None:
+            self._error(client, protocol.ERROR_ALREADY_SEATED)
+            return
+        table = self.waiting_tables.get(room)
+        if table is None:
+            if len(self.tables) >= self.settings.max_tables:
+                self._error(client, protocol.ERROR_SERVER_FULL)
+                return
+            table = ServerTable(self.next_table_id, self.settings, Random(self.rng.getrandbits(64)))
+            self.next_table_id += 1
+            table.room = room
+            self.tables[table.id] = table
+            self.waiting_tables[room] = table
+            self.latest_tables[room] = table
+        seat = table.free_seat()
+        table.clients[seat] = client
+        client.table = table
+        client.seat = seat
+        self._queue(client, protocol.event(protocol.WELCOME, protocol.VERSION, table.id, seat))
+        if table.humans() == 4 or self.settings.fill_delay <= 0:
+            self._start_round(table)
+        elif table.timer is None:
+            table.timer = asyncio.get_running_loop().call_later(self.settings.fill_delay, self._start_round, table)
+
+    def _watch(self, client: Client, table_id: int, room: str) -> None:
+        """让客户端观看房间中的一张牌桌，牌桌编号为 ANY_TABLE 时观看房间中最新的牌桌"""
+        if client.table is not None or client.watching is not None:
+            self._error(client, protocol.ERROR_ALREADY_SEATED)
+            return
+        if table_id == protocol.ANY_TABLE:
+            table = self.latest_tables.get(room)
+        else:
+            table = self.tables.get(table_id)
+        if table is None or table.room != room:
+            self._error(client, protocol.ERROR_NO_TABLE)
+            return
+        if table.feed is None:
+            table.feed = SpectatorFeed()
+        table.feed.spectators.add(client)
+        client.watching = table
+        self.spectators += 1
+        self._queue(client, protocol.event(protocol.WELCOME, protocol.VERSION, table.id, protocol.SPECTATOR))
+        # WELCOME 立即发送，保证先于作为第一帧的快照到达
+        client.flush_handle.cancel()
+        self._flush(client)
+        client.stalled = True
+        self._schedule_feed_flush(table)
+
+    def _unwatch(self, client: Client) -> None:
+        table = client.watching
+        if table is None:
+            return
+        client.watching = None
+        self.spectators -= 1
+        feed = table.feed
+        feed.spectators.discard(client)
+        if not feed.spectators:
+            if feed.flush_handle is not None:
+                feed.flush_handle.cancel()
+            table.feed = None
+
+    def _leave(self, client: Client) -> None:
+        """客户端离开牌桌，其座位由电脑玩家接替，没有客户端的牌桌随即关闭"""
+        self._unwatch(client)
+        table = client.table
+        if table is None:
+            return
+        client.table = None
+        table.clients[client.seat] = None
+        if table.humans() == 0:
+            self._close_table(table)
+        elif table.playing and table.current_player == client.seat:
+            self._schedule_turn(table)
+
+    def _close_table(self, table: ServerTable) -> None:
+        table.cancel_timer()
+        table.playing = False
+        for client in table.clients:
+            if client is not None:
+                client.table = None
+                client.close()
+        table.clients = [None, None, None, None]
+        if table.feed is not None:
+            for client in list(table.feed.spectators):
+                self._unwatch(client)
+                client.close()
+        self.tables.pop(table.id, None)
+        if self.waiting_tables.get(table.room) is table:
+            del self.waiting_tables[table.room]
+        if self.latest_tables.get(table.room) is table:
+            del self.latest_tables[table.room]
+
+    def _start_round(self, table: ServerTable) -> None:
+        """开始新的一局，把各自的手牌发给每名玩家"""
+        table.cancel_timer()
+        if self.waiting_tables.get(table.room) is table:
+            del self.waiting_tables[table.room]
+        if table.id not in self.tables:
+            return
+        table.new_round()
+        humans_mask = table.humans_mask()
+        for seat, client in enumerate(table.clients):
+            if client is not None:
+                self._queue(client, protocol.event(
+                    protocol.DEAL,
+                    table.round & 0xFFFF,
+                    table.start_player,
+                    humans_mask,
+                    protocol.cards_to_mask(table.hand[seat]),
+                    *table.score
+                ))
+        if table.feed is not None:
+            self._publish(table, protocol.event(protocol.DEAL, table.round & 0xFFFF, table.start_player, humans_mask, 0, *table.score))
+        self._schedule_turn(table)
+
+    def _schedule_turn(self, table: ServerTable) -> None:
+        """安排电脑的行动或玩家的超时"""
+        table.cancel_timer()
+        if table.id not in self.tables:
+            return
+        loop = asyncio.get_running_loop()
+        if table.clients[table.current_player] is None:
+            if self.settings.bot_delay > 0:
+                table.timer = loop.call_later(self.settings.bot_delay, self._bot_act, table)
+            else:
+                table.timer = loop.call_soon(self._bot_act, table)
+        else:
+            table.timer = loop.call_later(self.settings.turn_timeout, self._bot_act, table)
+
+    # 行动
+
+    def _on_act(self, client: Client, info: tuple[int, int]) -> None:
+        table = client.table
+        if table is None:
+            self._error(client, protocol.ERROR_NOT_SEATED)
+            return
+        try:
+            played = table.act(client.seat, info)
+        except IllegalMove:
+            self._error(client, protocol.ERROR_ILLEGAL_MOVE)
+            return
+        self._after_act(table, client.seat, info, played)
+
+    def _bot_act(self, table: ServerTable) -> None:
+        """电脑玩家行动，或代替超时的玩家行动"""
+        table.timer = None
+        if not table.playing:
+            return
+        player = table.current_player
+        info, played = table.ai_act(table.bots[player])
+        self._after_act(table, player, info, played)
+
+    def _after_act(self, table: ServerTable, player: int, info: tuple[int, int], played: bool) -> None:
+        """把行动通知所有玩家，然后进入下一个回合或结算"""
+        table.cancel_timer()
+        self.moves_played += 1
+        id = protocol.card_id(info)
+        if played:
+            data = protocol.MOVES[id]
+            self._broadcast(table, data)
+            self._publish(table, data)
+        else:
+            # 弃置的牌只有弃牌的玩家自己知道，其他玩家和观众看到的是同一个公开事件
+            own = protocol.MOVES[protocol.DISCARD + id]
+            public = protocol.MOVES[protocol.HIDDEN_DISCARD]
+            for seat, client in enumerate(table.clients):
+                if client is not None:
+                    self._queue(client, own if seat == player else public)
+            self._publish(table, public)
+        if table.next_turn():
+            self._schedule_turn(table)
+        else:
+            self._end_round(table)
+
+    def _end_round(self, table: ServerTable) -> None:
+        sorted_player_points_pairs, score_multiply_power, deltas = table.settle()
+        self.rounds_played += 1
+        points = [0, 0, 0, 0]
+        for player, point in sorted_player_points_pairs:
+            points[player] = round(point * 10)
+        data = protocol.event(
+            protocol.ROUND_OVER,
+            score_multiply_power,
+            *[player for player, _ in sorted_player_points_pairs],
+            *points,
+            *deltas,
+            *table.score
+        )
+        self._broadcast(table, data)
+        self._publish(table, data)
+        if table.id in self.tables:
+            table.timer = asyncio.get_running_loop().call_later(self.settings.round_delay, self._start_round, table)
+
+
+def main():
+    settings = ServerSettings()
+    if '--port' in sys.argv:
+        settings.port = int(sys.argv[sys.argv.index('--port') + 1])
+    if '--fill-delay' in sys.argv:
+        settings.fill_delay = float(sys.argv[sys.argv.index('--fill-delay') + 1])
+    server = GameServer(settings)
+    print(f"大通纸牌服务器正在监听 {settings.host}:{settings.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
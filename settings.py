@@ -1,6 +1,5 @@
 from __future__ import annotations
-import pygame
-from singleton import Singleton
+from functools import cached_property
 from typing import TYPE_CHECKING
 
 # 关于如何解决 Python type hints 导致的 circular imports 的问题，详见下述链接
@@ -9,51 +8,114 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from datong_solitaire import DaTongSolitaire
 
-class Settings(Singleton):
-    """存储游戏中所有设置的类"""
+class Settings:
+    """存储一局游戏中所有设置的类"""
     
-    has_inited = False
+    windowed_size = (1280, 800)   # 以窗口模式（--windowed）运行时窗口的初始大小
     
-    def __init__(self, game: DaTongSolitaire=None):
-        """设置类的初始化（需要在游戏开始获取屏幕大小后才能初始化）"""
-        # Settings 作为单例类，只初始化一次
-        if Settings.has_inited:
-            return
-        Settings.has_inited = True
-        
-        # 初始化时应当提供游戏类的实例，以便后续其他的对象通过Settings类来获取游戏类的实例
-        # 这样做的主要原因是
-        # 游戏主体模块导入了几乎所有的其他自定义模块，这就导致其他自定义模块导入游戏主体模块时必然导致 circular imports
-        # 而Settings类则几乎没有导入其他自定义模块，可以被其他自定义模块导入并获取其全局单例
-        # 另一种解决方法是在构造游戏中对象实例时传入游戏主体的实例，但那样有些麻烦，不甚优雅
-        if game:
-            self.game = game
-        else:
+    def __init__(self, game: DaTongSolitaire):
+        """设置类的初始化（需要在游戏创建画面后才能初始化，布局由画面的大小决定）"""
+        # 每局游戏各有一份设置，游戏中的对象在构造时获得游戏实例，再通过 game.settings 获取设置，
+        # 这样同一进程中可以同时存在多局互不影响的游戏
+        if game is None:
             raise Exception("No game provided when initializing Settings class!")
+        self.game = game
         
         self.start_menu_music = ['music/开场音乐/Sneaky-Snitch.mp3', 'music/开场音乐/Monkeys-Spinning-Monkeys.mp3', 'music/开场音乐/Fluffing-a-Duck.mp3', 'music/开场音乐/Cipher2.mp3']
+        self.easter_egg_music = 'music/彩蛋.mp3'
+        self.music_fade_ms = 2000   # 背景音乐切换曲目时淡出和淡入的时长
         self.ai_act_interval = 1000
+        self.fps = 30
+        # 超过 idle_delay 毫秒没有输入且画面没有变化时，降低为 idle_fps 帧每秒，有输入时立即恢复
+        self.idle_fps = 2
+        self.idle_delay = 3000
+        # 游戏逻辑以固定的步长（毫秒）推进，与绘制帧率无关；每帧最多推进 max_sim_steps 步，避免卡顿后追赶过久
+        self.sim_tick = 10
+        self.max_sim_steps = 200
         # default_screen_width, default_screen_height
         self.dft_scr_w = 1707
         self.dft_scr_h = 1067
-        screen_rect = pygame.display.get_surface().get_rect()
-        self.screen_width = screen_rect.width
-        self.screen_height = screen_rect.height
-        self.scale_ratio = (self.screen_width / self.dft_scr_w + self.screen_height / self.dft_scr_h) / 2
         self.bg_color = Settings.Color.olivedrab
         self.font_name = '霞鹜文楷'
         self.font_path = 'fonts/LXGWWenKai-Regular.ttf'
         self.base_score = [6, -1, -2, -3]
         self.player_name = ['玩家', '电脑1', '电脑2', '电脑3']
-        self.start_menu = Settings.StartMenu(self.screen_width, self.screen_height)
-        self.card = Settings.Card()
-        self.field = Settings.Field()
-        self.board = Settings.Board()
-        self.game_over_menu = Settings.GameOverMenu()
         self.window = Settings.Window()
-        self.rule_window = Settings.RuleWindow()
-        self.exit_window = Settings.ExitWindow()
-        self.stop_game_window = Settings.StopGameWindow()
+        self.sound = Settings.Sound()
+        self.sound_bank = Settings.SoundBank()
+        self.font = Settings.Font()
+        self.journal = Settings.Journal()
+        self.score_history = Settings.ScoreHistory()
+        self.rating = Settings.Rating()
+        self.update_screen_size()
+    
+    def update_screen_size(self):
+        """根据当前的屏幕（窗口）大小计算所有与布局有关的设置，窗口大小改变后需要再次调用"""
+        screen_rect = self.game.screen.get_rect()
+        self.screen_width = screen_rect.width
+        self.screen_height = screen_rect.height
+        self.scale_ratio = (self.screen_width / self.dft_scr_w + self.screen_height / self.dft_scr_h) / 2
+        self.start_menu = Settings.StartMenu(self, self.screen_width, self.screen_height)
+        self.card = Settings.Card(self)
+        self.field = Settings.Field(self)
+        self.board = Settings.Board(self)
+        # 延迟创建的设置同样与屏幕大小有关，丢弃后在下次用到时按新的大小重新创建
+        for name in ('game_over_menu', 'rule_window', 'exit_window', 'stop_game_window'):
+            self.__dict__.pop(name, None)
+    
+    # 以下设置在第一次用到时才创建，以加快游戏启动
+    @cached_property
+    def game_over_menu(self) -> Settings.GameOverMenu:
+        return Settings.GameOverMenu(self)
+    
+    @cached_property
+    def rule_window(self) -> Settings.RuleWindow:
+        return Settings.RuleWindow(self)
+    
+    @cached_property
+    def exit_window(self) -> Settings.ExitWindow:
+        return Settings.ExitWindow(self)
+    
+    @cached_property
+    def stop_game_window(self) -> Settings.StopGameWindow:
+        return Settings.StopGameWindow(self)
+    
+    def scaled_font_size(self, base_font_size: int) -> int:
+        """按当前的缩放比例换算字号"""
+        return int(base_font_size * self.scale_ratio)
+    
+    def font_texts(self) -> dict[int, str]:
+        """界面中用到的各个字号及其要显示的文字，用于预先加载字体和准备字形
+        
+        延迟创建的菜单和窗口的字号和文字取自其设置类的类属性，不会因此创建这些设置
+        """
+        names = ''.join(self.player_name)
+        digits = '0123456789+-'
+        size = self.scaled_font_size
+        game_over_menu = Settings.GameOverMenu
+        rule_window = Settings.RuleWindow
+        exit_window = Settings.ExitWindow
+        stop_game_window = Settings.StopGameWindow
+        entries = [
+            (self.start_menu.play_button.font_size, self.start_menu.play_button.msg),
+            (self.start_menu.rule_button.font_size, self.start_menu.rule_button.msg),
+            (self.start_menu.exit_button.font_size, self.start_menu.exit_button.msg),
+            (self.field.stop_button.font_size, self.field.stop_button.msg),
+            (self.board.font_size, "当前玩家：分数：" + names + digits),
+            (size(game_over_menu.Title.base_font_size), "胜利！" + names),
+            (size(game_over_menu.Content.base_font_size), "：点 —— 分 -> " + names + digits),
+            (size(game_over_menu.Button.base_font_size), game_over_menu.ReplayButton.msg + game_over_menu.ExitButton.msg),
+            (size(rule_window.base_font_size), rule_window.text),
+            (size(rule_window.ExitButton.base_font_size), rule_window.ExitButton.msg),
+            (size(exit_window.Text.base_font_size), exit_window.Text.text),
+            (size(exit_window.Button.base_font_size), exit_window.ConfirmButton.msg + exit_window.CancelButton.msg),
+            (size(stop_game_window.Text.base_font_size), stop_game_window.Text.text),
+            (size(stop_game_window.Button.base_font_size), stop_game_window.ReplayButton.msg + stop_game_window.ContinueButton.msg + stop_game_window.ExitButton.msg),
+        ]
+        texts: dict[int, str] = {}
+        for size, text in entries:
+            texts[size] = texts.get(size, '') + text
+        return texts
     
     class Color:
         black = (0, 0, 0)
@@ -62,6 +124,50 @@ class Settings(Singleton):
         olivedrab = (107, 142, 35)
         burlywood = (222, 184, 135)
     
+    class Sound:
+        """游戏中音效文件路径的设置类"""
+        def __init__(self):
+            self.discard = 'music/音效/要不起.mp3'
+            self.win = 'music/音效/instant-win.wav'
+            self.datong = 'music/音效/huge-win.mp3'
+            self.lose = 'music/音效/horror-lose.wav'
+            self.easter_egg = ['music/cards/梅花13.mp3', 'music/cards/梅花567.mp3']
+    
+    class SoundBank:
+        """音效库相关的设置类"""
+        def __init__(self):
+            self.budget = 32 * 1024 * 1024   # 解码后的音效最多占用的内存（字节）
+            self.use_transcoded = False   # 是否将解码后的音效保存为WAV文件，以加快之后的加载
+            self.cache_dir = 'cache/sounds'
+    
+    class Font:
+        """字体库相关的设置类"""
+        def __init__(self):
+            self.preload = True   # 是否在启动时预先加载界面中用到的所有字号
+            self.prepare_glyphs = True   # 是否在启动时预先渲染界面中用到的字符，使第一次显示文字时不再卡顿
+    
+    class Journal:
+        """对局日志相关的设置类"""
+        def __init__(self):
+            self.enabled = True   # 是否记录对局日志，意外退出后下次开始游戏时继续被中断的一局
+            self.dir = 'save'
+            self.snapshot_interval = 520   # 行动日志中有这么多个行动（约10局）时，下一次发牌时写一份新的快照
+    
+    class ScoreHistory:
+        """对局历史记录相关的设置类"""
+        def __init__(self):
+            self.enabled = True   # 是否把每局的结果记入数据库，用于生涯统计和排行榜
+            self.path = 'save/history.db'
+            self.batch_delay = 1.0   # 一局结果到达后最多等待这么多秒，与之后的结果一起写入
+            self.max_batch = 1000   # 攒够这么多局时立即写入
+            self.busy_timeout = 5.0   # 数据库被其他连接锁定时等待的秒数
+    
+    class Rating:
+        """等级分相关的设置类"""
+        def __init__(self):
+            self.enabled = True   # 是否按每局的名次更新各名玩家的等级分，退出游戏时保存
+            self.path = 'save/ratings.json'
+    
     class Window:
         """与游戏中所有窗口有关的设置类"""
         def __init__(self):
@@ -69,13 +175,8 @@ class Settings(Singleton):
     
     class RuleWindow:
         """规则窗口的设置类"""
-        def __init__(self):
-            self.settings = Settings()
-            self.width = 1200 * self.settings.scale_ratio
-            self.height = 800 * self.settings.scale_ratio
-            self.text_color = Settings.Color.black
-            self.font_size = int(28 * self.settings.scale_ratio)
-            self.text = """
+        base_font_size = 28
+        text = """
             《大通纸牌》是一款四人纸牌接龙游戏，
             你的目标是打出尽量多的牌，并使无法打出的牌点数总和尽量小。
             游戏使用一副去掉大小王的扑克牌进行。
@@ -94,132 +195,143 @@ class Settings(Singleton):
             这一轮所有玩家的得分和失分翻倍
             （即第一名获得12分，二三四名分别失去2、4、6分）。
             """
+        def __init__(self, settings: Settings):
+            self.settings = settings
+            self.width = 1200 * self.settings.scale_ratio
+            self.height = 800 * self.settings.scale_ratio
+            self.text_color = Settings.Color.black
+            self.font_size = self.settings.scaled_font_size(self.base_font_size)
             self.top_margin = 50 * self.settings.scale_ratio
             self.left_margin = 50 * self.settings.scale_ratio
-            self.exit_button = Settings.RuleWindow.ExitButton(self.width, self.height)
+            self.exit_button = Settings.RuleWindow.ExitButton(self.settings, self.width, self.height)
             
         class ExitButton:
             """规则窗口中的“返回”按钮设置类"""
-            def __init__(self, surf_width, surf_height):
-                self.settings = Settings()
+            base_font_size = 20
+            msg = '返回'
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                self.settings = settings
                 self.width = 100 * self.settings.scale_ratio
                 self.height = 60 * self.settings.scale_ratio
                 self.color = Settings.Color.white
                 self.text_color = Settings.Color.black
-                self.font_size = int(20 * self.settings.scale_ratio)
-                self.msg = '返回'
+                self.font_size = self.settings.scaled_font_size(self.base_font_size)
                 self.centerx = surf_width // 2
                 self.centery = int(surf_height * 0.9)
     
     class ExitWindow:
         """确认退出窗口的设置类"""
-        def __init__(self):
-            self.settings = Settings()
+        def __init__(self, settings: Settings):
+            self.settings = settings
             self.width = 600 * self.settings.scale_ratio
             self.height = 300 * self.settings.scale_ratio
-            self.text = Settings.ExitWindow.Text(self.width, self.height)
-            self.confirm_button = Settings.ExitWindow.ConfirmButton(self.width, self.height)
-            self.cancel_button = Settings.ExitWindow.CancelButton(self.width, self.height)
+            self.text = Settings.ExitWindow.Text(self.settings, self.width, self.height)
+            self.confirm_button = Settings.ExitWindow.ConfirmButton(self.settings, self.width, self.height)
+            self.cancel_button = Settings.ExitWindow.CancelButton(self.settings, self.width, self.height)
         
         class Text:
             """退出确认窗口中文字的设置类"""
-            def __init__(self, surf_width, surf_height):
-                self.settings = Settings()
-                self.font_size = int(32 * self.settings.scale_ratio)
+            base_font_size = 32
+            text = "你确定要退出游戏吗？"
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                self.settings = settings
+                self.font_size = self.settings.scaled_font_size(self.base_font_size)
                 self.color = Settings.Color.black
-                self.text = "你确定要退出游戏吗？"
                 self.centerx = surf_width // 2
                 self.centery = int(surf_height * 0.25)
         
         class Button:
             """退出确认窗口中所有按钮设置信息的基类"""
-            def __init__(self):
-                self.settings = Settings()
+            base_font_size = 36
+            def __init__(self, settings: Settings):
+                self.settings = settings
                 self.width = 150 * self.settings.scale_ratio
                 self.height = 80 * self.settings.scale_ratio
                 self.color = Settings.Color.white
                 self.text_color = Settings.Color.black
-                self.font_size = int(36 * self.settings.scale_ratio)
+                self.font_size = self.settings.scaled_font_size(self.base_font_size)
         
         class ConfirmButton(Button):
             """退出确认窗口中的“确定”按钮设置类"""
-            def __init__(self, surf_width, surf_height):
-                super().__init__()
-                self.msg = "确定"
+            msg = "确定"
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                super().__init__(settings)
                 self.centerx = int(surf_width * 0.3)
                 self.centery = int(surf_height * 0.7)
         
         class CancelButton(Button):
             """退出确认窗口中的“取消”按钮设置类"""
-            def __init__(self, surf_width, surf_height):
-                super().__init__()
-                self.msg = "取消"
+            msg = "取消"
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                super().__init__(settings)
                 self.centerx = int(surf_width * 0.7)
                 self.centery = int(surf_height * 0.7)
     
     class StopGameWindow:
         """暂停游戏窗口的设置类"""
-        def __init__(self):
-            self.settings = Settings()
+        def __init__(self, settings: Settings):
+            self.settings = settings
             self.width = 600 * self.settings.scale_ratio
             self.height = 300 * self.settings.scale_ratio
-            self.text = Settings.StopGameWindow.Text(self.width, self.height)
-            self.replay_button = Settings.StopGameWindow.ReplayButton(self.width, self.height)
-            self.continue_button = Settings.StopGameWindow.ContinueButton(self.width, self.height)
-            self.exit_button = Settings.StopGameWindow.ExitButton(self.width, self.height)
+            self.text = Settings.StopGameWindow.Text(self.settings, self.width, self.height)
+            self.replay_button = Settings.StopGameWindow.ReplayButton(self.settings, self.width, self.height)
+            self.continue_button = Settings.StopGameWindow.ContinueButton(self.settings, self.width, self.height)
+            self.exit_button = Settings.StopGameWindow.ExitButton(self.settings, self.width, self.height)
         
         class Text:
             """游戏暂停窗口中文字的设置类"""
-            def __init__(self, surf_width, surf_height):
-                self.settings = Settings()
-                self.font_size = int(32 * self.settings.scale_ratio)
+            base_font_size = 32
+            text = "游戏已经暂停"
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                self.settings = settings
+                self.font_size = self.settings.scaled_font_size(self.base_font_size)
                 self.color = Settings.Color.black
-                self.text = "游戏已经暂停"
                 self.centerx = surf_width // 2
                 self.centery = int(surf_height * 0.25)
         
         class Button:
             """游戏暂停窗口中所有按钮设置信息的基类"""
-            def __init__(self):
-                self.settings = Settings()
+            base_font_size = 36
+            def __init__(self, settings: Settings):
+                self.settings = settings
                 self.width = 120 * self.settings.scale_ratio
                 self.height = 80 * self.settings.scale_ratio
                 self.color = Settings.Color.white
                 self.text_color = Settings.Color.black
-                self.font_size = int(36 * self.settings.scale_ratio)
+                self.font_size = self.settings.scaled_font_size(self.base_font_size)
         
         class ReplayButton(Button):
             """游戏暂停窗口中的“重来”按钮设置类"""
-            def __init__(self, surf_width, surf_height):
-                super().__init__()
-                self.msg = "重来"
+            msg = "重来"
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                super().__init__(settings)
                 self.centerx = int(surf_width * 0.2)
                 self.centery = int(surf_height * 0.7)
         
         class ContinueButton(Button):
             """游戏暂停窗口中的“继续”按钮设置类"""
-            def __init__(self, surf_width, surf_height):
-                super().__init__()
-                self.msg = "继续"
+            msg = "继续"
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                super().__init__(settings)
                 self.centerx = int(surf_width * 0.5)
                 self.centery = int(surf_height * 0.7)
         
         class ExitButton(Button):
             """游戏暂停窗口中的“退出”按钮设置类"""
-            def __init__(self, surf_width, surf_height):
-                super().__init__()
-                self.msg = "退出"
+            msg = "退出"
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                super().__init__(settings)
                 self.centerx = int(surf_width * 0.8)
                 self.centery = int(surf_height * 0.7)
     
     class StartMenu:
         """开始界面的设置类"""
         button_yspacing = 150
-        def __init__(self, surf_width, surf_height):
+        def __init__(self, settings: Settings, surf_width, surf_height):
             self.title = Settings.StartMenu.Title(surf_width, surf_height)
-            self.play_button = Settings.StartMenu.PlayButton(surf_width, surf_height)
-            self.rule_button = Settings.StartMenu.RuleButton(surf_width, surf_height)
-            self.exit_button = Settings.StartMenu.ExitButton(surf_width, surf_height)
+            self.play_button = Settings.StartMenu.PlayButton(settings, surf_width, surf_height)
+            self.rule_button = Settings.StartMenu.RuleButton(settings, surf_width, surf_height)
+            self.exit_button = Settings.StartMenu.ExitButton(settings, surf_width, surf_height)
         
         class Title:
             """开始界面标题图片的设置类"""
@@ -229,8 +341,8 @@ class Settings(Singleton):
             
         class Button:
             """开始界面中所有按钮设置信息的基类"""
-            def __init__(self):
-                self.settings = Settings()
+            def __init__(self, settings: Settings):
+                self.settings = settings
                 self.width = 200 * self.settings.scale_ratio
                 self.height = 100 * self.settings.scale_ratio
                 self.color = Settings.Color.white
@@ -239,40 +351,40 @@ class Settings(Singleton):
             
         class PlayButton(Button):
             """开始界面中的“开始游戏”按钮设置类"""
-            def __init__(self, surf_width, surf_height):
-                super().__init__()
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                super().__init__(settings)
                 self.msg = "开始游戏"
                 self.centerx = surf_width // 2
                 self.centery = surf_height // 2
             
         # class TestButton(Button):
         #     """开始界面中的“测试游戏”按钮设置类"""
-        #     def __init__(self, surf_width, surf_height):
-        #         super().__init__()
+        #     def __init__(self, settings: Settings, surf_width, surf_height):
+        #         super().__init__(settings)
         #         self.msg = "测试游戏"
         #         self.centerx = surf_width // 2
         #         self.centery = surf_height // 2 + Settings.StartMenu.button_yspacing
         
         class RuleButton(Button):
             """开始界面中的“游戏规则”按钮设置类"""
-            def __init__(self, surf_width, surf_height):
-                super().__init__()
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                super().__init__(settings)
                 self.msg = "游戏规则"
                 self.centerx = surf_width // 2
                 self.centery = surf_height // 2 + Settings.StartMenu.button_yspacing
         
         class ExitButton(Button):
             """开始界面中的“退出游戏”按钮设置类"""
-            def __init__(self, surf_width, surf_height):
-                super().__init__()
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                super().__init__(settings)
                 self.msg = "退出游戏"
                 self.centerx = surf_width // 2
                 self.centery = surf_height // 2 + 2 * Settings.StartMenu.button_yspacing
             
     class Card:
         """卡牌相关的设置类"""
-        def __init__(self):
-            self.settings = Settings()
+        def __init__(self, settings: Settings):
+            self.settings = settings
             self.raw_width = 500
             self.raw_height = 726
             self.load_card_scale = 0.3 * self.settings.scale_ratio
@@ -280,6 +392,8 @@ class Settings(Singleton):
             self.height = self.load_card_scale * self.raw_height
             self.hand_xspacing = 0.5 * self.width
             self.hand_yspacing = 0.25 * self.height
+            # 卡牌图像解码后预先缩小为多级尺寸（原始尺寸的1/2、1/4、1/8），改变窗口大小时从最接近的一级缩放
+            self.mipmap_levels = 3   # 原图之外逐级缩小一半的级数
             self.suits = ['spade', 'club', 'heart', 'diamond']
             self.playable_frame = Settings.Card.PlayableFrame()
         
@@ -292,18 +406,18 @@ class Settings(Singleton):
 
     class Field:
         """场地相关的设置类"""
-        def __init__(self):
-            screen_rect = pygame.display.get_surface().get_rect()
-            self.card = Settings.Card()
+        def __init__(self, settings: Settings):
+            screen_rect = settings.game.screen.get_rect()
+            self.card = Settings.Card(settings)
             self.xspacing = screen_rect.width // 6
             self.left_margin = int(self.xspacing * 1.5)
             self.yspacing = self.card.hand_yspacing
-            self.stop_button = Settings.Field.StopButton()
+            self.stop_button = Settings.Field.StopButton(settings)
         
         class StopButton:
             """游戏时的暂停按钮"""
-            def __init__(self):
-                self.settings = Settings()
+            def __init__(self, settings: Settings):
+                self.settings = settings
                 self.width = 200 * self.settings.scale_ratio
                 self.height = 100 * self.settings.scale_ratio
                 self.color = Settings.Color.burlywood
@@ -315,20 +429,20 @@ class Settings(Singleton):
     
     class Board:
         """信息面板相关的设置类"""
-        def __init__(self):
-            self.settings = Settings()
+        def __init__(self, settings: Settings):
+            self.settings = settings
             self.width = 200 * self.settings.scale_ratio
             self.height = 250 * self.settings.scale_ratio
             self.left_margin = 90 * self.settings.scale_ratio
             self.top_margin = 20 * self.settings.scale_ratio
             self.color = Settings.Color.burlywood
             self.font_size = int(20 * self.settings.scale_ratio)
-            self.text = Settings.Board.Text()
+            self.text = Settings.Board.Text(self.settings)
         
         class Text:
             """信息面板上文字相关的设置"""
-            def __init__(self):
-                self.settings = Settings()
+            def __init__(self, settings: Settings):
+                self.settings = settings
                 self.left_margin = 20 * self.settings.scale_ratio
                 self.top_margin = 20 * self.settings.scale_ratio
                 self.line_spacing = 10 * self.settings.scale_ratio
@@ -336,64 +450,67 @@ class Settings(Singleton):
 
     class GameOverMenu:
         """游戏结束菜单设置类"""
-        def __init__(self):
-            self.settings = Settings()
+        def __init__(self, settings: Settings):
+            self.settings = settings
             self.width = 1200 * self.settings.scale_ratio
             self.height = 800 * self.settings.scale_ratio
             self.color = Settings.Color.burlywood
-            self.title = Settings.GameOverMenu.Title()
-            self.content = Settings.GameOverMenu.Content()
-            self.replay_button = Settings.GameOverMenu.ReplayButton(self.width, self.height)
-            self.exit_button = Settings.GameOverMenu.ExitButton(self.width, self.height)
-            self.datong_icon = Settings.GameOverMenu.DaTongIcon()
+            self.title = Settings.GameOverMenu.Title(self.settings)
+            self.content = Settings.GameOverMenu.Content(self.settings)
+            self.replay_button = Settings.GameOverMenu.ReplayButton(self.settings, self.width, self.height)
+            self.exit_button = Settings.GameOverMenu.ExitButton(self.settings, self.width, self.height)
+            self.datong_icon = Settings.GameOverMenu.DaTongIcon(self.settings)
         
         class Title:
             """游戏结束界面中标题的设置类"""
-            def __init__(self):
-                self.settings = Settings()
-                self.font_size = int(52 * self.settings.scale_ratio)
+            base_font_size = 52
+            def __init__(self, settings: Settings):
+                self.settings = settings
+                self.font_size = self.settings.scaled_font_size(self.base_font_size)
                 self.color = Settings.Color.black
                 self.top_margin = 50 * self.settings.scale_ratio
         
         class DaTongIcon:
             """大通时显示的标志相关的设置类"""
-            def __init__(self):
-                self.settings = Settings()
+            def __init__(self, settings: Settings):
+                self.settings = settings
                 self.load_scale = 1 * self.settings.scale_ratio
                 self.right_margin = 0 * self.settings.scale_ratio
                 self.top_margin = 0 * self.settings.scale_ratio
                 
         class Content:
             """游戏结束界面中内容文字的设置类"""
-            def __init__(self):
-                self.settings = Settings()
-                self.font_size = int(40 * self.settings.scale_ratio)
+            base_font_size = 40
+            def __init__(self, settings: Settings):
+                self.settings = settings
+                self.font_size = self.settings.scaled_font_size(self.base_font_size)
                 self.color = Settings.Color.black
                 self.top_margin = 160 * self.settings.scale_ratio
                 self.line_spacing = 20 * self.settings.scale_ratio
         
         class Button:
             """游戏结束界面中所有按钮设置信息的基类"""
-            def __init__(self):
-                self.settings = Settings()
+            base_font_size = 32
+            def __init__(self, settings: Settings):
+                self.settings = settings
                 self.width = 200 * self.settings.scale_ratio
                 self.height = 100 * self.settings.scale_ratio
                 self.color = Settings.Color.white
                 self.text_color = Settings.Color.black
-                self.font_size = int(32 * self.settings.scale_ratio)
+                self.font_size = self.settings.scaled_font_size(self.base_font_size)
                 
         class ReplayButton(Button):
             """游戏结束界面中“再来一局”按钮的设置类"""
-            def __init__(self, surf_width, surf_height):
-                super().__init__()
-                self.msg = "再来一局"
+            msg = "再来一局"
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                super().__init__(settings)
                 self.centerx = surf_width // 2
                 self.centery = int(surf_height * 0.65)
             
         class ExitButton(Button):
             """游戏结束界面中“退出游戏”按钮的设置类"""
-            def __init__(self, surf_width, surf_height):
-                super().__init__()
-                self.msg = "退出游戏"
+            msg = "退出游戏"
+            def __init__(self, settings: Settings, surf_width, surf_height):
+                super().__init__(settings)
                 self.centerx = surf_width // 2
                 self.centery = int(surf_height * 0.85)
\ No newline at end of file
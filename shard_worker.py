@@ -0,0 +1,107 @@
+"""调度进程管理的工作进程，每个工作进程运行一个 GameServer
+
+工作进程不监听端口，客户端的连接由调度进程通过 Unix 套接字（SCM_RIGHTS）转交过来。
+控制消息的第一个字节为消息类型：
+    调度进程 -> 工作进程：b'C' + 已读出的数据（附带连接的文件描述符），b'S' 查询负载，b'D' 停止接收新连接并在清空后退出
+    工作进程 -> 调度进程：b'S' + 负载（JSON），b'D' 已清空
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import socket
+import time
+from server import GameServer, ServerSettings
+
+class ShardWorker:
+    """工作进程中接收转交的连接、回报负载的部分"""
+
+    def __init__(self, index: int, control: socket.socket, settings: ServerSettings):
+        self.index = index
+        self.control = control
+        self.server = GameServer(settings)
+        self.draining = False
+        self.adopting: set[asyncio.Task] = set()
+        self.loop_lag = 0.0   # 最近一次测得的事件循环延迟（秒）
+        self.stopped: asyncio.Future = None
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.stopped = loop.create_future()
+        self.control.setblocking(False)
+        loop.add_reader(self.control.fileno(), self._on_control)
+        self._measure_lag(loop.time(), 0.5)
+        try:
+            await self.stopped
+        finally:
+            loop.remove_reader(self.control.fileno())
+            await self.server.close()
+            self.control.close()
+
+    def _measure_lag(self, expected: float, interval: float) -> None:
+        """定时回调实际执行的时间比预定时间晚了多少，即事件循环的繁忙程度"""
+        loop = asyncio.get_running_loop()
+        self.loop_lag = max(0.0, loop.time() - expected)
+        loop.call_later(interval, self._measure_lag, loop.time() + interval, interval)
+
+    def _on_control(self) -> None:
+        while True:
+            try:
+                data, fds, _, _ = socket.recv_fds(self.control, 65536, 1)
+            except BlockingIOError:
+                return
+            except OSError:
+                data, fds = b'', []
+            if not data:
+                # 调度进程已经退出
+                for fd in fds:
+                    os.close(fd)
+                self._stop()
+                return
+            kind, payload = data[:1], data[1:]
+            if kind == b'C':
+                for fd in fds:
+                    self._adopt(socket.socket(fileno=fd), payload)
+            elif kind == b'S':
+                self._send(b'S' + json.dumps(self.stats()).encode())
+                self._check_drained()
+            elif kind == b'D':
+                self.draining = True
+                self._check_drained()
+
+    def _adopt(self, sock: socket.socket, prefix: bytes) -> None:
+        sock.setblocking(False)
+        task = asyncio.get_running_loop().create_task(self.server.adopt(sock, prefix))
+        self.adopting.add(task)
+        task.add_done_callback(self.adopting.discard)
+
+    def stats(self) -> dict:
+        stats = self.server.stats()
+        stats['pid'] = os.getpid()
+        stats['loop_lag'] = self.loop_lag
+        stats['time'] = time.time()
+        stats['draining'] = self.draining
+        return stats
+
+    def _check_drained(self) -> None:
+        if self.draining and not self.server.tables and not self.server.handlers:
+            self._send(b'D')
+            self._stop()
+
+    def _send(self, data: bytes) -> None:
+        try:
+            self.control.send(data)
+        except OSError:
+            self._stop()
+
+    def _stop(self) -> None:
+        if not self.stopped.done():
+            self.stopped.set_result(None)
+
+
+def run_worker(index: int, control: socket.socket, settings: ServerSettings) -> None:
+    """工作进程的入口"""
+    try:
+        asyncio.run(ShardWorker(index, control, settings).run())
+    except KeyboardInterrupt:
+        pass
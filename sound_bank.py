@@ -0,0 +1,101 @@
+import os
+import wave
+from collections import OrderedDict
+import pygame
+from pygame.mixer import Sound, Channel
+from singleton import Singleton
+from asset_pack import open_asset, asset_mtime
+from settings import Settings
+
+class SoundBank(Singleton):
+    """全局共享的音效库
+
+    音效在第一次使用时才解码，之后在所有对局之间共享。
+    解码后的音效总大小超过内存预算时，淘汰最久未使用的音效。
+    """
+
+    has_inited = False
+
+    def __init__(self, settings: Settings.SoundBank):
+        """音效库的初始化（需要在 pygame.mixer 初始化之后进行）
+
+        音效库为进程中的所有对局共享，只按第一次创建时提供的设置初始化
+        """
+        # SoundBank 作为单例类，只初始化一次
+        if SoundBank.has_inited:
+            return
+        SoundBank.has_inited = True
+
+        self.settings = settings
+        self.budget = self.settings.budget
+        self.sounds: OrderedDict[str, Sound] = OrderedDict()   # 按最近使用的先后排列
+        self.sizes: dict[str, int] = {}
+        self.total_size = 0
+
+    def get(self, path: str) -> Sound:
+        """获取指定路径的音效，如果尚未解码则先解码"""
+        if path in self.sounds:
+            self.sounds.move_to_end(path)
+            return self.sounds[path]
+
+        cache_path = self._cache_path(path)
+        if not self.settings.use_transcoded:
+            sound = Sound(open_asset(path))
+        elif self._is_fresh(cache_path, path):
+            sound = Sound(cache_path)
+        else:
+            # 第一次解码时顺便保存WAV文件，下次启动时就不用再解码MP3了
+            sound = Sound(open_asset(path))
+            self._save_wav(sound, cache_path)
+        self.sounds[path] = sound
+        self.sizes[path] = self._sound_size(sound)
+        self.total_size += self.sizes[path]
+        self._evict()
+        return sound
+
+    def play(self, path: str, **kwargs) -> Channel:
+        """播放指定路径的音效，参数与 Sound.play 相同"""
+        return self.get(path).play(**kwargs)
+
+    def transcode(self, paths: list[str]) -> None:
+        """将音效预先解码并保存为WAV文件，之后加载时无需再解码MP3"""
+        for path in paths:
+            cache_path = self._cache_path(path)
+            if not self._is_fresh(cache_path, path):
+                self._save_wav(Sound(open_asset(path)), cache_path)
+
+    def _evict(self) -> None:
+        """淘汰最久未使用的音效，直到总大小不超过内存预算（最近使用的音效总是保留）
+
+        正在播放的音效被淘汰后，其声道仍持有引用，会正常播放完毕
+        """
+        while self.total_size > self.budget and len(self.sounds) > 1:
+            path, _ = self.sounds.popitem(last=False)
+            self.total_size -= self.sizes.pop(path)
+
+    def _sound_size(self, sound: Sound) -> int:
+        """计算解码后的音效所占的字节数"""
+        frequency, format, channels = pygame.mixer.get_init()
+        return int(sound.get_length() * frequency) * channels * (abs(format) // 8)
+
+    def _cache_path(self, path: str) -> str:
+        """音效预解码后的WAV文件路径"""
+        name = os.path.splitext(path)[0].replace('/', '_').replace('\\', '_')
+        return os.path.join(self.settings.cache_dir, name + '.wav')
+
+    def _is_fresh(self, cache_path: str, path: str) -> bool:
+        """预解码的WAV文件是否存在且没有过期"""
+        return os.path.exists(cache_path) and os.path.getmtime(cache_path) >= asset_mtime(path)
+
+    def _save_wav(self, sound: Sound, cache_path: str) -> None:
+        """将解码后的音效保存为WAV文件"""
+        frequency, format, channels = pygame.mixer.get_init()
+        # WAV文件中8位采样为无符号数，16位采样为有符号的小端序数，其他格式的采样不能原样写入
+        if format not in (8, -16):
+            return
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with wave.open(cache_path, 'wb') as file:
+            file.setnchannels(channels)
+            file.setsampwidth(abs(format) // 8)
+            file.setframerate(frequency)
+            file.writeframes(sound.get_raw())
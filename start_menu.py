@@ -1,7 +1,7 @@
 import pygame
 from pygame import Surface, Rect
-from pygame.sprite import Sprite
-from settings import Settings
+from pygame.sprite import Sprite, Group
+from asset_pack import open_asset, asset_format
 from button import Button
 
 class StartMenu(Sprite):
@@ -9,19 +9,20 @@ class StartMenu(Sprite):
     def __init__(self, game):
         super().__init__()
         self.game = game
-        self.settings = Settings()
-        self.screen = pygame.display.get_surface()
+        self.settings = game.settings
+        self.screen = game.screen
         self.image = self.screen
         self.rect = self.image.get_rect()
         self.rect.center = self.screen.get_rect().center
         
-        self.title = pygame.image.load('images/title.png')
+        self.title = pygame.image.load(open_asset('images/title.png'), asset_format('images/title.png'))
         self.title_rect = self.title.get_rect(
             centerx=self.settings.start_menu.title.centerx,
             centery=self.settings.start_menu.title.centery
         )
         
         self.play_button = Button(
+            game,
             msg=self.settings.start_menu.play_button.msg,
             width=self.settings.start_menu.play_button.width,
             height=self.settings.start_menu.play_button.height,
@@ -32,6 +33,7 @@ class StartMenu(Sprite):
             font_size=self.settings.start_menu.play_button.font_size
         )
         self.rule_button = Button(
+            game,
             msg=self.settings.start_menu.rule_button.msg,
             width=self.settings.start_menu.rule_button.width,
             height=self.settings.start_menu.rule_button.height,
@@ -42,6 +44,7 @@ class StartMenu(Sprite):
             font_size=self.settings.start_menu.rule_button.font_size
         )
         self.exit_button = Button(
+            game,
             msg=self.settings.start_menu.exit_button.msg,
             width=self.settings.start_menu.exit_button.width,
             height=self.settings.start_menu.exit_button.height,
@@ -51,6 +54,7 @@ class StartMenu(Sprite):
             text_color=self.settings.start_menu.exit_button.text_color,
             font_size=self.settings.start_menu.exit_button.font_size
         )
+        self.buttons = Group(self.play_button, self.rule_button, self.exit_button)
     
     def update(self):
         pass
@@ -0,0 +1,32 @@
+from time import perf_counter
+
+class StartupTimeline:
+    """记录游戏启动过程中各个阶段耗时的时间线"""
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.last = self.start
+        self.phases: list[tuple[str, float]] = []
+
+    def mark(self, phase: str) -> None:
+        """记录一个刚刚结束的阶段，其耗时为从上一个阶段结束到现在的时间"""
+        now = perf_counter()
+        cost = (now - self.last) * 1000
+        self.last = now
+        # 连续的同名阶段（如逐张加载卡牌图像）合并为一项
+        if self.phases and self.phases[-1][0] == phase:
+            cost += self.phases.pop()[1]
+        self.phases.append((phase, cost))
+
+    def skip(self) -> None:
+        """跳过从上一个阶段结束到现在的时间，不计入任何阶段（如两次加载资源之间的游戏帧）"""
+        self.last = perf_counter()
+
+    def report(self) -> str:
+        """生成各阶段耗时的报告，每行依次为累计耗时、该阶段耗时和阶段名称"""
+        lines = ["启动时间线："]
+        elapsed = 0
+        for phase, cost in self.phases:
+            elapsed += cost
+            lines.append(f"  {elapsed:8.1f} ms  {cost:+8.1f} ms  {phase}")
+        return '\n'.join(lines)
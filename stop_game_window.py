@@ -1,21 +1,26 @@
-from typing import Optional
+from __future__ import annotations
+from typing import Optional, TYPE_CHECKING
 import pygame
 import ptext
 from pygame import Surface
 from pygame.sprite import Sprite
-from settings import Settings
 from window import Window
 from button import Button
 
+if TYPE_CHECKING:
+    from datong_solitaire import DaTongSolitaire
+
 class StopGameWindow(Window):
     """用于游戏暂停的窗口"""
-    def __init__(self):
-        self.settings = Settings()
+    def __init__(self, game: DaTongSolitaire):
+        self.settings = game.settings
         super().__init__(
+            game,
             width=self.settings.stop_game_window.width,
             height=self.settings.stop_game_window.height
         )
         self.replay_button = Button(
+            self.game,
             msg=self.settings.stop_game_window.replay_button.msg,
             width=self.settings.stop_game_window.replay_button.width,
             height=self.settings.stop_game_window.replay_button.height,
@@ -25,6 +30,7 @@ class StopGameWindow(Window):
             parent_obj=self
         )
         self.continue_button = Button(
+            self.game,
             msg=self.settings.stop_game_window.continue_button.msg,
             width=self.settings.stop_game_window.continue_button.width,
             height=self.settings.stop_game_window.continue_button.height,
@@ -34,6 +40,7 @@ class StopGameWindow(Window):
             parent_obj=self
         )
         self.exit_button = Button(
+            self.game,
             msg=self.settings.stop_game_window.exit_button.msg,
             width=self.settings.stop_game_window.exit_button.width,
             height=self.settings.stop_game_window.exit_button.height,
@@ -42,18 +49,15 @@ class StopGameWindow(Window):
             font_size=self.settings.stop_game_window.exit_button.font_size,
             parent_obj=self
         )
-    
-    def blitme(self, surface: Optional[Surface] = None) -> None:
-        super().blitme(surface)
+        self.buttons.add(self.replay_button, self.continue_button, self.exit_button)
+        # 提示文字不会改变，直接绘制到窗口的图像上
         ptext.draw(
+            surf=self.image,
             text=self.settings.stop_game_window.text.text,
-            centerx=self.rect.x + self.settings.stop_game_window.text.centerx,
-            centery=self.rect.y + self.settings.stop_game_window.text.centery,
+            centerx=self.settings.stop_game_window.text.centerx,
+            centery=self.settings.stop_game_window.text.centery,
             fontname=self.settings.font_path,
             fontsize=self.settings.stop_game_window.text.font_size,
             color=self.settings.stop_game_window.text.color
         )
-        self.replay_button.blitme(surface=self.image)
-        self.continue_button.blitme(surface=self.image)
-        self.exit_button.blitme(surface=self.image)
         
\ No newline at end of file
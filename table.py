@@ -0,0 +1,93 @@
+from __future__ import annotations
+from random import Random
+from typing import TYPE_CHECKING
+from card_model import CardModel
+from ai_agent import AiAgent
+import rules
+
+if TYPE_CHECKING:
+    from server import ServerSettings
+
+class IllegalMove(Exception):
+    """玩家的行动不符合规则"""
+
+class Table:
+    """服务器上的一张牌桌，只包含一局游戏的状态和规则，不依赖 pygame
+
+    状态的名称与 DaTongSolitaire 相同（hand、playable_cards、current_player 等），电脑玩家可以直接在牌桌上行动。
+    """
+
+    def __init__(self, id: int, settings: ServerSettings, rng: Random = None):
+        self.id = id
+        self.settings = settings
+        self.rng = rng if rng is not None else Random()
+        self.score: list[int] = [0, 0, 0, 0]
+        self.round = 0
+        self.playing = False
+        self.hand: list[list[CardModel]] = [[], [], [], []]
+        self.trashed_cards: list[list[CardModel]] = [[], [], [], []]
+        self.playable_cards: list[tuple] = []
+        self.start_player = 0
+        self.current_player = 0
+        self.can_play_card = False
+
+    def new_round(self) -> None:
+        """洗牌发牌，开始新的一局"""
+        self.round += 1
+        self.playing = True
+        self.hand, self.start_player = rules.deal(self.rng)
+        self.trashed_cards = [[], [], [], []]
+        self.playable_cards = [(0, 7)]   # 开局只能出黑桃7
+        self.current_player = self.start_player
+        self.can_play_card = True
+
+    def find_card(self, player: int, info: tuple[int, int]) -> CardModel:
+        """在玩家的手牌中查找指定的卡牌"""
+        for card in self.hand[player]:
+            if card.info == info:
+                return card
+        raise IllegalMove(f"玩家{player}的手牌中没有{info}")
+
+    def act(self, player: int, info: tuple[int, int]) -> bool:
+        """当前玩家打出或弃置指定的卡牌（有牌可出时必须出牌，否则弃牌），返回是否为出牌"""
+        if not self.playing:
+            raise IllegalMove("这局游戏已经结束")
+        if player != self.current_player:
+            raise IllegalMove(f"现在是玩家{self.current_player}的回合")
+        card = self.find_card(player, info)
+        if self.can_play_card:
+            if card.info not in self.playable_cards:
+                raise IllegalMove(f"{info}现在不能打出")
+            self.hand[player].remove(card)
+            rules.update_playable_cards(self.playable_cards, self.hand, card)
+            return True
+        self.hand[player].remove(card)
+        self.trashed_cards[player].append(card)
+        card.discarded = True
+        return False
+
+    def ai_act(self, agent: AiAgent) -> tuple[tuple[int, int], bool]:
+        """由电脑玩家代替当前玩家行动，返回行动的卡牌和是否为出牌"""
+        if self.can_play_card:
+            card = agent.get_card_to_play()
+        else:
+            card = agent.get_card_to_discard()
+        return card.info, self.act(self.current_player, card.info)
+
+    def next_turn(self) -> bool:
+        """进入下一个玩家的回合，所有玩家均没有手牌时返回 False"""
+        if not any(self.hand):
+            self.playing = False
+            return False
+        self.current_player = (self.current_player + 1) % 4
+        self.can_play_card = rules.can_play(self.hand[self.current_player], self.playable_cards)
+        return True
+
+    def settle(self) -> tuple[list[tuple[int, float]], int, list[int]]:
+        """结算已经结束的一局，并累计分数"""
+        sorted_player_points_pairs, score_multiply_power, deltas = rules.settle(
+            self.trashed_cards, self.start_player, self.settings.base_score
+        )
+        for i in range(4):
+            self.score[i] += deltas[i]
+        return sorted_player_points_pairs, score_multiply_power, deltas
@@ -0,0 +1,94 @@
+"""无界面地连续进行几百局游戏，每局打开并关闭暂停窗口和退出确认窗口，检查内存和每帧更新的耗时不随局数增长
+
+按钮曾经登记在整个游戏共用、只增不减的组中，每打开一次窗口或开始一局，每帧要更新的按钮就多几个。
+"""
+import gc
+import os
+import statistics
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUNDS = 300
+WARMUP = 50   # 前几局会创建窗口池、字体和卡牌图像的缓存，不计入比较
+WINDOW = 50   # 比较开头和结尾各这么多局的耗时
+
+@pytest.fixture
+def game(monkeypatch):
+    # 资源的路径相对于仓库的根目录
+    monkeypatch.chdir(ROOT)
+    monkeypatch.syspath_prepend(ROOT)
+    from datong_solitaire import DaTongSolitaire
+    from settings import Settings
+    # 仓库中没有字体文件，没有放入字体时使用 pygame 自带的字体
+    init = Settings.__init__
+    def init_with_font(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        if not os.path.exists(self.font_path):
+            self.font_path = os.path.join(os.path.dirname(pygame.__file__), pygame.font.get_default_font())
+    monkeypatch.setattr(Settings, '__init__', init_with_font)
+    game = DaTongSolitaire(screen=pygame.Surface((1280, 800)))
+    while game.loading_tasks:
+        game._load_next_asset()
+    yield game
+    pygame.quit()
+
+def play_round(game) -> list[float]:
+    """进行一局：开局后打开再关闭暂停窗口和退出确认窗口，然后由电脑代替所有玩家行动，返回每帧更新的耗时"""
+    from game_stage import GameStage
+    frame_times = []
+    
+    def update():
+        start = time.perf_counter()
+        game._update_objects()
+        frame_times.append(time.perf_counter() - start)
+    
+    game.new_game()
+    update()
+    game._open_stop_game_window()
+    update()
+    game.exit_confirm()
+    update()
+    game.windows.pop()
+    game._continue_game()
+    game.windows.pop()
+    game._continue_game()
+    update()
+    while game.game_stage == GameStage.playing:
+        game._ai_act()
+        game._next_turn()
+        update()
+    game._update_screen()
+    update()
+    return frame_times
+
+def test_rounds_do_not_leak(game):
+    for _ in range(WARMUP):
+        play_round(game)
+    first = []
+    for _ in range(WINDOW):
+        first += play_round(game)
+    tracemalloc.start()
+    try:
+        # 菜单和按钮之间互相引用（parent_obj），要等循环垃圾回收后才会释放
+        gc.collect()
+        baseline, _ = tracemalloc.get_traced_memory()
+        for _ in range(ROUNDS - WARMUP - 2 * WINDOW):
+            play_round(game)
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    last = []
+    for _ in range(WINDOW):
+        last += play_round(game)
+    assert not game.windows
+    # 每局都会留下新的按钮时，两百局会多出几百 KiB
+    assert current - baseline < 64 * 1024, f"内存增长了 {(current - baseline) / 1024:.1f} KiB"
+    assert statistics.median(last) < 2 * statistics.median(first) + 20e-6
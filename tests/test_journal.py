@@ -0,0 +1,91 @@
+"""对局日志：从写了一半的行动日志恢复，以及写入线程出错时的处理"""
+import os
+import sys
+from random import Random
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ai_agent import AiAgentNormal
+from journal import Journal, DEAL_RECORD, LOG_HEADER
+from server import ServerSettings
+from settings import Settings
+from table import Table
+import protocol
+
+def journal_settings(dir: str) -> Settings.Journal:
+    settings = Settings.Journal()
+    settings.dir = dir
+    return settings
+
+def state(table: Table) -> tuple:
+    """恢复后应当相同的对局状态"""
+    return (
+        table.playing,
+        tuple(table.score),
+        table.start_player,
+        table.current_player,
+        tuple(protocol.cards_to_mask(hand) for hand in table.hand),
+        tuple(tuple(card.info for card in trash) for trash in table.trashed_cards)
+    )
+
+def play(journal: Journal, rounds: int, moves: int) -> list[tuple[int, tuple]]:
+    """进行 rounds 局完整的对局，再开始一局并行动 moves 次，边进行边记录日志
+
+    返回每条记录写完后行动日志中记录的长度，以及这时的对局状态
+    """
+    table = Table(0, ServerSettings(), Random(1))
+    agents = [AiAgentNormal(table, seat) for seat in range(4)]
+    states = []
+    length = 0
+    for round in range(rounds + 1):
+        table.new_round()
+        journal.record_deal(table)
+        if round > 0:
+            length += 1 + DEAL_RECORD.size
+        states.append((length, state(table)))
+        for _ in range(moves if round == rounds else 52):
+            info, _ = table.ai_act(agents[table.current_player])
+            journal.record_move(info)
+            length += 1
+            if not table.next_turn():
+                table.settle()
+            states.append((length, state(table)))
+    return states
+
+def test_recover_after_torn_tail(tmp_path):
+    journal = Journal(journal_settings(str(tmp_path)))
+    states = play(journal, 2, 20)
+    journal.close()
+    with open(journal.log_path, 'rb') as file:
+        data = file.read()
+    assert len(data) == LOG_HEADER.size + states[-1][0]
+    # 在每一个位置截断行动日志（包括 DEAL 记录的中间），恢复到最后一条完整的记录之后的状态
+    for cut in range(len(data) - LOG_HEADER.size + 1):
+        with open(journal.log_path, 'wb') as file:
+            file.write(data[:LOG_HEADER.size + cut])
+        table = Table(0, ServerSettings())
+        assert Journal(journal_settings(str(tmp_path))).recover(table)
+        expected = [recorded for length, recorded in states if length <= cut][-1]
+        assert state(table) == expected
+
+def test_writer_error(tmp_path):
+    # 日志目录的位置已经有一个文件，写入线程无法创建目录
+    path = tmp_path / 'save'
+    path.write_bytes(b'')
+    journal = Journal(journal_settings(str(path)))
+    table = Table(0, ServerSettings(), Random(1))
+    table.new_round()
+    journal.record_deal(table)
+    with pytest.raises(OSError):
+        journal.sync()
+    # 出错后的记录直接丢弃，不再放入队列
+    submitted = journal.submitted
+    journal.record_move(table.hand[table.current_player][0].info)
+    assert journal.submitted == submitted
+    assert not journal.queue
+    with pytest.raises(OSError):
+        journal.close()
+    assert journal.writer is None
@@ -0,0 +1,34 @@
+"""ptext 的断行：按字形宽度逐字累计后，断行的位置与逐个断点测量整段文字时相同"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ptext import _breaktext
+
+class MonospaceFont:
+    """每个字符宽10像素、没有字距调整的字体，断行只取决于断点的规则"""
+    def metrics(self, text):
+        return [(0, 10, 0, 10, 10) for _ in text]
+    def size(self, text):
+        return 10 * len(text), 10
+
+@pytest.mark.parametrize('text, width, canbreakatstart, expected', [
+    ('abc def ghi', 70, False, ('abc def ', 8)),
+    ('abc def ghi', 20, False, ('abc ', 4)),
+    ('abc def ghi', 20, True, ('', 0)),
+    ('abc\xaddef', 50, False, ('abc-', 4)),
+    # 软连字符处放不下连字符时，在它之前断行，即使之后的空格处又能放下
+    ('world \xad    \xad soft', 50, False, ('world ', 6)),
+    # 软连字符处放不下时，即使去掉它后整段文字能放下也在它之前断行
+    ('ab cd\xad ', 50, False, ('ab ', 3)),
+    ('ab cd\xad ', 70, False, ('ab cd ', 7)),
+    # 超出宽度的空格之后的零宽空格仍是可用的断点
+    ('ab      ​cd', 30, False, ('ab      ', 9)),
+    ('大通接龙游戏。', 30, False, ('大通接', 3)),
+])
+def test_breaktext(text, width, canbreakatstart, expected):
+    assert _breaktext(text, width, MonospaceFont(), canbreakatstart) == expected
@@ -0,0 +1,136 @@
+"""电脑玩家之间的锦标赛：在多个工作进程中进行无界面的对局，用等级分比较各种电脑玩家
+
+每局按轮换的座位安排电脑玩家（第 g 局座位 s 上为 agents[(g + s) % len(agents)]），直接在 Table 上进行，不依赖 pygame。
+对局按 chunk_games 局分成若干份交给工作进程，每份各自把名次记入一份 Ratings，再按份的顺序交回主进程合并，
+与在一个进程中进行所有对局的结果相同。
+固定种子后结果可以复现：每份的发牌和电脑玩家的随机选择都由种子和份的编号决定，与工作进程数无关。
+
+比较两种电脑玩家时可以进行序贯检验（见 sequential_test.py）：每合并一份就用其中每局的得分差更新检验，
+结论已经显著时停止剩余的对局，并报告节省的局数。
+
+运行 `python tournament.py [--agents normal,random] [--games 最多局数] [--workers 进程数] [--seed 种子] [--ratings 状态文件]
+[--sprt] [--delta1 H1的得分差]`，指定状态文件时，在其中已有的计数上继续累计并保存。
+"""
+from __future__ import annotations
+import multiprocessing
+import random
+import sys
+from typing import Optional
+from ai_service import AGENTS
+from rating import Ratings, print_leaderboard
+from sequential_test import SequentialTest, SequentialTestSettings
+from table import Table
+
+class TournamentSettings:
+    """锦标赛的设置类"""
+    def __init__(self):
+        self.agents = ['normal', 'random']   # 参赛的电脑玩家，名称见 ai_service.AGENTS
+        self.games = 10000   # 最多进行的局数，序贯检验得出结论时提前停止
+        self.chunk_games = 200   # 每次交给工作进程的局数，也是序贯检验的检查间隔
+        self.workers = multiprocessing.cpu_count()
+        self.seed = 1
+        self.base_score = [6, -1, -2, -3]
+        self.ratings_path: Optional[str] = None   # 等级分状态文件，为 None 时不载入也不保存
+        self.sequential: Optional[SequentialTestSettings] = None   # 只有两种电脑玩家时可用，为 None 时进行所有对局
+
+
+def play_games(settings: TournamentSettings, chunk: int, first_game: int, games: int) -> tuple[Ratings, list[float]]:
+    """依次进行编号从 first_game 开始的 games 局，返回这些局的等级分计数
+
+    只有两种不同的电脑玩家时，还返回每局第一种电脑玩家的座位的平均得分减去第二种的
+    """
+    rng = random.Random(f'{settings.seed}:{chunk}')
+    random.seed(f'{settings.seed}:{chunk}:agents')   # AiAgentRandom 使用 random 模块的随机数
+    table = Table(chunk, settings, rng)
+    ratings = Ratings()
+    diffs = []
+    agents = settings.agents
+    for game in range(first_game, first_game + games):
+        names = [agents[(game + seat) % len(agents)] for seat in range(4)]
+        players = [AGENTS[name](table, seat) for seat, name in enumerate(names)]
+        table.new_round()
+        while True:
+            table.ai_act(players[table.current_player])
+            if not table.next_turn():
+                break
+        sorted_player_points_pairs, _, deltas = table.settle()
+        ratings.record([names[seat] for seat, _ in sorted_player_points_pairs], [deltas[seat] for seat, _ in sorted_player_points_pairs])
+        if len(agents) == 2 and agents[0] != agents[1]:
+            scores = ([], [])
+            for seat, name in enumerate(names):
+                scores[name != agents[0]].append(deltas[seat])
+            diffs.append(sum(scores[0]) / len(scores[0]) - sum(scores[1]) / len(scores[1]))
+    return ratings, diffs
+
+
+def _play_games(args: tuple) -> tuple[dict, list[float]]:
+    """工作进程中运行，以 dict 交回计数"""
+    ratings, diffs = play_games(*args)
+    return ratings.to_dict(), diffs
+
+
+def run(settings: TournamentSettings, test: SequentialTest = None) -> Ratings:
+    """把对局分成若干份交给各个工作进程，返回合并后的等级分
+
+    提供 test 时用每局的得分差更新检验，得出结论后停止剩余的对局
+    """
+    ratings = Ratings.load(settings.ratings_path) if settings.ratings_path else Ratings()
+    tasks = []
+    for chunk, first_game in enumerate(range(0, settings.games, settings.chunk_games)):
+        tasks.append((settings, chunk, first_game, min(settings.chunk_games, settings.games - first_game)))
+    workers = max(1, min(settings.workers, len(tasks)))
+    pool = multiprocessing.get_context('spawn').Pool(workers) if workers > 1 else None
+    try:
+        # 按份的顺序合并，提前停止时的结果与工作进程数无关
+        results = pool.imap(_play_games, tasks) if pool is not None else map(_play_games, tasks)
+        for data, diffs in results:
+            ratings.merge(Ratings.from_dict(data))
+            if test is not None:
+                for diff in diffs:
+                    test.add(diff)
+                if test.decision() is not None:
+                    break
+    finally:
+        if pool is not None:
+            pool.terminate()   # 提前停止时丢弃还在进行的对局
+            pool.join()
+    if settings.ratings_path:
+        ratings.save(settings.ratings_path)
+    return ratings
+
+
+def main():
+    settings = TournamentSettings()
+    if '--agents' in sys.argv:
+        settings.agents = sys.argv[sys.argv.index('--agents') + 1].split(',')
+    if '--games' in sys.argv:
+        settings.games = int(sys.argv[sys.argv.index('--games') + 1])
+    if '--workers' in sys.argv:
+        settings.workers = int(sys.argv[sys.argv.index('--workers') + 1])
+    if '--seed' in sys.argv:
+        settings.seed = int(sys.argv[sys.argv.index('--seed') + 1])
+    if '--ratings' in sys.argv:
+        settings.ratings_path = sys.argv[sys.argv.index('--ratings') + 1]
+    test = None
+    if '--sprt' in sys.argv:
+        if len(set(settings.agents)) != 2 or len(settings.agents) != 2:
+            print("序贯检验只能比较两种电脑玩家")
+            sys.exit(1)
+        settings.sequential = SequentialTestSettings()
+        if '--delta1' in sys.argv:
+            settings.sequential.delta1 = float(sys.argv[sys.argv.index('--delta1') + 1])
+        test = SequentialTest(settings.sequential)
+    print_leaderboard(run(settings, test))
+    if test is not None:
+        report = test.report()
+        accepted = {'H0': f"得分差为 {settings.sequential.delta0}", 'H1': f"得分差为 {settings.sequential.delta1}"}
+        print(f"{settings.agents[0]} - {settings.agents[1]} 的平均得分差：{report['mean_diff']}，"
+              f"{settings.sequential.confidence:.0%} 置信区间 {report['interval']}")
+        print(f"LLR {report['llr']}，边界 {report['bounds']}")
+        if report['decision'] is None:
+            print(f"进行了全部 {test.n} 局，尚未得出结论")
+        else:
+            print(f"接受 {report['decision']}（{accepted[report['decision']]}），进行了 {test.n} 局，节省了 {settings.games - test.n} 局")
+
+if __name__ == '__main__':
+    main()
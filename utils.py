@@ -1,12 +1,10 @@
 import pygame
-import numpy as np
 from pygame import Surface
 
 def darken(surface: Surface, ratio: float=0.5) -> None:
     """将一个Surface的图像变暗"""
     if ratio < 0 or ratio > 1:
         raise Exception("darken func: ratio can only be 0-1")
-    array = pygame.surfarray.array3d(surface)
-    array = (array * ratio).astype(np.uint8)
-    pygame.surfarray.blit_array(surface, array)
-    del array
\ No newline at end of file
+    # 每个像素的RGB分量都乘以 ratio，直接由 pygame 在原图上完成，无需复制为数组
+    value = int(255 * ratio)
+    surface.fill((value, value, value), special_flags=pygame.BLEND_RGB_MULT)
\ No newline at end of file
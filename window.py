@@ -1,20 +1,35 @@
-from typing import Optional
+from __future__ import annotations
+from typing import Optional, TYPE_CHECKING
 import pygame
+import ptext
 from pygame import Surface
-from pygame.sprite import Sprite
-from settings import Settings
+from pygame.sprite import Sprite, Group
+from asset_pack import open_asset
+from font_bank import FontBank
+
+if TYPE_CHECKING:
+    from datong_solitaire import DaTongSolitaire
+
+# 弹出窗口中的文字通过 ptext 绘制，其字体同样从资源包中读取，普通样式的字体与游戏的其他部分共享
+ptext.FONT_FILE_OPENER = open_asset
+ptext.FONT_LOADER = lambda path, size: FontBank().get(path, size)
 
 class Window(Sprite):
-    """游戏中所有弹出窗口的基类"""
+    """游戏中所有弹出窗口的基类
+    
+    窗口在第一次打开时创建，之后由游戏缓存并重复使用；窗口中不变的内容（如文字）在创建时就绘制到 image 上，
+    打开和绘制窗口时不再创建任何对象。
+    """
     def __init__(
             self,
+            game: DaTongSolitaire,
             width: int,
             height: int,
             color=None
         ):
-        self.settings = Settings()
-        self.game = self.settings.game
-        self.screen = self.game.screen
+        self.game = game
+        self.settings = game.settings
+        self.screen = game.screen
         self.screen_rect = self.screen.get_rect()
         self.image = Surface((width, height))
         if color is None:
@@ -27,11 +42,19 @@ class Window(Sprite):
         self.height = height
         self.rect = self.image.get_rect()
         self.rect.center = self.screen_rect.center
+        self.buttons = Group()   # 窗口中的按钮，随窗口关闭一起释放
+    
+    def reset(self) -> None:
+        """重新打开窗口前，清除上次打开时留下的状态"""
+        for button in self.buttons:
+            button.focused = False
     
     def blitme(self, surface: Optional[Surface]=None) -> None:
         if surface == None:
             surface = self.screen
         surface.blit(self.image, self.rect)
+        for button in self.buttons:
+            button.blitme()
     
     def update(self):
         pass
\ No newline at end of file
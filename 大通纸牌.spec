@@ -8,7 +8,7 @@ a = Analysis(
     ['datong_solitaire.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('assets.pack', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},